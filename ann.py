@@ -0,0 +1,309 @@
+"""
+Approximate nearest-neighbour engine for very large TF-IDF catalogs.
+
+    python ann.py build --components 128 --lists 0       # 0 = auto (~4*sqrt(n))
+    python ann.py eval --queries 200 --k 10 --nprobe 16  # recall@k vs exact
+
+Pure NumPy/SciPy:
+1. randomized truncated SVD projects the sparse TF-IDF rows into a dense,
+   L2-normalized float32 space (n_rows x components)
+2. an IVF index (spherical k-means coarse quantizer) partitions the rows
+   into `lists`; a query only scans the `nprobe` closest lists
+3. optionally the best `rerank` candidates are re-scored exactly against
+   the sparse matrix, so returned scores are true cosine similarities
+
+Knobs: more components / lists / nprobe / rerank = higher recall, more latency.
+The index is a directory of .npy files, memory-mapped at serve time.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifacts import is_artifact_dir, load_artifact_dir
+from precision import QuantizedCSR, matrix_precision, row_scores, to_float32
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ANN_DIR = os.path.join(BASE_DIR, "ann_index")
+ANN_FORMAT_VERSION = 1
+
+_ASSIGN_BLOCK = 65536
+
+
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def randomized_svd(
+    matrix: Any, k: int, oversample: int = 10, power_iters: int = 2, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Halko et al. range finder; returns (U, S, Vt) with k components."""
+    rng = np.random.default_rng(seed)
+    n_features = matrix.shape[1]
+    width = min(k + oversample, min(matrix.shape))
+    omega = rng.standard_normal((n_features, width)).astype(np.float32)
+    y = matrix @ omega
+    q, _ = np.linalg.qr(y)
+    for _ in range(power_iters):
+        z, _ = np.linalg.qr(matrix.T @ q)
+        q, _ = np.linalg.qr(matrix @ z)
+    b = np.asarray((matrix.T @ q).T)  # (width x n_features)
+    ub, s, vt = np.linalg.svd(b, full_matrices=False)
+    u = q @ ub
+    return u[:, :k], s[:k], vt[:k]
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_BLOCK):
+        block = vectors[start : start + _ASSIGN_BLOCK]
+        out[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, n_lists: int, iters: int = 10, sample: int = 200_000, seed: int = 0
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    train = vectors
+    if len(vectors) > sample:
+        train = vectors[rng.choice(len(vectors), sample, replace=False)]
+    centroids = train[rng.choice(len(train), n_lists, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(train, centroids)
+        onehot = sp.csr_matrix(
+            (np.ones(len(labels), np.float32), (labels, np.arange(len(labels)))),
+            shape=(n_lists, len(labels)),
+        )
+        sums = np.asarray(onehot @ train, dtype=np.float32)
+        empty = np.bincount(labels, minlength=n_lists) == 0
+        # reseed empty lists from random points so every list stays usable
+        sums[empty] = train[rng.choice(len(train), int(empty.sum()), replace=False)]
+        centroids = _normalize_rows(sums).astype(np.float32)
+    return centroids
+
+
+class AnnIndex:
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        self.components = arrays["components"]  # (dims x n_features)
+        self.embeddings = arrays["embeddings"]  # (n_rows x dims), L2-normalized
+        self.centroids = arrays["centroids"]  # (lists x dims)
+        self.list_offsets = arrays["list_offsets"]  # (lists + 1)
+        self.list_rows = arrays["list_rows"]  # rows grouped by list
+        self.meta = meta
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.embeddings.shape[0])
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    def project(self, sparse_rows: Any) -> np.ndarray:
+        """Embed arbitrary TF-IDF rows (same vocabulary) into the ANN space."""
+        dense = np.asarray(sparse_rows @ self.components.T, dtype=np.float32)
+        return _normalize_rows(np.atleast_2d(dense))
+
+    def candidates(self, qv: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = max(1, min(nprobe, self.n_lists))
+        lists = np.argpartition(-(self.centroids @ qv), nprobe - 1)[:nprobe]
+        return np.concatenate(
+            [self.list_rows[self.list_offsets[l] : self.list_offsets[l + 1]] for l in lists]
+        )
+
+    def search(
+        self,
+        qv: np.ndarray,
+        k: int,
+        nprobe: int = 16,
+        exclude: Optional[int] = None,
+        matrix: Any = None,
+        query_row: Any = None,
+        rerank: int = 0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for an embedded query `qv` (dims,), best first.
+        With rerank > 0 and the sparse `matrix` + `query_row`, the best
+        max(k, rerank) candidates get exact cosine scores.
+        """
+        cand = self.candidates(qv, nprobe)
+        if exclude is not None:
+            cand = cand[cand != exclude]
+        if len(cand) == 0:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+
+        approx = self.embeddings[cand] @ qv
+        keep = max(k, rerank) if rerank > 0 and matrix is not None else k
+        if keep < len(cand):
+            top = np.argpartition(-approx, keep - 1)[:keep]
+            cand, approx = cand[top], approx[top]
+
+        scores = approx
+        if rerank > 0 and matrix is not None and query_row is not None:
+            scores = row_scores(matrix[cand], query_row)
+
+        order = np.argsort(-scores, kind="stable")[:k]
+        return cand[order].astype(np.int32), scores[order].astype(np.float32)
+
+    def search_row(
+        self, matrix: Any, row: int, k: int, nprobe: int = 16, rerank: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self.search(
+            np.asarray(self.embeddings[row], dtype=np.float32),
+            k,
+            nprobe=nprobe,
+            exclude=row,
+            matrix=matrix,
+            query_row=matrix[row],
+            rerank=rerank,
+        )
+
+
+def build_ann_index(
+    matrix: Any,
+    n_components: int = 128,
+    n_lists: int = 0,
+    kmeans_iters: int = 10,
+    seed: int = 0,
+) -> AnnIndex:
+    if isinstance(matrix, QuantizedCSR):
+        # the SVD needs transposed products; dequantize once for the build
+        matrix = to_float32(matrix)
+    n_rows = matrix.shape[0]
+    n_components = min(n_components, min(matrix.shape) - 1)
+    if n_lists <= 0:
+        n_lists = max(1, int(4 * np.sqrt(n_rows)))
+    n_lists = min(n_lists, n_rows)
+
+    u, s, vt = randomized_svd(matrix, n_components, seed=seed)
+    embeddings = _normalize_rows((u * s).astype(np.float32)).astype(np.float32)
+    centroids = spherical_kmeans(embeddings, n_lists, iters=kmeans_iters, seed=seed)
+    labels = _assign(embeddings, centroids)
+
+    list_rows = np.argsort(labels, kind="stable").astype(np.int32)
+    list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=n_lists), out=list_offsets[1:])
+
+    meta = {
+        "format_version": ANN_FORMAT_VERSION,
+        "n_rows": int(n_rows),
+        "n_features": int(matrix.shape[1]),
+        "components": int(n_components),
+        "lists": int(n_lists),
+    }
+    arrays = {
+        "components": vt.astype(np.float32),
+        "embeddings": embeddings,
+        "centroids": centroids,
+        "list_offsets": list_offsets,
+        "list_rows": list_rows,
+    }
+    return AnnIndex(arrays, meta)
+
+
+def save_ann_index(index: AnnIndex, out_dir: str) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ("components", "embeddings", "centroids", "list_offsets", "list_rows"):
+        np.save(os.path.join(out_dir, f"{name}.npy"), getattr(index, name))
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(index.meta, f, indent=2)
+
+
+def load_ann_index(path: str, mmap: bool = True) -> Optional[AnnIndex]:
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.isfile(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != ANN_FORMAT_VERSION:
+        raise RuntimeError(f"{path}: unsupported ANN index version; rebuild with ann.py")
+    mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        for name in ("components", "embeddings", "centroids", "list_offsets", "list_rows")
+    }
+    return AnnIndex(arrays, meta)
+
+
+def evaluate_recall(
+    index: AnnIndex, matrix: Any, queries: int, k: int, nprobe: int, rerank: int, seed: int = 0
+) -> Dict[str, float]:
+    """recall@k of ANN vs exact brute force on random catalog rows."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(matrix.shape[0], min(queries, matrix.shape[0]), replace=False)
+    hits, exact_t, ann_t = 0, 0.0, 0.0
+    for r in rows:
+        t0 = time.perf_counter()
+        scores = row_scores(matrix, matrix[r]).astype(np.float64)
+        scores[r] = -np.inf
+        truth = set(np.argpartition(-scores, k - 1)[:k].tolist())
+        t1 = time.perf_counter()
+        got, _ = index.search_row(matrix, int(r), k, nprobe=nprobe, rerank=rerank)
+        t2 = time.perf_counter()
+        hits += len(truth & set(got.tolist()))
+        exact_t += t1 - t0
+        ann_t += t2 - t1
+    n = len(rows)
+    return {
+        "recall_at_k": hits / (n * k),
+        "exact_ms": 1000 * exact_t / n,
+        "ann_ms": 1000 * ann_t / n,
+    }
+
+
+def _load_matrix(args: argparse.Namespace) -> Any:
+    if is_artifact_dir(args.artifacts):
+        return load_artifact_dir(args.artifacts)["tfidf_matrix"]
+    with open(args.matrix, "rb") as f:
+        return pickle.load(f).tocsr()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matrix", default=os.path.join(BASE_DIR, "tfidf_matrix.pkl"))
+    parser.add_argument("--artifacts", default=os.path.join(BASE_DIR, "artifacts"))
+    parser.add_argument("--index", default=DEFAULT_ANN_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build")
+    b.add_argument("--components", type=int, default=128)
+    b.add_argument("--lists", type=int, default=0)
+    b.add_argument("--iters", type=int, default=10)
+    b.add_argument("--seed", type=int, default=0)
+
+    e = sub.add_parser("eval")
+    e.add_argument("--queries", type=int, default=200)
+    e.add_argument("--k", type=int, default=10)
+    e.add_argument("--nprobe", type=int, default=16)
+    e.add_argument("--rerank", type=int, default=100)
+    args = parser.parse_args()
+
+    matrix = _load_matrix(args)
+    if args.cmd == "build":
+        started = time.perf_counter()
+        index = build_ann_index(
+            matrix, args.components, args.lists, kmeans_iters=args.iters, seed=args.seed
+        )
+        save_ann_index(index, args.index)
+        print(
+            f"wrote {args.index}: {index.meta} in {time.perf_counter() - started:.1f}s"
+        )
+    elif args.cmd == "eval":
+        index = load_ann_index(args.index)
+        if index is None:
+            raise SystemExit(f"no ANN index at {args.index}; run `python ann.py build` first")
+        report = evaluate_recall(index, matrix, args.queries, args.k, args.nprobe, args.rerank)
+        print({"matrix": matrix_precision(matrix), **report})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,14 @@
 
-import requests
 import streamlit as st
-from typing import Optional, Dict
 import time
 
+import frontend_client as api
+
 
 
 # =============================
 # CONFIG
 # =============================
-API_BASE = "https://movie-rec-466x.onrender.com" or "http://127.0.0.1:8000"
 TMDB_IMG = "https://image.tmdb.org/t/p/w500"
 
 st.set_page_config(page_title="Movie Recommender", page_icon="🎬", layout="wide")
@@ -20,7 +19,14 @@ st.set_page_config(page_title="Movie Recommender", page_icon="🎬", layout="wid
 if "app_loaded" not in st.session_state:
     st.session_state.app_loaded = False
 
+if not st.session_state.app_loaded and st.query_params.get("id"):
+    # deep link to a movie: go straight to the details view
+    st.session_state.app_loaded = True
+
 if not st.session_state.app_loaded:
+    # the default home feed loads while the intro plays
+    api.submit_json("/home", params={"category": "trending", "limit": 24})
+
     # Create centered loading screen
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -327,20 +333,6 @@ def goto_details(tmdb_id: int):
     st.rerun()
 
 
-# =============================
-# API HELPERS
-# =============================
-@st.cache_data(ttl=30)  # short cache for autocomplete
-def api_get_json(path: str, params: Optional[Dict] = None):
-    try:
-        r = requests.get(f"{API_BASE}{path}", params=params, timeout=25)
-        if r.status_code >= 400:
-            return None, f"HTTP {r.status_code}: {r.text[:300]}"
-        return r.json(), None
-    except Exception as e:
-        return None, f"Request failed: {e}"
-
-
 def poster_grid(cards, cols=6, key_prefix="grid"):
     if not cards:
         col1, col2, col3 = st.columns([1, 2, 1])
@@ -586,7 +578,7 @@ if st.session_state.view == "home":
             st.info("💡 Type at least 2 characters to start searching...")
         else:
             with st.spinner("🔍 Searching movies..."):
-                data, err = api_get_json("/tmdb/search", params={"query": typed.strip()})
+                data, err = api.get_json("/tmdb/search", params={"query": typed.strip()})
 
             if err or data is None:
                 st.error(f"❌ Search failed: {err}")
@@ -652,7 +644,7 @@ if st.session_state.view == "home":
     """, unsafe_allow_html=True)
 
     with st.spinner(f"{icon} Loading {home_category.replace('_', ' ')} movies..."):
-        home_cards, err = api_get_json(
+        home_cards, err = api.get_json(
             "/home", params={"category": home_category, "limit": 24}
         )
     
@@ -679,13 +671,19 @@ elif st.session_state.view == "details":
         if st.button("← Back to Home", use_container_width=True):
             goto_home()
 
-    # Load movie details
+    # One streamed request by id: details arrive first, the two
+    # recommendation rows follow as the backend finishes them
+    bundle_events = api.stream_events(
+        f"/movie/id/{tmdb_id}/bundle/stream",
+        params={"tfidf_top_n": 12, "genre_limit": 12},
+    )
     with st.spinner("🎬 Loading movie details..."):
-        data, err = api_get_json(f"/movie/id/{tmdb_id}")
-    
-    if err or not data:
-        st.error(f"❌ Could not load details: {err or 'Unknown error'}")
+        first = next(bundle_events, {"event": "error", "detail": "Empty response"})
+
+    if first.get("event") != "movie_details" or not first.get("data"):
+        st.error(f"❌ Could not load details: {first.get('detail') or 'Unknown error'}")
         st.stop()
+    data = first["data"]
 
     # Movie title header
     st.markdown(f"""
@@ -800,54 +798,65 @@ elif st.session_state.view == "details":
         </div>
     """, unsafe_allow_html=True)
 
-    title = (data.get("title") or "").strip()
-    if title:
-        with st.spinner("🎯 Finding perfect recommendations..."):
-            bundle, err2 = api_get_json(
-                "/movie/search",
-                params={"query": title, "tfidf_top_n": 12, "genre_limit": 12},
-            )
-
-        if not err2 and bundle:
-            st.markdown("""
-                <div class='section-header' style='font-size: 1.2rem; margin-top: 1rem;'>
-                    <span> Similar Movies</span>
-                </div>
-                <div style='color: #6b7280; margin-top: -1rem; margin-bottom: 1rem; font-size: 0.9rem;'>
-                    Based on storyline and themes
-                </div>
-            """, unsafe_allow_html=True)
-            poster_grid(
-                to_cards_from_tfidf_items(bundle.get("tfidf_recommendations")),
-                cols=grid_cols,
-                key_prefix="details_tfidf",
-            )
+    st.markdown("""
+        <div class='section-header' style='font-size: 1.2rem; margin-top: 1rem;'>
+            <span> Similar Movies</span>
+        </div>
+        <div style='color: #6b7280; margin-top: -1rem; margin-bottom: 1rem; font-size: 0.9rem;'>
+            Based on storyline and themes
+        </div>
+    """, unsafe_allow_html=True)
+    tfidf_slot = st.empty()
+    tfidf_slot.info("🎯 Finding similar movies...")
 
-            st.markdown("")
-            st.markdown("""
-                <div class='section-header' style='font-size: 1.2rem; margin-top: 2rem;'>
-                    <span>🎭 More Like This</span>
-                </div>
-                <div style='color: #6b7280; margin-top: -1rem; margin-bottom: 1rem; font-size: 0.9rem;'>
-                    Similar genres you might enjoy
-                </div>
-            """, unsafe_allow_html=True)
-            poster_grid(
-                bundle.get("genre_recommendations", []),
-                cols=grid_cols,
-                key_prefix="details_genre",
-            )
-        else:
-            st.info("💡 Showing genre-based recommendations...")
-            with st.spinner("Loading recommendations..."):
-                genre_only, err3 = api_get_json(
-                    "/recommend/genre", params={"tmdb_id": tmdb_id, "limit": 18}
+    st.markdown("")
+    st.markdown("""
+        <div class='section-header' style='font-size: 1.2rem; margin-top: 2rem;'>
+            <span>🎭 More Like This</span>
+        </div>
+        <div style='color: #6b7280; margin-top: -1rem; margin-bottom: 1rem; font-size: 0.9rem;'>
+            Similar genres you might enjoy
+        </div>
+    """, unsafe_allow_html=True)
+    genre_slot = st.empty()
+    genre_slot.info("🎭 Loading genre picks...")
+
+    # each section fills in as soon as its part of the stream arrives
+    genre_params = {"tmdb_id": tmdb_id, "limit": 18}
+    genre_fallback = None
+    filled = set()
+    for event in bundle_events:
+        kind = event.get("event")
+        if kind == "tfidf_recommendations":
+            with tfidf_slot.container():
+                poster_grid(
+                    to_cards_from_tfidf_items(event.get("data")),
+                    cols=grid_cols,
+                    key_prefix="details_tfidf",
                 )
-            if not err3 and genre_only:
+            filled.add(kind)
+        elif kind == "genre_recommendations":
+            with genre_slot.container():
+                poster_grid(
+                    event.get("data", []),
+                    cols=grid_cols,
+                    key_prefix="details_genre",
+                )
+            filled.add(kind)
+        elif kind == "error" and event.get("part") == "genre_recommendations":
+            # retry on its own while the rest of the stream is still arriving
+            genre_fallback = api.submit_json("/recommend/genre", params=genre_params)
+
+    if "tfidf_recommendations" not in filled:
+        tfidf_slot.info("💡 No storyline matches for this movie.")
+    if "genre_recommendations" not in filled:
+        if genre_fallback is None:
+            genre_fallback = api.submit_json("/recommend/genre", params=genre_params)
+        genre_only, err3 = genre_fallback.result()
+        if not err3 and genre_only:
+            with genre_slot.container():
                 poster_grid(
                     genre_only, cols=grid_cols, key_prefix="details_genre_fallback"
                 )
-            else:
-                st.warning("😔 No recommendations available at the moment. Please try again later.")
-    else:
-        st.warning("⚠️ Unable to compute recommendations for this movie.")
\ No newline at end of file
+        else:
+            genre_slot.warning("😔 No recommendations available at the moment. Please try again later.")
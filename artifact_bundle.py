@@ -0,0 +1,339 @@
+"""
+Immutable, versioned sets of serving artifacts.
+
+main.py serves from one ArtifactBundle held in a single module global.
+Reloads and catalog appends build a new bundle off to the side, validate
+and warm it, then swap the reference in one assignment. A request reads
+the reference once and keeps that bundle for its whole duration; the old
+bundle is released after the last request using it has finished.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from precision import matrix_nbytes, matrix_precision, row_scores
+from similarity import InvertedIndex
+from title_index import LazyTitleIndex
+
+
+class ArtifactBundle:
+    """
+    One version of everything the recommenders read: TF-IDF matrix,
+    row titles, title map, optional neighbour table / ANN index / offline
+    TMDB cards. Never mutated once published; the vectorizer, inverted
+    index and trigram title index are built at most once, on demand or
+    by warm().
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        tfidf_matrix: Any,
+        titles: Any,
+        title_to_idx: Mapping[str, int],
+        *,
+        source: str,
+        manifest: Optional[Dict[str, Any]] = None,
+        df: Any = None,
+        indices_obj: Any = None,
+        vectorizer: Any = None,
+        vectorizer_path: Optional[str] = None,
+        neighbors_idx: Optional[np.ndarray] = None,
+        neighbors_score: Optional[np.ndarray] = None,
+        ann_index: Any = None,
+        tmdb_cards: Optional[Dict[str, np.ndarray]] = None,
+        fuzzy_min_score: float = 0.55,
+        delta_rows: int = 0,
+        load_seconds: Optional[Dict[str, float]] = None,
+    ):
+        self.fingerprint = fingerprint
+        self.tfidf_matrix = tfidf_matrix
+        self.titles = titles
+        self.title_to_idx = title_to_idx
+        self.source = source  # artifact_dir | pickles
+        self.manifest = manifest
+        self.df = df  # pickle mode only; covers the base rows
+        self.indices_obj = indices_obj
+        self.vectorizer_path = vectorizer_path
+        self.neighbors_idx = neighbors_idx
+        self.neighbors_score = neighbors_score
+        self.ann_index = ann_index
+        self.tmdb_cards = tmdb_cards
+        self.fuzzy_min_score = fuzzy_min_score
+        self.delta_rows = delta_rows  # rows appended on top of the base (catalog.py)
+        self.load_seconds = load_seconds or {}
+        self.loaded_at = time.time()
+
+        self.title_index = LazyTitleIndex(title_to_idx, fuzzy_min_score)
+        self._vectorizer = vectorizer
+        self._inverted_index: Optional[InvertedIndex] = None
+        # set by derive(): keys added over the parent's map, and the parent's
+        # inverted index to extend instead of rebuilding
+        self._added_titles: Optional[Dict[str, int]] = None
+        self._inverted_source: Optional[InvertedIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Base fingerprint, plus the number of appended rows if any."""
+        if self.delta_rows:
+            return f"{self.fingerprint}+{self.delta_rows}"
+        return self.fingerprint
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.tfidf_matrix.shape[0])
+
+    def vectorizer_loaded(self) -> bool:
+        return self._vectorizer is not None
+
+    def inverted_index_built(self) -> bool:
+        return self._inverted_index is not None
+
+    def vectorizer(self) -> Any:
+        """
+        The fitted TfidfVectorizer. Startup skips it unless
+        TFIDF_VECTORIZER_LOAD=eager (unpickling imports scikit-learn), so it
+        is unpickled here on first use and checked against the matrix.
+        """
+        if self._vectorizer is None:
+            with self._lock:
+                if self._vectorizer is None:
+                    import pickle
+
+                    if not self.vectorizer_path:
+                        raise RuntimeError("no vectorizer for this bundle")
+                    with open(self.vectorizer_path, "rb") as f:
+                        vectorizer = pickle.load(f)
+                    self._check_vectorizer(vectorizer)
+                    self._vectorizer = vectorizer
+        return self._vectorizer
+
+    def _check_vectorizer(self, vectorizer: Any) -> None:
+        # build_index.py --vectorizer hashing has buckets, not a vocabulary
+        n_terms = getattr(vectorizer, "n_features", None) or len(vectorizer.vocabulary_)
+        if n_terms != self.tfidf_matrix.shape[1]:
+            raise RuntimeError("vectorizer vocabulary does not match the TF-IDF matrix")
+
+    def inverted_index(self) -> InvertedIndex:
+        """term -> postings view of the matrix for free-text queries."""
+        if self._inverted_index is None:
+            with self._lock:
+                if self._inverted_index is None:
+                    source = self._inverted_source
+                    if source is not None:
+                        self._inverted_index = source.extended(self.tfidf_matrix)
+                    else:
+                        self._inverted_index = InvertedIndex(self.tfidf_matrix)
+        return self._inverted_index
+
+    def derive(
+        self,
+        tfidf_matrix: Any,
+        titles: Any,
+        title_to_idx: Mapping[str, int],
+        delta_rows: int,
+        vectorizer: Any = None,
+        added_titles: Optional[Dict[str, int]] = None,
+    ) -> "ArtifactBundle":
+        """
+        Same base artifacts with a grown matrix (catalog appends). Side
+        tables are shared; they cover a prefix of the rows. With
+        `added_titles`, the keys `title_to_idx` gained over this bundle's
+        map, the title and inverted indexes are extended rather than
+        rebuilt, and validate() / warm() only look at what was added.
+        """
+        grown = ArtifactBundle(
+            self.fingerprint,
+            tfidf_matrix,
+            titles,
+            title_to_idx,
+            source=self.source,
+            manifest=self.manifest,
+            df=self.df,
+            indices_obj=self.indices_obj,
+            vectorizer=vectorizer or self._vectorizer,
+            vectorizer_path=self.vectorizer_path,
+            neighbors_idx=self.neighbors_idx,
+            neighbors_score=self.neighbors_score,
+            ann_index=self.ann_index,
+            tmdb_cards=self.tmdb_cards,
+            fuzzy_min_score=self.fuzzy_min_score,
+            delta_rows=delta_rows,
+            load_seconds=self.load_seconds,
+        )
+        if added_titles is not None:
+            grown.title_index = self.title_index.extended(title_to_idx, added_titles)
+            grown._added_titles = dict(added_titles)
+            grown._inverted_source = self._inverted_index
+        return grown
+
+    def validate(self) -> None:
+        """Raises RuntimeError when the parts do not describe the same catalog."""
+        n_rows = self.n_rows
+        if len(self.titles) != n_rows:
+            raise RuntimeError(f"{len(self.titles)} titles for {n_rows} matrix rows")
+        # a derived bundle's parent already checked the rest of the map
+        checked = self._added_titles if self._added_titles is not None else self.title_to_idx
+        if checked:
+            rows = np.fromiter(checked.values(), dtype=np.int64, count=len(checked))
+            if rows.min() < 0 or rows.max() >= n_rows:
+                raise RuntimeError("title map points outside the TF-IDF matrix")
+        if self.neighbors_idx is not None:
+            if self.neighbors_idx.shape[0] > n_rows:
+                raise RuntimeError("neighbour table has more rows than the TF-IDF matrix")
+            if self.neighbors_idx.size and int(self.neighbors_idx.max()) >= n_rows:
+                raise RuntimeError("neighbour table points outside the TF-IDF matrix")
+        if self.ann_index is not None and self.ann_index.n_rows > n_rows:
+            raise RuntimeError("ANN index has more rows than the TF-IDF matrix")
+        if self._vectorizer is not None:
+            self._check_vectorizer(self._vectorizer)
+
+    def warm(self, fuzzy: bool = True, text: bool = False) -> Dict[str, float]:
+        """
+        Pays the first-request costs before the bundle takes traffic:
+        page in the memory-mapped arrays, build the lazy indexes, run one
+        scoring call. A derived bundle's grown matrix was just written in
+        memory, so it skips paging in and scoring. Returns seconds per step.
+        """
+        timings: Dict[str, float] = {}
+
+        def step(name: str, fn: Callable[[], Any]) -> None:
+            started = time.perf_counter()
+            fn()
+            timings[name] = time.perf_counter() - started
+
+        m = self.tfidf_matrix
+        if self._added_titles is None:
+            step("page_in", lambda: page_in(
+                [m.data, m.indices, m.indptr] + ([m.scales] if hasattr(m, "scales") else [])
+            ))
+            if self.n_rows:
+                step("score", lambda: row_scores(m, m[0]))
+        if fuzzy:
+            step("title_index", self.title_index.get)
+        if text:
+            step("vectorizer", self.vectorizer)
+            step("inverted_index", self.inverted_index)
+        return timings
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+            "created_at": (self.manifest or {}).get("created_at"),
+            "n_rows": self.n_rows,
+            "delta_rows": self.delta_rows,
+            "precision": matrix_precision(self.tfidf_matrix),
+            "matrix_mb": round(matrix_nbytes(self.tfidf_matrix) / 1e6, 1),
+            "neighbors_rows": int(self.neighbors_idx.shape[0]) if self.neighbors_idx is not None else None,
+            "ann_rows": self.ann_index.n_rows if self.ann_index is not None else None,
+            "tmdb_cards": self.tmdb_cards is not None,
+            "load_seconds": {k: round(v, 4) for k, v in self.load_seconds.items()},
+        }
+
+
+def page_in(arrays: Iterable[np.ndarray], page_bytes: int = 4096) -> None:
+    """Touches one element per page so memory-mapped files are read now, not mid-request."""
+    for arr in arrays:
+        flat = np.asarray(arr).reshape(-1)
+        if flat.size:
+            step = max(1, page_bytes // flat.itemsize)
+            int(flat[::step].sum())
+
+
+def fingerprint(paths: Iterable[str]) -> str:
+    """
+    Short hash over path, size and mtime of every file (directories are
+    walked). Cheap enough to poll; changes whenever an artifact is replaced.
+    """
+    h = hashlib.sha1()
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names
+            )
+        else:
+            files = [path]
+        for f in files:
+            try:
+                st = os.stat(f)
+            except OSError:
+                h.update(f"{f}:missing\n".encode())
+                continue
+            h.update(f"{f}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()[:12]
+
+
+class RetiredBundles:
+    """
+    Bundles swapped out but possibly still used by in-flight requests.
+    drain() drops each one once nothing else references it (or after
+    `timeout`), from the caller's thread, so freeing a large catalog
+    never happens on the event loop.
+    """
+
+    def __init__(self) -> None:
+        self._items: List[ArtifactBundle] = []
+        self._lock = threading.Lock()
+
+    def add(self, bundle: ArtifactBundle) -> None:
+        with self._lock:
+            self._items.append(bundle)
+
+    def versions(self) -> List[str]:
+        with self._lock:
+            return [b.version for b in self._items]
+
+    def drain(self, timeout: float, poll: float = 0.1) -> int:
+        """Returns how many bundles were released."""
+        deadline = time.monotonic() + timeout
+        released = 0
+        while True:
+            with self._lock:
+                keep = []
+                for b in self._items:
+                    # our list entry + getrefcount's argument
+                    if sys.getrefcount(b) <= 3 or time.monotonic() >= deadline:
+                        released += 1
+                    else:
+                        keep.append(b)
+                self._items = keep
+                b = None
+                if not keep:
+                    return released
+            time.sleep(poll)
+
+
+class ArtifactVersionMiddleware:
+    """Pure ASGI middleware: X-Artifact-Version header, read when the request starts."""
+
+    def __init__(self, app: Any, get_version: Callable[[], Optional[str]]):
+        self.app = app
+        self.get_version = get_version
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        version = self.get_version()
+        if not version:
+            await self.app(scope, receive, send)
+            return
+        header = (b"x-artifact-version", version.encode("latin-1"))
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [header]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,264 @@
+"""
+Versioned, memory-mappable artifact directory for the TF-IDF engine.
+
+    python artifacts.py convert            # pickles -> ./artifacts
+    python artifacts.py convert --out /srv/artifacts/v2
+    python artifacts.py convert --precision int8    # see precision.py
+
+Layout (format_version 1):
+- manifest.json          version, shapes, dtypes, created_at
+- tfidf_data.npy         CSR values
+- tfidf_indices.npy      CSR column indices
+- tfidf_indptr.npy       CSR row pointers
+- titles_offsets.npy     int64 (n_rows + 1) byte offsets into titles.bin
+- titles.bin             UTF-8 titles, concatenated (columnar, no pickle)
+- title_map.json         prebuilt normalized title -> row
+
+format_version 2 is the same layout with quantized values: tfidf_data.npy
+holds uint16 / int8 and tfidf_scales.npy one float32 scale per row
+(manifest "quantization"). Version 1 readers refuse it instead of serving
+the raw integers.
+
+Everything except the JSON files is opened with mmap, so loading is
+O(1) in catalog size and pages are shared between worker processes.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from precision import PRECISIONS, QuantizedCSR, convert
+
+ARTIFACT_FORMAT_VERSION = 1
+QUANTIZED_FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARTIFACT_DIR = os.path.join(BASE_DIR, "artifacts")
+
+
+def norm_title(t: str) -> str:
+    return str(t).strip().lower()
+
+
+def build_title_to_idx_map(indices: Any) -> Dict[str, int]:
+    """
+    indices.pkl can be:
+    - dict(title -> index)
+    - pandas Series (index=title, value=index)
+    We normalize into TITLE_TO_IDX.
+    """
+    title_to_idx: Dict[str, int] = {}
+
+    if isinstance(indices, dict):
+        for k, v in indices.items():
+            title_to_idx[norm_title(k)] = int(v)
+        return title_to_idx
+
+    # pandas Series or similar mapping
+    try:
+        for k, v in indices.items():
+            title_to_idx[norm_title(k)] = int(v)
+        return title_to_idx
+    except Exception:
+        # last resort: if it's a list-like etc.
+        raise RuntimeError(
+            "indices.pkl must be dict or pandas Series-like (with .items())"
+        )
+
+
+class TitleColumn(Sequence[str]):
+    """Read-only list of titles backed by an offsets array and a UTF-8 blob."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        a, b = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[a:b].tobytes().decode("utf-8")
+
+
+def write_titles(titles: Iterable[str], out_dir: str) -> int:
+    encoded = [str(t).encode("utf-8") for t in titles]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(out_dir, "titles_offsets.npy"), offsets)
+    with open(os.path.join(out_dir, "titles.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    return len(encoded)
+
+
+def write_artifact_dir(
+    out_dir: str,
+    matrix: Any,
+    titles: Sequence[str],
+    title_to_idx: Dict[str, int],
+    extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    quantized = isinstance(matrix, QuantizedCSR)
+    if not quantized:
+        matrix = sp.csr_matrix(matrix)
+        matrix.sort_indices()
+    if matrix.shape[0] != len(titles):
+        raise ValueError(
+            f"matrix has {matrix.shape[0]} rows but there are {len(titles)} titles"
+        )
+    os.makedirs(out_dir, exist_ok=True)
+
+    index_dtype = np.int32 if matrix.nnz < np.iinfo(np.int32).max else np.int64
+    np.save(os.path.join(out_dir, "tfidf_data.npy"), matrix.data)
+    if quantized:
+        np.save(os.path.join(out_dir, "tfidf_scales.npy"), matrix.scales)
+    np.save(os.path.join(out_dir, "tfidf_indices.npy"), matrix.indices.astype(index_dtype))
+    np.save(os.path.join(out_dir, "tfidf_indptr.npy"), matrix.indptr.astype(index_dtype))
+    write_titles(titles, out_dir)
+    with open(os.path.join(out_dir, "title_map.json"), "w", encoding="utf-8") as f:
+        json.dump(title_to_idx, f, ensure_ascii=False)
+
+    manifest = {
+        "format_version": QUANTIZED_FORMAT_VERSION if quantized else ARTIFACT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "n_rows": int(matrix.shape[0]),
+        "n_features": int(matrix.shape[1]),
+        "nnz": int(matrix.nnz),
+        "dtype": str(matrix.data.dtype),
+        "index_dtype": np.dtype(index_dtype).name,
+    }
+    if quantized:
+        manifest["quantization"] = matrix.mode
+    manifest.update(extra or {})
+    # manifest last: a directory without one is an incomplete conversion
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def is_artifact_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    version = manifest.get("format_version")
+    if version not in (ARTIFACT_FORMAT_VERSION, QUANTIZED_FORMAT_VERSION):
+        raise RuntimeError(
+            f"{path}: artifact format_version {version!r} is not supported "
+            f"(expected {ARTIFACT_FORMAT_VERSION} or {QUANTIZED_FORMAT_VERSION}); "
+            "reconvert with artifacts.py"
+        )
+    return manifest
+
+
+def load_artifact_dir(path: str, mmap: bool = True) -> Dict[str, Any]:
+    """
+    Returns {"manifest", "tfidf_matrix", "titles", "title_to_idx"}.
+    With mmap=True the CSR arrays and titles stay on disk (page cache).
+    Quantized directories load as a precision.QuantizedCSR.
+    """
+    manifest = read_manifest(path)
+    mode = "r" if mmap else None
+
+    def arr(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, name), mmap_mode=mode)
+
+    shape = (manifest["n_rows"], manifest["n_features"])
+    if manifest.get("quantization"):
+        matrix = QuantizedCSR(
+            arr("tfidf_data.npy"),
+            arr("tfidf_indices.npy"),
+            arr("tfidf_indptr.npy"),
+            arr("tfidf_scales.npy"),
+            shape,
+        )
+    else:
+        matrix = sp.csr_matrix(
+            (arr("tfidf_data.npy"), arr("tfidf_indices.npy"), arr("tfidf_indptr.npy")),
+            shape=shape,
+            copy=False,
+        )
+    if mmap:
+        blob = np.memmap(os.path.join(path, "titles.bin"), dtype=np.uint8, mode="r")
+    else:
+        blob = np.fromfile(os.path.join(path, "titles.bin"), dtype=np.uint8)
+    titles = TitleColumn(arr("titles_offsets.npy"), blob)
+    if len(titles) != shape[0]:
+        raise RuntimeError(f"{path}: titles do not match tfidf matrix rows")
+
+    with open(os.path.join(path, "title_map.json"), "r", encoding="utf-8") as f:
+        title_to_idx: Dict[str, int] = json.load(f)
+
+    return {
+        "manifest": manifest,
+        "tfidf_matrix": matrix,
+        "titles": titles,
+        "title_to_idx": title_to_idx,
+    }
+
+
+def convert_pickles(
+    df_path: str, indices_path: str, matrix_path: str, out_dir: str, precision: str = "native"
+) -> Dict[str, Any]:
+    with open(df_path, "rb") as f:
+        df = pickle.load(f)
+    if df is None or "title" not in df.columns:
+        raise RuntimeError("df.pkl must contain a DataFrame with a 'title' column")
+    with open(indices_path, "rb") as f:
+        indices = pickle.load(f)
+    with open(matrix_path, "rb") as f:
+        matrix = pickle.load(f)
+
+    titles: List[str] = df["title"].astype(str).tolist()
+    return write_artifact_dir(
+        out_dir,
+        convert(matrix, precision),
+        titles,
+        build_title_to_idx_map(indices),
+        extra={"source": "pickles"},
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    conv = sub.add_parser("convert", help="convert df/indices/tfidf_matrix pickles")
+    conv.add_argument("--df", default=os.path.join(BASE_DIR, "df.pkl"))
+    conv.add_argument("--indices", default=os.path.join(BASE_DIR, "indices.pkl"))
+    conv.add_argument("--matrix", default=os.path.join(BASE_DIR, "tfidf_matrix.pkl"))
+    conv.add_argument("--out", default=DEFAULT_ARTIFACT_DIR)
+    conv.add_argument(
+        "--precision", choices=PRECISIONS, default="native",
+        help="store float32 values or uint16/int8 quantized values (memory-only, no faster; precision.py)",
+    )
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        started = time.perf_counter()
+        manifest = convert_pickles(
+            args.df, args.indices, args.matrix, args.out, precision=args.precision
+        )
+        print(
+            f"wrote {args.out} ({manifest['n_rows']} rows, {manifest['nnz']} nnz, "
+            f"{manifest.get('quantization') or manifest['dtype']}) "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+Offline micro-benchmarks for the recommendation hot path.
+
+    python benchmark.py                          # shipped artifacts + 10k/100k/1M synthetic
+    python benchmark.py --sizes 10000 --budget 1 # quick run
+    python benchmark.py --update-baseline        # accept current numbers
+
+Benchmarks, per catalog:
+- tfidf_recommend_titles        one query title -> top 10 (exact engine)
+- tfidf_recommend_titles[mode]  same with TFIDF_PRECISION=mode (--precisions)
+- build_title_to_idx_map        normalized title map over every row
+- load_pickles[pickles]         df / indices / matrix / vectorizer pickles
+- load_pickles[artifact_dir]    memory-mapped artifact directory
+and once, catalog independent:
+- tmdb_cards_from_results       20 TMDB results -> card dicts
+- serialize[home|search_bundle] TMDB results -> response bytes, as served
+                                (dict cards + fast_json.FastJSONResponse)
+- serialize[...:models]         same through the pydantic models and
+                                FastAPI's response_model path (the old way)
+
+Each reports p50 / p99 / mean latency, throughput and peak traced memory
+(tracemalloc, measured in a separate pass so it does not skew timings).
+Results go to --out as JSON and are compared with --baseline; a benchmark
+slower than the baseline by more than the tolerance fails the run (exit 1).
+Baselines are machine specific: the committed benchmark_baseline.json was
+recorded on the reference machine (see its "meta"); elsewhere, record one
+with --update-baseline on the machine that compares.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import pickle
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import scipy
+import scipy.sparse as sp
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(BASE_DIR, "benchmark_results.json")
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+
+# main.py refuses to import without a key; nothing here talks to TMDB
+os.environ.setdefault("TMDB_API_KEY", "offline-benchmark")
+sys.path.insert(0, BASE_DIR)
+
+
+# =========================
+# MEASUREMENT
+# =========================
+def measure(
+    fn: Callable[[], Any],
+    budget: float,
+    max_iters: int,
+    min_iters: int = 5,
+    warmup: int = 1,
+    setup: Optional[Callable[[], Any]] = None,
+) -> Dict[str, float]:
+    """
+    Times fn() until `budget` seconds or `max_iters` calls (at least
+    `min_iters`). `setup` runs untimed before every call.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+
+    times: List[float] = []
+    deadline = time.perf_counter() + budget
+    while len(times) < max_iters and (len(times) < min_iters or time.perf_counter() < deadline):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    peak = peak_memory(fn, setup)
+    arr = np.asarray(times)
+    mean = float(arr.mean())
+    return {
+        "iterations": len(times),
+        "p50_ms": round(1000 * float(np.percentile(arr, 50)), 4),
+        "p99_ms": round(1000 * float(np.percentile(arr, 99)), 4),
+        "mean_ms": round(1000 * mean, 4),
+        "throughput_per_s": round(1.0 / mean, 2) if mean > 0 else 0.0,
+        "peak_mem_mb": round(peak / (1024 * 1024), 3),
+    }
+
+
+def peak_memory(fn: Callable[[], Any], setup: Optional[Callable[[], Any]] = None) -> int:
+    """Peak bytes allocated (Python + NumPy) during one call."""
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+# =========================
+# CATALOGS
+# =========================
+def synthetic_catalog(
+    n_rows: int, n_features: int = 50000, nnz_per_row: int = 60, seed: int = 0
+) -> Dict[str, Any]:
+    """
+    L2-normalized random TF-IDF-like CSR matrix (skewed term frequencies,
+    float64 like sklearn) plus unique titles.
+    """
+    rng = np.random.default_rng(seed)
+    nnz = n_rows * nnz_per_row
+    # squaring a uniform draw makes low term ids (common words) more frequent
+    indices = (n_features * rng.random(nnz) ** 2).astype(np.int32)
+    data = rng.random(nnz) + 0.05
+    indptr = np.arange(0, nnz + 1, nnz_per_row, dtype=np.int64)
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(n_rows, n_features))
+    matrix.sum_duplicates()
+    norms = np.sqrt(np.add.reduceat(matrix.data ** 2, matrix.indptr[:-1]))
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    titles = [f"Synthetic Movie {i}" for i in range(n_rows)]
+    return {"matrix": matrix, "titles": titles}
+
+
+def write_pickles(catalog: Dict[str, Any], out_dir: str) -> Dict[str, str]:
+    import pandas as pd
+
+    titles = catalog["titles"]
+    paths = {
+        "df": os.path.join(out_dir, "df.pkl"),
+        "indices": os.path.join(out_dir, "indices.pkl"),
+        "matrix": os.path.join(out_dir, "tfidf_matrix.pkl"),
+        "tfidf": os.path.join(out_dir, "tfidf.pkl"),
+    }
+    objects = {
+        "df": pd.DataFrame({"title": titles}),
+        "indices": pd.Series(np.arange(len(titles)), index=titles),
+        "matrix": catalog["matrix"],
+        "tfidf": None,  # the vectorizer is not used to serve
+    }
+    for key, path in paths.items():
+        with open(path, "wb") as f:
+            pickle.dump(objects[key], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return paths
+
+
+def use_paths(app: Any, pickles: Dict[str, str], artifact_dir: str) -> None:
+    app.DF_PATH = pickles["df"]
+    app.INDICES_PATH = pickles["indices"]
+    app.TFIDF_MATRIX_PATH = pickles["matrix"]
+    app.TFIDF_PATH = pickles["tfidf"]
+    app.ARTIFACT_DIR = artifact_dir
+
+
+def isolate(app: Any) -> None:
+    """Keep optional side tables and background loads out of the measured paths."""
+    app.FUZZY_TITLE_ENABLED = False
+    app.TFIDF_VECTORIZER_LOAD = "lazy"
+    app.TFIDF_ENGINE = "exact"
+    app.NEIGHBORS_IDX_PATH = os.path.join(tempfile.gettempdir(), "no-neighbors_idx.npy")
+    app.NEIGHBORS_SCORE_PATH = os.path.join(tempfile.gettempdir(), "no-neighbors_score.npy")
+    app.ANN_INDEX_DIR = os.path.join(tempfile.gettempdir(), "no-ann_index")
+    app.CATALOG_DELTA_DIR = os.path.join(tempfile.gettempdir(), "no-catalog_deltas")
+    app.TMDB_CARDS_PATH = os.path.join(tempfile.gettempdir(), "no-tmdb_cards.npz")
+
+
+# =========================
+# BENCHMARKS
+# =========================
+def bench_catalog(
+    app: Any, name: str, pickles: Dict[str, str], artifact_dir: Optional[str], args: Any
+) -> Dict[str, Dict[str, float]]:
+    from artifacts import build_title_to_idx_map
+
+    results: Dict[str, Dict[str, float]] = {}
+    run = lambda fn, **kw: measure(fn, args.budget, args.max_iters, **kw)  # noqa: E731
+
+    use_paths(app, pickles, os.path.join(tempfile.gettempdir(), "no-artifacts"))
+    results[f"{name}/load_pickles[pickles]"] = run(app.load_pickles, min_iters=3)
+    indices_obj = app.BUNDLE.indices_obj
+
+    if artifact_dir is not None:
+        use_paths(app, pickles, artifact_dir)
+        results[f"{name}/load_pickles[artifact_dir]"] = run(app.load_pickles, min_iters=3)
+
+    results[f"{name}/build_title_to_idx_map"] = run(
+        lambda: build_title_to_idx_map(indices_obj), min_iters=3
+    )
+
+    rng = np.random.default_rng(1)
+    titles = app.BUNDLE.titles
+    queries = [titles[int(i)] for i in rng.integers(0, len(titles), size=256)]
+    pos = [0]
+
+    def next_query() -> None:
+        pos[0] = (pos[0] + 1) % len(queries)
+
+    results[f"{name}/tfidf_recommend_titles"] = run(
+        lambda: app.tfidf_recommend_titles(queries[pos[0]], top_n=10), setup=next_query
+    )
+
+    native = app.TFIDF_PRECISION
+    try:
+        for mode in args.precisions:
+            app.TFIDF_PRECISION = mode
+            app.load_pickles()
+            results[f"{name}/tfidf_recommend_titles[{mode}]"] = run(
+                lambda: app.tfidf_recommend_titles(queries[pos[0]], top_n=10), setup=next_query
+            )
+    finally:
+        app.TFIDF_PRECISION = native
+    return results
+
+
+def bench_cards(app: Any, args: Any) -> Dict[str, Dict[str, float]]:
+    results = [
+        {
+            "id": 1000 + i,
+            "title": f"Movie {i}",
+            "poster_path": f"/poster{i}.jpg",
+            "release_date": "2001-01-01",
+            "vote_average": 7.1,
+        }
+        for i in range(20)
+    ]
+    loop = asyncio.new_event_loop()
+    try:
+        stats = measure(
+            lambda: loop.run_until_complete(app.tmdb_cards_from_results(results, limit=20)),
+            args.budget,
+            args.max_iters,
+        )
+    finally:
+        loop.close()
+    return {"tmdb_cards_from_results": stats}
+
+
+def bench_serialization(app: Any, args: Any) -> Dict[str, Dict[str, float]]:
+    """
+    Per-response cost of turning TMDB results into body bytes for /home
+    (20 cards) and /movie/search (details + 10 TF-IDF items + 20 genre
+    cards): the served dict + FastJSONResponse path against building the
+    pydantic models and letting FastAPI validate and encode them.
+    """
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    from fast_json import FastJSONResponse
+
+    results = [
+        {
+            "id": 1000 + i,
+            "title": f"Movie {i}",
+            "poster_path": f"/poster{i}.jpg" if i % 4 else None,
+            "release_date": "2001-01-01",
+            "vote_average": 7.1 + i / 10,
+        }
+        for i in range(20)
+    ]
+    recs = [(i, f"Movie {i}", 0.5 - i / 100) for i in range(10)]
+    details = app.TMDBMovieDetails(
+        tmdb_id=1, title="Movie", overview="An overview. " * 20,
+        release_date="2001-01-01", poster_url=app.make_img_url("/p.jpg"),
+        genres=[{"id": 18, "name": "Drama"}],
+    )
+    match = {"title": "Movie", "matched_title": "Movie", "score": 1.0, "path": "exact"}
+    fields = {
+        r.path: r.secure_cloned_response_field
+        for r in app.app.routes
+        if getattr(r, "path", None) in ("/home", "/movie/search")
+    }
+
+    def model_card(m: Dict[str, Any]) -> Any:
+        return app.TMDBMovieCard(
+            tmdb_id=int(m["id"]),
+            title=m.get("title") or "",
+            poster_url=app.make_img_url(m.get("poster_path")),
+            release_date=m.get("release_date"),
+            vote_average=m.get("vote_average"),
+        )
+
+    def dict_card(m: Dict[str, Any]) -> Dict[str, Any]:
+        return app.make_card(
+            m["id"], m.get("title") or "", app.make_img_url(m.get("poster_path")),
+            m.get("release_date"), m.get("vote_average"),
+        )
+
+    def served(path: str, payload: Any) -> bytes:
+        return FastJSONResponse(payload).body
+
+    def legacy(path: str, payload: Any) -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=fields[path], response_content=payload)
+        )
+        return JSONResponse(content).body
+
+    def home(card: Callable, render: Callable) -> bytes:
+        return render("/home", [card(m) for m in results])
+
+    def search_models() -> bytes:
+        cards = [model_card(m) for m in results]
+        payload = app.SearchBundleResponse(
+            query="movie",
+            movie_details=details,
+            tfidf_recommendations=[
+                app.TFIDFRecItem(title=t, score=s, tmdb=c) for (_, t, s), c in zip(recs, cards)
+            ],
+            genre_recommendations=cards,
+            tfidf_match=app.TitleMatchInfo(**match),
+        )
+        return legacy("/movie/search", payload)
+
+    def search_dicts() -> bytes:
+        cards = [dict_card(m) for m in results]
+        return served("/movie/search", {
+            "query": "movie",
+            "movie_details": details.model_dump(mode="json"),
+            "tfidf_recommendations": [
+                {"title": t, "score": s, "tmdb": c} for (_, t, s), c in zip(recs, cards)
+            ],
+            "genre_recommendations": cards,
+            "tfidf_match": match,
+        })
+
+    loop = asyncio.new_event_loop()
+    try:
+        if json.loads(home(dict_card, served)) != json.loads(home(model_card, legacy)):
+            raise AssertionError("dict cards serialize differently from TMDBMovieCard")
+        if json.loads(search_dicts()) != json.loads(search_models()):
+            raise AssertionError("search bundle dict serializes differently from the model")
+        run = lambda fn: measure(fn, args.budget, args.max_iters)  # noqa: E731
+        return {
+            "serialize[home]": run(lambda: home(dict_card, served)),
+            "serialize[home:models]": run(lambda: home(model_card, legacy)),
+            "serialize[search_bundle]": run(search_dicts),
+            "serialize[search_bundle:models]": run(search_models),
+        }
+    finally:
+        loop.close()
+
+
+# =========================
+# BASELINE
+# =========================
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+    p99_tolerance: float,
+    mem_tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Human-readable regressions; benchmarks missing from either side are skipped."""
+    failures: List[str] = []
+    for key, cur in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        checks = [
+            ("p50_ms", tolerance, min_delta_ms),
+            ("p99_ms", p99_tolerance, min_delta_ms),
+            ("peak_mem_mb", mem_tolerance, 0.5),
+        ]
+        for field, tol, floor in checks:
+            b, c = base.get(field), cur.get(field)
+            if b is None or c is None:
+                continue
+            if c > b * (1 + tol) and c - b > floor:
+                change = f" (+{100 * (c / b - 1):.0f}%)" if b else ""
+                failures.append(f"{key}: {field} {c:g} vs baseline {b:g}{change}")
+    return failures
+
+
+def print_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'benchmark':<48} {'p50_ms':>10} {'p99_ms':>10} {'ops/s':>10} {'peak_mb':>9} {'vs base':>8}")
+    for key, r in sorted(results.items()):
+        base = baseline.get(key)
+        delta = f"{100 * (r['p50_ms'] / base['p50_ms'] - 1):+.0f}%" if base and base.get("p50_ms") else ""
+        print(
+            f"{key:<48} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+            f"{r['throughput_per_s']:>10.1f} {r['peak_mem_mb']:>9.2f} {delta:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", default="10000,100000,1000000",
+        help="comma-separated synthetic catalog sizes (empty = none)",
+    )
+    parser.add_argument("--nnz-per-row", type=int, default=60)
+    parser.add_argument("--no-shipped", action="store_true", help="skip the repo's own artifacts")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds per benchmark")
+    parser.add_argument("--max-iters", type=int, default=1000)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5)
+    parser.add_argument("--mem-tolerance", type=float, default=0.25)
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=0.05,
+        help="ignore latency differences smaller than this (timer noise)",
+    )
+    parser.add_argument(
+        "--precisions", default="float32,int8",
+        help="TFIDF_PRECISION modes to benchmark tfidf_recommend_titles with (precision.py)",
+    )
+    args = parser.parse_args()
+    args.precisions = [m.strip() for m in args.precisions.split(",") if m.strip()]
+
+    import main as app
+    from artifacts import DEFAULT_ARTIFACT_DIR, is_artifact_dir, write_artifact_dir
+
+    isolate(app)
+    results: Dict[str, Dict[str, float]] = {}
+    results.update(bench_cards(app, args))
+    results.update(bench_serialization(app, args))
+
+    if not args.no_shipped and os.path.isfile(os.path.join(BASE_DIR, "df.pkl")):
+        shipped = {
+            "df": os.path.join(BASE_DIR, "df.pkl"),
+            "indices": os.path.join(BASE_DIR, "indices.pkl"),
+            "matrix": os.path.join(BASE_DIR, "tfidf_matrix.pkl"),
+            "tfidf": os.path.join(BASE_DIR, "tfidf.pkl"),
+        }
+        art = DEFAULT_ARTIFACT_DIR if is_artifact_dir(DEFAULT_ARTIFACT_DIR) else None
+        print("[bench] shipped artifacts", flush=True)
+        results.update(bench_catalog(app, "shipped", shipped, art, args))
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    for n in sizes:
+        name = f"synthetic_{n // 1000}k" if n < 1_000_000 else f"synthetic_{n // 1_000_000}m"
+        print(f"[bench] {name}: generating", flush=True)
+        catalog = synthetic_catalog(n, nnz_per_row=args.nnz_per_row)
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            pickles = write_pickles(catalog, tmp)
+            art_dir = os.path.join(tmp, "artifacts")
+            titles = catalog["titles"]
+            write_artifact_dir(
+                art_dir, catalog["matrix"], titles,
+                {t.lower(): i for i, t in enumerate(titles)},
+            )
+            del catalog
+            results.update(bench_catalog(app, name, pickles, art_dir, args))
+        gc.collect()
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    print_table(results, baseline)
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "budget_s": args.budget,
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline updated: {args.baseline}")
+        return
+    if not baseline:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+
+    failures = compare(
+        results, baseline, args.tolerance, args.p99_tolerance, args.mem_tolerance, args.min_delta_ms
+    )
+    if failures:
+        print("REGRESSIONS:")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""
+Offline build of the serving artifacts from movie metadata.
+
+    python build_index.py movies_metadata.csv
+    python build_index.py movies.parquet --workers 8 --chunksize 20000
+    python build_index.py movies.csv --vectorizer hashing --n-features 1048576
+    python build_index.py movies.csv --artifact-dir artifacts --precision float32
+
+Stages, each reported with wall time and peak RSS:
+1. read    CSV in pandas chunks, Parquet in pyarrow record batches
+2. soup    one text document per movie (catalog.build_soup) in a process
+           pool; in hashing mode the workers also hash their chunk
+3. fit     TfidfVectorizer.fit_transform over every document, or a
+           TfidfTransformer over the stacked hashed counts
+4. write   df.pkl, indices.pkl, tfidf_matrix.pkl, tfidf.pkl and, with
+           --artifact-dir, the memory-mapped directory (artifacts.py)
+
+build_manifest.json records the parameters, the input's sha256, library
+versions, per-stage timings / peak memory and a sha256 per output. Rerunning
+with the same input and parameters gives byte-identical pickles. Every file is
+written under a temporary name and renamed, so a running API (artifact
+watcher) never loads a half-written pickle.
+
+The hashing mode has no vocabulary to fit or store: memory stays flat in
+the number of distinct terms, at the cost of rare hash collisions. Its
+tfidf.pkl is a HashingTfidfVectorizer, which the API and catalog.py use
+like the fitted TfidfVectorizer.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import resource
+import shutil
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer,
+)
+
+from artifacts import build_title_to_idx_map, write_artifact_dir
+from catalog import (
+    DEFAULT_DELTA_DIR,
+    DEFAULT_SOUP_FIELDS,
+    build_soup,
+    idf_checksum,
+    list_segments,
+)
+from precision import PRECISIONS, convert
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_NAME = "build_manifest.json"
+
+# df.pkl keeps these (when present) next to the soup fields;
+# resolve_tmdb.py reads id / release_date
+DF_COLUMNS = ("title", "id", "overview", "genres", "release_date", "vote_average")
+
+# matches the shipped tfidf.pkl
+DEFAULT_MAX_FEATURES = 50000
+DEFAULT_NGRAM = (1, 2)
+DEFAULT_HASH_FEATURES = 2 ** 20
+
+
+class HashingTfidfVectorizer:
+    """
+    HashingVectorizer counts re-weighted by a fitted TfidfTransformer.
+    Exposes transform() and idf_ like a fitted TfidfVectorizer; terms map
+    to n_features hash buckets instead of a stored vocabulary.
+    """
+
+    def __init__(self, hasher: HashingVectorizer, transformer: TfidfTransformer):
+        self.hasher = hasher
+        self.transformer = transformer
+
+    @property
+    def n_features(self) -> int:
+        return int(self.hasher.n_features)
+
+    @property
+    def idf_(self) -> np.ndarray:
+        return self.transformer.idf_
+
+    @idf_.setter
+    def idf_(self, value: np.ndarray) -> None:
+        self.transformer.idf_ = value
+
+    def transform(self, docs: Sequence[str]) -> sp.csr_matrix:
+        return self.transformer.transform(self.hasher.transform(docs))
+
+
+def make_hasher(n_features: int, ngram_range: Tuple[int, int]) -> HashingVectorizer:
+    # raw non-negative counts: TfidfTransformer applies idf and l2
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=ngram_range,
+        stop_words="english",
+        alternate_sign=False,
+        norm=None,
+    )
+
+
+# =========================
+# STAGE ACCOUNTING
+# =========================
+def _reset_peak_rss() -> bool:
+    """Linux: restart the VmHWM high-water mark so each stage gets its own peak."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # process-lifetime peak (KiB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _children_peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Stages:
+    """Wall time and peak RSS per build stage, printed as they finish."""
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self.per_stage_peak = _reset_peak_rss()
+
+    def run(self, name: str, fn: Callable[[], Any]) -> Any:
+        if self.per_stage_peak:
+            _reset_peak_rss()
+        started = time.perf_counter()
+        result = fn()
+        record = {
+            "stage": name,
+            "seconds": round(time.perf_counter() - started, 3),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "workers_peak_rss_mb": round(_children_peak_rss_mb(), 1),
+        }
+        self.records.append(record)
+        print(
+            f"[build] {name:<6} {record['seconds']:>8.2f}s  peak rss {record['peak_rss_mb']:>8.1f} MB",
+            flush=True,
+        )
+        return result
+
+
+# =========================
+# READ
+# =========================
+def read_chunks(path: str, columns: Sequence[str], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Only `columns` that exist in the file, `chunksize` rows at a time."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("reading Parquet needs pyarrow: pip install pyarrow")
+        pf = pq.ParquetFile(path)
+        present = [c for c in columns if c in pf.schema_arrow.names]
+        for batch in pf.iter_batches(batch_size=chunksize, columns=present):
+            yield batch.to_pandas()
+        return
+    wanted = set(columns)
+    reader = pd.read_csv(
+        path, chunksize=chunksize, usecols=lambda c: c in wanted, low_memory=False
+    )
+    for chunk in reader:
+        yield chunk
+
+
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Drops rows without a title and coerces the numeric columns."""
+    if "title" not in chunk.columns:
+        raise SystemExit("input needs a 'title' column")
+    titles = chunk["title"].astype("string").str.strip()
+    chunk = chunk.assign(title=titles)[titles.notna() & (titles != "")]
+    if "id" in chunk.columns:
+        # raw TMDB exports have a few malformed ids
+        chunk = chunk.assign(id=pd.to_numeric(chunk["id"], errors="coerce").fillna(0).astype("int64"))
+    if "vote_average" in chunk.columns:
+        chunk = chunk.assign(vote_average=pd.to_numeric(chunk["vote_average"], errors="coerce"))
+    return chunk
+
+
+def read_input(path: str, fields: Sequence[str], chunksize: int) -> List[pd.DataFrame]:
+    columns = list(dict.fromkeys([*DF_COLUMNS, *fields]))
+    chunks = [clean_chunk(c) for c in read_chunks(path, columns, chunksize)]
+    chunks = [c for c in chunks if len(c)]
+    if not chunks:
+        raise SystemExit(f"{path}: no rows with a title")
+    return chunks
+
+
+# =========================
+# SOUP (worker processes)
+# =========================
+def chunk_documents(
+    job: Tuple[Dict[str, List[Any]], Sequence[str], Optional[Tuple[int, Tuple[int, int]]]]
+) -> Tuple[List[str], Optional[sp.csr_matrix]]:
+    """Runs in a worker: documents for one chunk, plus hashed counts in hashing mode."""
+    columns, fields, hashing = job
+    n = len(columns["title"])
+    records = ({k: v[i] for k, v in columns.items()} for i in range(n))
+    docs = [build_soup(_none_for_nan(rec), fields) for rec in records]
+    if hashing is None:
+        return docs, None
+    n_features, ngram_range = hashing
+    return docs, make_hasher(n_features, ngram_range).transform(docs)
+
+
+def _none_for_nan(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (None if isinstance(v, float) and v != v else v) for k, v in record.items()}
+
+
+def build_documents(
+    chunks: List[pd.DataFrame],
+    fields: Sequence[str],
+    workers: int,
+    hashing: Optional[Tuple[int, Tuple[int, int]]] = None,
+) -> Tuple[List[str], Optional[sp.csr_matrix]]:
+    jobs = [
+        ({c: chunk[c].tolist() for c in chunk.columns if c in fields or c == "title"}, list(fields), hashing)
+        for chunk in chunks
+    ]
+    if workers > 1 and len(jobs) > 1:
+        with multiprocessing.get_context().Pool(processes=min(workers, len(jobs))) as pool:
+            results = pool.map(chunk_documents, jobs, chunksize=1)
+    else:
+        results = [chunk_documents(job) for job in jobs]
+    docs = [d for chunk_docs, _ in results for d in chunk_docs]
+    counts = sp.vstack([c for _, c in results], format="csr") if hashing else None
+    return docs, counts
+
+
+# =========================
+# FIT
+# =========================
+def fit_tfidf(
+    docs: List[str], max_features: Optional[int], ngram_range: Tuple[int, int], min_df: int
+) -> Tuple[TfidfVectorizer, sp.csr_matrix]:
+    vectorizer = TfidfVectorizer(
+        stop_words="english",
+        max_features=max_features,
+        ngram_range=ngram_range,
+        min_df=min_df,
+    )
+    matrix = vectorizer.fit_transform(docs)
+    # introspection / cache attributes whose pickled bytes vary between runs
+    # (a set, an id()); dropping them keeps tfidf.pkl reproducible
+    vectorizer.stop_words_ = None
+    vectorizer.__dict__.pop("_stop_words_id", None)
+    return vectorizer, matrix
+
+
+def fit_hashing(
+    counts: sp.csr_matrix, n_features: int, ngram_range: Tuple[int, int]
+) -> Tuple[HashingTfidfVectorizer, sp.csr_matrix]:
+    transformer = TfidfTransformer()
+    matrix = transformer.fit_transform(counts)
+    return HashingTfidfVectorizer(make_hasher(n_features, ngram_range), transformer), matrix
+
+
+# =========================
+# WRITE
+# =========================
+def sha256_file(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def dump_atomic(obj: Any, path: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def write_outputs(
+    out_dir: str,
+    df: pd.DataFrame,
+    matrix: sp.csr_matrix,
+    vectorizer: Any,
+    artifact_dir: Optional[str],
+    precision: str,
+) -> Dict[str, str]:
+    """Writes every artifact; returns {name: path}."""
+    os.makedirs(out_dir, exist_ok=True)
+    indices = pd.Series(df.index, index=df["title"])
+    matrix = sp.csr_matrix(matrix)
+    matrix.sort_indices()
+    paths = {
+        "df": os.path.join(out_dir, "df.pkl"),
+        "indices": os.path.join(out_dir, "indices.pkl"),
+        "tfidf_matrix": os.path.join(out_dir, "tfidf_matrix.pkl"),
+        "tfidf": os.path.join(out_dir, "tfidf.pkl"),
+    }
+    # vectorizer and df first: the API reloads once tfidf_matrix.pkl is in place
+    dump_atomic(vectorizer, paths["tfidf"])
+    dump_atomic(df, paths["df"])
+    dump_atomic(indices, paths["indices"])
+    dump_atomic(matrix, paths["tfidf_matrix"])
+
+    if artifact_dir:
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        staging = f"{artifact_dir}.build-{stamp}"
+        write_artifact_dir(
+            staging,
+            convert(matrix, precision),
+            df["title"].tolist(),
+            build_title_to_idx_map(indices),
+            extra={"source": "build_index", "idf_sha1": idf_checksum(vectorizer)},
+        )
+        old = None
+        if os.path.exists(artifact_dir):
+            old = f"{artifact_dir}.old-{stamp}"
+            os.rename(artifact_dir, old)
+        os.rename(staging, artifact_dir)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        paths["artifact_dir"] = artifact_dir
+    return paths
+
+
+def output_checksums(paths: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, path in paths.items():
+        files = (
+            sorted(os.path.join(path, f) for f in os.listdir(path))
+            if os.path.isdir(path) else [path]
+        )
+        for f in files:
+            key = name if f == path else f"{name}/{os.path.basename(f)}"
+            out[key] = {"bytes": os.path.getsize(f), "sha256": sha256_file(f)}
+    return out
+
+
+# =========================
+# CLI
+# =========================
+def build(args: argparse.Namespace) -> Dict[str, Any]:
+    started = time.perf_counter()
+    fields = [s.strip() for s in args.fields.split(",") if s.strip()]
+    ngram_range = (args.ngram_min, args.ngram_max)
+    hashing = (args.n_features, ngram_range) if args.vectorizer == "hashing" else None
+    stages = Stages()
+
+    chunks = stages.run("read", lambda: read_input(args.input, fields, args.chunksize))
+    docs, counts = stages.run(
+        "soup", lambda: build_documents(chunks, fields, args.workers, hashing)
+    )
+    df = pd.concat(chunks, ignore_index=True)
+    df = df[[c for c in dict.fromkeys([*DF_COLUMNS, *fields]) if c in df.columns]]
+    df["title"] = df["title"].astype(str)
+    del chunks
+
+    if hashing:
+        vectorizer, matrix = stages.run(
+            "fit", lambda: fit_hashing(counts, args.n_features, ngram_range)
+        )
+        del counts
+    else:
+        vectorizer, matrix = stages.run(
+            "fit", lambda: fit_tfidf(docs, args.max_features or None, ngram_range, args.min_df)
+        )
+    del docs
+
+    paths = stages.run(
+        "write",
+        lambda: write_outputs(
+            args.out_dir, df, matrix, vectorizer, args.artifact_dir, args.precision
+        ),
+    )
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "input": {
+            "path": os.path.abspath(args.input),
+            "bytes": os.path.getsize(args.input),
+            "sha256": sha256_file(args.input),
+        },
+        "params": {
+            "fields": fields,
+            "vectorizer": args.vectorizer,
+            "max_features": None if hashing else args.max_features,
+            "n_features": args.n_features if hashing else None,
+            "ngram_range": list(ngram_range),
+            "min_df": args.min_df,
+            "chunksize": args.chunksize,
+            "workers": args.workers,
+            "precision": args.precision if args.artifact_dir else None,
+        },
+        "n_rows": int(matrix.shape[0]),
+        "n_features": int(matrix.shape[1]),
+        "nnz": int(matrix.nnz),
+        "empty_documents": int((matrix.getnnz(axis=1) == 0).sum()),
+        "stages": stages.records,
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "per_stage_peak": stages.per_stage_peak,
+        "versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "pandas": pd.__version__,
+            "scikit-learn": sklearn.__version__,
+        },
+        "outputs": output_checksums(paths),
+    }
+    manifest_path = os.path.join(args.out_dir, MANIFEST_NAME)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="movie metadata .csv or .parquet (needs a title column)")
+    parser.add_argument("--out-dir", default=BASE_DIR, help="where the pickles and manifest go")
+    parser.add_argument("--artifact-dir", default=None, help="also write a memory-mapped artifact directory")
+    parser.add_argument("--precision", choices=PRECISIONS, default="native", help="artifact directory precision (uint16/int8 save memory only)")
+    parser.add_argument(
+        "--fields", default=os.getenv("CATALOG_SOUP_FIELDS", ",".join(DEFAULT_SOUP_FIELDS)),
+        help="comma-separated text fields joined into each document (keep in sync with the API)",
+    )
+    parser.add_argument("--vectorizer", choices=("tfidf", "hashing"), default="tfidf")
+    parser.add_argument("--max-features", type=int, default=DEFAULT_MAX_FEATURES, help="tfidf mode; 0 = no limit")
+    parser.add_argument("--n-features", type=int, default=DEFAULT_HASH_FEATURES, help="hashing mode buckets")
+    parser.add_argument("--ngram-min", type=int, default=DEFAULT_NGRAM[0])
+    parser.add_argument("--ngram-max", type=int, default=DEFAULT_NGRAM[1])
+    parser.add_argument("--min-df", type=int, default=1)
+    parser.add_argument("--chunksize", type=int, default=50000, help="rows per read chunk / soup job")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--delta-dir", default=os.getenv("CATALOG_DELTA_DIR", DEFAULT_DELTA_DIR))
+    args = parser.parse_args()
+
+    manifest = build(args)
+    print(
+        f"built {manifest['n_rows']} rows x {manifest['n_features']} features "
+        f"({manifest['nnz']} nnz) in {manifest['total_seconds']:.1f}s; "
+        f"manifest: {os.path.join(args.out_dir, MANIFEST_NAME)}"
+    )
+    if manifest["empty_documents"]:
+        print(f"note: {manifest['empty_documents']} movies have no text in {args.fields!r}")
+    if list_segments(args.delta_dir):
+        print(
+            f"warning: {args.delta_dir} still holds catalog delta segments for the previous "
+            "base; remove them (or include those movies in the input) before serving"
+        )
+
+
+if __name__ == "__main__":
+    # run from the importable module: tfidf.pkl must reference
+    # build_index.HashingTfidfVectorizer, not __main__
+    import build_index
+
+    build_index.main()
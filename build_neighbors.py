@@ -0,0 +1,84 @@
+"""
+Precompute the top-K TF-IDF neighbours of every catalog row.
+
+    python build_neighbors.py --k 50
+
+Writes two fixed-width arrays next to the pickles:
+- neighbors_idx.npy    int32   (n_rows x K) neighbour rows, best first
+- neighbors_score.npy  float32 (n_rows x K) cosine scores
+
+The API memory-maps them, so /recommend/tfidf and /movie/search become an
+O(K) slice instead of a full-catalog product + sort. Rebuild whenever
+tfidf_matrix.pkl changes.
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+
+from similarity import DEFAULT_BLOCK_BYTES, chunked_topk
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TFIDF_MATRIX_PATH = os.path.join(BASE_DIR, "tfidf_matrix.pkl")
+NEIGHBORS_IDX_PATH = os.path.join(BASE_DIR, "neighbors_idx.npy")
+NEIGHBORS_SCORE_PATH = os.path.join(BASE_DIR, "neighbors_score.npy")
+
+
+def build_neighbors(
+    matrix,
+    k: int,
+    idx_path: str,
+    score_path: str,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+) -> None:
+    matrix = matrix.tocsr()
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    # write through memmaps so the full table never has to fit in RAM
+    idx_out = np.lib.format.open_memmap(idx_path, mode="w+", dtype=np.int32, shape=(n, k))
+    score_out = np.lib.format.open_memmap(
+        score_path, mode="w+", dtype=np.float32, shape=(n, k)
+    )
+
+    started = time.perf_counter()
+    for start, stop, idx, sc in chunked_topk(
+        matrix, matrix, k, exclude=np.arange(n), block_bytes=block_bytes
+    ):
+        idx_out[start:stop] = idx
+        score_out[start:stop] = sc
+        elapsed = time.perf_counter() - started
+        print(f"{stop}/{n} rows ({stop / max(elapsed, 1e-9):.0f} rows/s)")
+
+    idx_out.flush()
+    score_out.flush()
+    del idx_out, score_out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matrix", default=TFIDF_MATRIX_PATH)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--idx-out", default=NEIGHBORS_IDX_PATH)
+    parser.add_argument("--score-out", default=NEIGHBORS_SCORE_PATH)
+    parser.add_argument(
+        "--block-mb",
+        type=int,
+        default=DEFAULT_BLOCK_BYTES // (1024 * 1024),
+        help="memory budget for one dense score block",
+    )
+    args = parser.parse_args()
+
+    with open(args.matrix, "rb") as f:
+        matrix = pickle.load(f)
+
+    build_neighbors(
+        matrix, args.k, args.idx_out, args.score_out, block_bytes=args.block_mb * 1024 * 1024
+    )
+    print(f"wrote {args.idx_out} and {args.score_out}")
+
+
+if __name__ == "__main__":
+    main()
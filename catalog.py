@@ -0,0 +1,615 @@
+"""
+Incremental catalog updates without refitting the TF-IDF model.
+
+    python catalog.py append new_movies.jsonl      # write a delta segment
+    python catalog.py compact                      # fold deltas in, refresh IDF
+    python catalog.py status
+
+New movies are turned into TF-IDF rows with the existing vectorizer
+(vocabulary and IDF unchanged), appended after the current rows and
+persisted as a delta segment in CATALOG_DELTA_DIR:
+
+    catalog_deltas/000001/rows.npz   CSR rows (scipy.sparse.save_npz)
+    catalog_deltas/000001/meta.json  row_offset, titles, created_at
+
+The API merges segments at startup. Compaction recomputes IDF from the
+document frequencies of every row (base + deltas), re-weights the stored
+rows in place of a refit, writes a fresh artifact directory holding the
+updated vectorizer (the base tfidf.pkl is left alone), and deletes the
+folded segments.
+
+Re-weighting works because rows are l2-normalized tf * idf: dividing by the
+old IDF leaves tf up to a per-row factor, which the final normalization
+removes. New terms outside the fitted vocabulary are dropped until the next
+full rebuild.
+"""
+
+import argparse
+import ast
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifacts import (
+    DEFAULT_ARTIFACT_DIR,
+    MANIFEST_NAME,
+    is_artifact_dir,
+    load_artifact_dir,
+    norm_title,
+    write_artifact_dir,
+)
+from precision import QuantizedCSR, convert, matrix_precision
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DELTA_DIR = os.path.join(BASE_DIR, "catalog_deltas")
+DEFAULT_VECTORIZER_PATH = os.path.join(BASE_DIR, "tfidf.pkl")
+# re-weighted vectorizer stored inside a compacted artifact directory
+VECTORIZER_FILE = "tfidf.pkl"
+
+# Spare room append_rows leaves after a full copy, as a fraction of the
+# copied size; appends that fit write into it instead of copying again
+APPEND_HEADROOM = 0.125
+
+# The shipped matrix is vectorizer.transform(overview); keep new rows comparable
+DEFAULT_SOUP_FIELDS = ("overview",)
+
+
+def build_soup(record: Dict[str, Any], fields: Sequence[str] = DEFAULT_SOUP_FIELDS) -> str:
+    """
+    Text fed to the vectorizer for one movie. List fields are joined;
+    TMDB-style [{"name": ...}] genre/keyword lists use the names, also
+    when given as their string repr (raw movies_metadata.csv columns).
+    """
+    parts: List[str] = []
+    for field in fields:
+        value = record.get(field)
+        if value is None:
+            continue
+        if isinstance(value, str) and value.startswith("[{"):
+            try:
+                value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                pass
+        if isinstance(value, (list, tuple)):
+            for v in value:
+                parts.append(str(v.get("name", "")) if isinstance(v, dict) else str(v))
+        else:
+            parts.append(str(value))
+    return " ".join(p for p in parts if p and p != "nan")
+
+
+def idf_checksum(vectorizer: Any) -> str:
+    return hashlib.sha1(np.ascontiguousarray(vectorizer.idf_).tobytes()).hexdigest()[:16]
+
+
+class AppendedTitles(Sequence[str]):
+    """Read-only view of a base title sequence followed by appended titles."""
+
+    def __init__(self, base: Sequence[str], extra: Optional[List[str]] = None):
+        self._base = base
+        self._extra: List[str] = list(extra or [])
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._extra)
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        n = len(self._base)
+        if i < n:
+            return self._base[i]
+        return self._extra[i - n]
+
+
+def append_titles(titles: Sequence[str], new: List[str]) -> Sequence[str]:
+    """`titles` followed by `new`; the base sequence is shared, not copied."""
+    if isinstance(titles, AppendedTitles):
+        return AppendedTitles(titles._base, titles._extra + new)
+    return AppendedTitles(titles, new)
+
+
+class AppendedTitleMap(Mapping[str, int]):
+    """Read-only title map: appended keys over a shared base map."""
+
+    def __init__(self, base: Mapping[str, int], extra: Optional[Dict[str, int]] = None):
+        self._base = base
+        self._extra: Dict[str, int] = dict(extra or {})
+
+    def __getitem__(self, key: str) -> int:
+        if key in self._extra:
+            return self._extra[key]
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._extra or key in self._base
+
+    def __iter__(self) -> Iterator[str]:
+        # dict.update order: re-pointed keys keep their place
+        yield from self._base
+        for key in self._extra:
+            if key not in self._base:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._base) + sum(1 for key in self._extra if key not in self._base)
+
+
+def extend_title_map(title_to_idx: Mapping[str, int], new: Dict[str, int]) -> Mapping[str, int]:
+    """`title_to_idx` with `new` keys added or re-pointed; the base map is shared."""
+    if isinstance(title_to_idx, AppendedTitleMap):
+        return AppendedTitleMap(title_to_idx._base, {**title_to_idx._extra, **new})
+    return AppendedTitleMap(title_to_idx, new)
+
+
+def transform_records(
+    vectorizer: Any,
+    records: List[Dict[str, Any]],
+    fields: Sequence[str] = DEFAULT_SOUP_FIELDS,
+) -> Tuple[sp.csr_matrix, List[str]]:
+    """(TF-IDF rows, titles) for new movies; records need a 'title'."""
+    titles: List[str] = []
+    soups: List[str] = []
+    for k, rec in enumerate(records):
+        title = str(rec.get("title") or "").strip()
+        if not title:
+            raise ValueError(f"record {k} has no title")
+        titles.append(title)
+        soups.append(build_soup(rec, fields))
+    rows = sp.csr_matrix(vectorizer.transform(soups))
+    rows.sort_indices()
+    return rows, titles
+
+
+# =========================
+# DELTA SEGMENTS
+# =========================
+def list_segments(delta_dir: str) -> List[str]:
+    if not os.path.isdir(delta_dir):
+        return []
+    names = sorted(
+        n for n in os.listdir(delta_dir)
+        if n.isdigit() and os.path.isfile(os.path.join(delta_dir, n, "meta.json"))
+    )
+    return [os.path.join(delta_dir, n) for n in names]
+
+
+def segments_end(delta_dir: str) -> int:
+    """Row after the last delta segment (0 without segments)."""
+    segments = list_segments(delta_dir)
+    if not segments:
+        return 0
+    meta = read_meta(segments[-1])
+    return int(meta["row_offset"]) + int(meta["n_rows"])
+
+
+def write_segment(
+    delta_dir: str,
+    rows: sp.csr_matrix,
+    titles: List[str],
+    row_offset: int,
+    idf: Optional[str] = None,
+) -> str:
+    existing = list_segments(delta_dir)
+    seq = int(os.path.basename(existing[-1])) + 1 if existing else 1
+    final = os.path.join(delta_dir, f"{seq:06d}")
+    tmp = final + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    sp.save_npz(os.path.join(tmp, "rows.npz"), rows, compressed=False)
+    meta = {
+        "row_offset": int(row_offset),
+        "n_rows": int(rows.shape[0]),
+        "n_features": int(rows.shape[1]),
+        "titles": titles,
+        "idf_sha1": idf,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, final)  # a segment is visible only once complete
+    return final
+
+
+def read_meta(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_rows(path: str, meta: Dict[str, Any]) -> sp.csr_matrix:
+    rows = sp.load_npz(os.path.join(path, "rows.npz")).tocsr()
+    if rows.shape[0] != len(meta["titles"]):
+        raise RuntimeError(f"{path}: rows and titles disagree")
+    return rows
+
+
+def merge_segments(
+    matrix: Any,
+    titles: Sequence[str],
+    title_to_idx: Dict[str, int],
+    delta_dir: str,
+    idf: Optional[str] = None,
+) -> Tuple[Any, Sequence[str], int]:
+    """
+    Appends the delta segments that start at or after the matrix's last
+    row and extends title_to_idx in place. Segments already covered (e.g.
+    folded by a compaction that stopped before deleting them) are skipped.
+    With `idf` (the base's idf_sha1), a segment transformed with other IDF
+    weights is rejected: its scores would not be comparable.
+    Returns (matrix, titles, segments merged).
+    """
+    blocks = [matrix]
+    new_titles: List[str] = []
+    n_rows = matrix.shape[0]
+    for path in list_segments(delta_dir):
+        meta = read_meta(path)
+        if meta["row_offset"] + meta["n_rows"] <= matrix.shape[0]:
+            continue
+        if meta["row_offset"] != n_rows:
+            raise RuntimeError(
+                f"{path}: segment starts at row {meta['row_offset']} but the catalog "
+                f"has {n_rows} rows; it belongs to a different base, remove it or rebuild"
+            )
+        if idf and meta.get("idf_sha1") and meta["idf_sha1"] != idf:
+            raise RuntimeError(
+                f"{path}: rows were transformed with IDF {meta['idf_sha1']} but the "
+                f"catalog uses {idf}; remove the segment and append its movies again"
+            )
+        rows = read_rows(path, meta)
+        if rows.shape[1] != matrix.shape[1]:
+            raise RuntimeError(f"{path}: vocabulary size differs from the TF-IDF matrix")
+        for k, t in enumerate(meta["titles"]):
+            title_to_idx[norm_title(t)] = n_rows + k
+        new_titles.extend(meta["titles"])
+        blocks.append(rows)
+        n_rows += rows.shape[0]
+    if len(blocks) == 1:
+        return matrix, titles, 0
+    merged = append_rows(blocks[0], *blocks[1:])
+    return merged, append_titles(titles, new_titles), len(blocks) - 1
+
+
+class _AppendBuffers:
+    """
+    Arrays with spare room at the end, behind a chain of appended matrices.
+    Each matrix in the chain reads a prefix of them. Only the newest one,
+    whose prefixes end where the written part ends, may write further, so
+    older matrices (still served by older bundles) never change.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.used = {name: 0 for name in arrays}
+
+    def extends(self, parts: Dict[str, np.ndarray], dtypes: Dict[str, Any]) -> bool:
+        return all(
+            part.base is self.arrays[name]
+            and len(part) == self.used[name]
+            and self.arrays[name].dtype == dtypes[name]
+            for name, part in parts.items()
+        )
+
+    def room(self, sizes: Dict[str, int]) -> bool:
+        return all(sizes[name] <= len(self.arrays[name]) for name in sizes)
+
+
+def _append_arrays(
+    owner: Any,
+    parts: Dict[str, np.ndarray],
+    tails: Dict[str, np.ndarray],
+    dtypes: Dict[str, Any],
+) -> Tuple[Dict[str, np.ndarray], _AppendBuffers]:
+    """
+    parts[name] + tails[name] for every array. Writes after `owner`'s
+    arrays when they end its append buffers and the tails fit; otherwise
+    copies everything into new buffers with APPEND_HEADROOM to spare.
+    """
+    sizes = {name: len(parts[name]) + len(tails[name]) for name in parts}
+    buffers = getattr(owner, "_append_buffers", None)
+    if buffers is None or not buffers.extends(parts, dtypes) or not buffers.room(sizes):
+        buffers = _AppendBuffers({
+            name: np.empty(int(sizes[name] * (1 + APPEND_HEADROOM)) + 1, dtype=dtypes[name])
+            for name in parts
+        })
+        for name, part in parts.items():
+            buffers.arrays[name][: len(part)] = part
+    for name, tail in tails.items():
+        start = len(parts[name])
+        buffers.arrays[name][start : sizes[name]] = tail
+        buffers.used[name] = sizes[name]
+    return {name: buffers.arrays[name][: sizes[name]] for name in parts}, buffers
+
+
+def append_rows(matrix: Any, *rows: sp.csr_matrix) -> Any:
+    """
+    New matrix with `rows` below `matrix`, in the matrix's precision.
+    `matrix` is never modified (mmap'd input stays untouched). The result
+    keeps spare room, so a series of appends costs about the size of the
+    appended rows, not a copy of the whole matrix each time.
+    """
+    if not rows:
+        return matrix
+    quantized = isinstance(matrix, QuantizedCSR)
+    if quantized:
+        blocks = [QuantizedCSR.from_csr(r, matrix.mode) for r in rows]
+    else:
+        blocks = [sp.csr_matrix(r, dtype=matrix.dtype, copy=True) for r in rows]
+        for b in blocks:
+            b.sort_indices()
+    n_rows = matrix.shape[0] + sum(b.shape[0] for b in blocks)
+    nnz = matrix.nnz + sum(b.nnz for b in blocks)
+    index_dtype = np.int32 if nnz < np.iinfo(np.int32).max else np.int64
+
+    ends = np.cumsum([matrix.nnz] + [b.nnz for b in blocks])
+    parts = {
+        "data": matrix.data[: matrix.nnz],
+        "indices": matrix.indices[: matrix.nnz],
+        "indptr": matrix.indptr[: matrix.shape[0] + 1],
+    }
+    tails = {
+        "data": np.concatenate([b.data[: b.nnz] for b in blocks]),
+        "indices": np.concatenate([b.indices[: b.nnz] for b in blocks]),
+        "indptr": np.concatenate(
+            [b.indptr[1:].astype(np.int64) + ends[k] for k, b in enumerate(blocks)]
+        ),
+    }
+    dtypes = {"data": matrix.data.dtype, "indices": index_dtype, "indptr": index_dtype}
+    if quantized:
+        parts["scales"] = matrix.scales
+        tails["scales"] = np.concatenate([b.scales for b in blocks])
+        dtypes["scales"] = np.float32
+    arrays, buffers = _append_arrays(matrix, parts, tails, dtypes)
+
+    if quantized:
+        out = QuantizedCSR(
+            arrays["data"], arrays["indices"], arrays["indptr"], arrays["scales"],
+            (n_rows, matrix.shape[1]),
+        )
+    else:
+        # rows were checked when they joined the chain: skip the O(nnz) scans
+        out = sp.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(n_rows, matrix.shape[1]), copy=False,
+        )
+        if matrix.has_sorted_indices:
+            out.has_sorted_indices = True
+        else:
+            out.sort_indices()
+    out._append_buffers = buffers
+    return out
+
+
+@contextlib.contextmanager
+def segment_lock(delta_dir: str) -> Iterator[None]:
+    """
+    Exclusive lock across processes (API workers, CLI) for appending or
+    compacting, so two writers cannot claim the same row offset.
+    """
+    os.makedirs(delta_dir, exist_ok=True)
+    with open(os.path.join(delta_dir, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# =========================
+# COMPACTION
+# =========================
+def smooth_idf(doc_freq: np.ndarray, n_docs: int) -> np.ndarray:
+    """sklearn's smooth_idf=True formula."""
+    return np.log((1.0 + n_docs) / (1.0 + doc_freq)) + 1.0
+
+
+def reweight_idf(matrix: Any, old_idf: np.ndarray) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """
+    New (matrix, idf) with IDF recomputed from the rows' document
+    frequencies. Rows stay l2-normalized. Quantized input is re-weighted
+    from its dequantized (float32) values.
+    """
+    if isinstance(matrix, QuantizedCSR):
+        matrix = matrix.dequantize()
+    m = sp.csr_matrix(matrix, copy=True)
+    m.sum_duplicates()
+    doc_freq = np.bincount(m.indices, minlength=m.shape[1])
+    new_idf = smooth_idf(doc_freq, m.shape[0])
+    m.data = (m.data * (new_idf / old_idf)[m.indices]).astype(m.data.dtype, copy=False)
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    m.data /= np.repeat(norms, np.diff(m.indptr))
+    return m, new_idf
+
+
+def set_idf(vectorizer: Any, idf: np.ndarray) -> None:
+    vectorizer.idf_ = idf.astype(np.float64)
+
+
+def read_manifest(artifact_dir: str) -> Dict[str, Any]:
+    """The artifact directory's manifest, {} without one."""
+    try:
+        with open(os.path.join(artifact_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def vectorizer_path(artifact_dir: str, default: str = DEFAULT_VECTORIZER_PATH) -> str:
+    """The vectorizer a compaction stored in `artifact_dir`, else `default`."""
+    name = read_manifest(artifact_dir).get("vectorizer")
+    return os.path.join(artifact_dir, name) if name else default
+
+
+def check_vectorizer(artifact_dir: str, vectorizer: Any) -> None:
+    """
+    Raises RuntimeError when the catalog on disk records other IDF weights
+    than `vectorizer` (e.g. another process compacted since it was loaded).
+    Call with segment_lock held, right before writing a segment.
+    """
+    on_disk = read_manifest(artifact_dir).get("idf_sha1")
+    loaded = idf_checksum(vectorizer)
+    if on_disk and on_disk != loaded:
+        raise RuntimeError(
+            f"{artifact_dir} uses IDF {on_disk} but the vectorizer has {loaded} (the "
+            "catalog was compacted since it was loaded); reload before appending"
+        )
+
+
+def write_compacted(
+    artifact_dir: str,
+    matrix: sp.csr_matrix,
+    titles: Sequence[str],
+    title_to_idx: Dict[str, int],
+    vectorizer: Any,
+) -> Dict[str, Any]:
+    """
+    Writes the new artifact directory, re-weighted vectorizer included,
+    next to `artifact_dir` and swaps it in with renames. Readers with the
+    old files memory-mapped keep working (POSIX unlink).
+    """
+    parent = os.path.dirname(os.path.abspath(artifact_dir))
+    os.makedirs(parent, exist_ok=True)
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    staging = f"{artifact_dir}.compact-{stamp}"
+    os.makedirs(staging, exist_ok=True)
+    with open(os.path.join(staging, VECTORIZER_FILE), "wb") as f:
+        pickle.dump(vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = write_artifact_dir(
+        staging, matrix, list(titles), title_to_idx,
+        extra={
+            "source": "compaction",
+            "idf_sha1": idf_checksum(vectorizer),
+            "vectorizer": VECTORIZER_FILE,
+        },
+    )
+    old = None
+    if os.path.exists(artifact_dir):
+        old = f"{artifact_dir}.old-{stamp}"
+        os.rename(artifact_dir, old)
+    os.rename(staging, artifact_dir)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def remove_segments(paths: Iterable[str]) -> None:
+    for p in paths:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+# =========================
+# CLI (offline, on the files)
+# =========================
+def read_records(path: str) -> List[Dict[str, Any]]:
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data["movies"] if isinstance(data, dict) else data
+    import pandas as pd
+
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return df.to_dict(orient="records")
+
+
+def load_base(args: Any) -> Tuple[Any, Sequence[str], Dict[str, int]]:
+    if is_artifact_dir(args.artifact_dir):
+        art = load_artifact_dir(args.artifact_dir, mmap=True)
+        return art["tfidf_matrix"], art["titles"], art["title_to_idx"]
+    from artifacts import build_title_to_idx_map
+
+    with open(os.path.join(BASE_DIR, "df.pkl"), "rb") as f:
+        df = pickle.load(f)
+    with open(os.path.join(BASE_DIR, "indices.pkl"), "rb") as f:
+        indices = pickle.load(f)
+    with open(os.path.join(BASE_DIR, "tfidf_matrix.pkl"), "rb") as f:
+        matrix = pickle.load(f)
+    return matrix, df["title"].astype(str).tolist(), build_title_to_idx_map(indices)
+
+
+def base_row_count(args: Any) -> int:
+    if is_artifact_dir(args.artifact_dir):
+        with open(os.path.join(args.artifact_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            return int(json.load(f)["n_rows"])
+    with open(os.path.join(BASE_DIR, "tfidf_matrix.pkl"), "rb") as f:
+        return int(pickle.load(f).shape[0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--artifact-dir", default=os.getenv("ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR))
+    parser.add_argument("--delta-dir", default=os.getenv("CATALOG_DELTA_DIR", DEFAULT_DELTA_DIR))
+    parser.add_argument(
+        "--vectorizer", default=None,
+        help="default: the artifact directory's compacted vectorizer, else ./tfidf.pkl",
+    )
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    app = sub.add_parser("append", help="transform new movies into a delta segment")
+    app.add_argument("path", help=".jsonl / .json / .csv / .parquet with title + text fields")
+    app.add_argument(
+        "--fields", default=os.getenv("CATALOG_SOUP_FIELDS", ",".join(DEFAULT_SOUP_FIELDS)),
+        help="comma-separated text fields joined into the document",
+    )
+    sub.add_parser("compact", help="merge delta segments and recompute IDF")
+    sub.add_parser("status", help="list delta segments")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.cmd == "status":
+        for path in list_segments(args.delta_dir):
+            meta = read_meta(path)
+            print(f"{os.path.basename(path)}  rows {meta['row_offset']}..{meta['row_offset'] + meta['n_rows'] - 1}  {meta['created_at']}")
+        return
+
+    with open(args.vectorizer or vectorizer_path(args.artifact_dir), "rb") as f:
+        vectorizer = pickle.load(f)
+
+    if args.cmd == "append":
+        records = read_records(args.path)
+        fields = [s.strip() for s in args.fields.split(",") if s.strip()]
+        rows, titles = transform_records(vectorizer, records, fields)
+        with segment_lock(args.delta_dir):
+            check_vectorizer(args.artifact_dir, vectorizer)
+            offset = base_row_count(args)
+            for path in list_segments(args.delta_dir):
+                meta = read_meta(path)
+                offset = max(offset, meta["row_offset"] + meta["n_rows"])
+            seg = write_segment(args.delta_dir, rows, titles, offset, idf_checksum(vectorizer))
+        print(f"wrote {seg}: {len(titles)} rows at offset {offset} "
+              f"in {time.perf_counter() - started:.2f}s")
+        return
+
+    if args.cmd == "compact":
+        with segment_lock(args.delta_dir):
+            matrix, titles, title_to_idx = load_base(args)
+            segments = list_segments(args.delta_dir)
+            matrix, titles, _ = merge_segments(
+                matrix, titles, title_to_idx, args.delta_dir,
+                read_manifest(args.artifact_dir).get("idf_sha1"),
+            )
+            new_matrix, new_idf = reweight_idf(matrix, np.asarray(vectorizer.idf_))
+            set_idf(vectorizer, new_idf)
+            if isinstance(matrix, QuantizedCSR):
+                # keep the directory's storage mode
+                new_matrix = convert(new_matrix, matrix_precision(matrix))
+            manifest = write_compacted(
+                args.artifact_dir, new_matrix, titles, title_to_idx, vectorizer
+            )
+            remove_segments(segments)
+        print(f"compacted {len(segments)} segments into {args.artifact_dir} "
+              f"({manifest['n_rows']} rows) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
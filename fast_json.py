@@ -0,0 +1,53 @@
+"""
+JSON encoding for the card-heavy responses.
+
+orjson (requirements.txt), or stdlib json when it is missing; both produce
+the same compact UTF-8 output, with NaN / infinity written as null.
+FastJSONResponse renders plain dicts and lists as is: a route that returns
+one skips FastAPI's response_model validation and jsonable_encoder pass.
+Only use it for payloads built from trusted internal data, and keep
+response_model on the decorator so the OpenAPI schema does not change.
+"""
+
+import json
+import math
+from typing import Any
+
+import numpy as np
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _plain(obj: Any) -> Any:
+    """Mirror orjson: NumPy values as Python ones, NaN / inf as None."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return _plain(obj.tolist())
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        _plain(obj), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("feeds")
+
+Fetcher = Callable[[], Awaitable[Any]]
+
+
+class _Pool:
+    __slots__ = (
+        "name", "fetch", "interval", "value", "updated_at", "updated_wall",
+        "last_error", "failures", "refreshes", "next_at", "task",
+    )
+
+    def __init__(self, name: str, fetch: Fetcher, interval: float):
+        self.name = name
+        self.fetch = fetch
+        self.interval = interval
+        self.value: Any = None
+        self.updated_at: Optional[float] = None  # monotonic
+        self.updated_wall: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failures = 0  # consecutive
+        self.refreshes = 0
+        self.next_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class FeedScheduler:
+    """
+    Keeps slowly changing upstream lists (home categories, genre discover
+    pages) warm in memory:
+    - each pool refreshes every `interval` seconds, +/- `jitter` (fraction)
+      so pools and workers do not hit the upstream in lockstep
+    - a failed refresh keeps the last good value and retries with
+      exponential backoff from `retry_delay`, capped at the interval
+    - get() never waits on the network; None means "not loaded yet"
+    """
+
+    def __init__(self, interval: float = 600.0, jitter: float = 0.1, retry_delay: float = 30.0):
+        self.interval = interval
+        self.jitter = max(0.0, min(jitter, 0.9))
+        self.retry_delay = retry_delay
+        self._pools: Dict[str, _Pool] = {}
+        self._running = False
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._pools
+
+    def register(
+        self,
+        name: str,
+        fetch: Fetcher,
+        interval: Optional[float] = None,
+        initial: Any = None,
+    ) -> None:
+        """
+        Adds a pool (no-op if it exists). `initial` seeds it with a value
+        the caller already fetched, so the first refresh waits a full interval.
+        """
+        if name in self._pools:
+            return
+        pool = _Pool(name, fetch, interval or self.interval)
+        if initial is not None:
+            self._store(pool, initial)
+        self._pools[name] = pool
+        if self._running:
+            pool.task = asyncio.ensure_future(self._run(pool))
+
+    def get(self, name: str) -> Any:
+        pool = self._pools.get(name)
+        return pool.value if pool is not None else None
+
+    def start(self) -> None:
+        self._running = True
+        for pool in self._pools.values():
+            if pool.task is None:
+                pool.task = asyncio.ensure_future(self._run(pool))
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks = [p.task for p in self._pools.values() if p.task is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for p in self._pools.values():
+            p.task = None
+
+    def _store(self, pool: _Pool, value: Any) -> None:
+        pool.value = value
+        pool.updated_at = time.monotonic()
+        pool.updated_wall = time.time()
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    async def refresh(self, name: str) -> bool:
+        """One refresh now; True on success. Failures keep the old value."""
+        pool = self._pools[name]
+        try:
+            value = await pool.fetch()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            pool.failures += 1
+            pool.last_error = f"{type(e).__name__}: {getattr(e, 'detail', e)}"
+            logger.warning("feed %s refresh failed (%d in a row): %s",
+                           name, pool.failures, pool.last_error)
+            return False
+        self._store(pool, value)
+        pool.failures = 0
+        pool.last_error = None
+        pool.refreshes += 1
+        return True
+
+    async def _run(self, pool: _Pool) -> None:
+        if pool.updated_at is None:
+            # spread the initial loads a little instead of one burst
+            delay = random.uniform(0.0, min(1.0, self.jitter * pool.interval))
+        else:
+            delay = self._jittered(pool.interval)
+        while True:
+            pool.next_at = time.monotonic() + delay
+            await asyncio.sleep(delay)
+            if await self.refresh(pool.name):
+                delay = self._jittered(pool.interval)
+            else:
+                backoff = self.retry_delay * 2 ** (pool.failures - 1)
+                delay = self._jittered(min(pool.interval, backoff))
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        pools = {}
+        for name, p in sorted(self._pools.items()):
+            age = None if p.updated_at is None else round(now - p.updated_at, 1)
+            pools[name] = {
+                "loaded": p.updated_at is not None,
+                "age_s": age,
+                # stale: missed at least one full refresh cycle
+                "stale": age is None or age > 2 * p.interval,
+                "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(p.updated_wall))
+                if p.updated_wall
+                else None,
+                "next_refresh_in_s": round(max(0.0, p.next_at - now), 1) if p.next_at else None,
+                "interval_s": p.interval,
+                "refreshes": p.refreshes,
+                "consecutive_failures": p.failures,
+                "last_error": p.last_error,
+            }
+        return {"running": self._running, "pools": pools}
@@ -0,0 +1,176 @@
+"""
+Backend client for the Streamlit frontend (app.py).
+
+- One pooled requests.Session per server process (st.cache_resource), so
+  repeated calls reuse keep-alive connections instead of a new TCP + TLS
+  handshake each time.
+- Per-endpoint TTLs (tmdb_cache.TTLCache, first matching prefix wins):
+  autocomplete expires in seconds, details in a day. Failures are not cached.
+- Completed NDJSON streams for long-lived endpoints are cached too and
+  replayed, so revisiting a movie renders at once.
+- submit_json runs independent calls in a shared thread pool. Nothing in
+  the pool touches Streamlit, so it needs no ScriptRunContext.
+- Every real fetch logs its timing (logger "frontend_client",
+  FRONTEND_LOG_LEVEL).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+from tmdb_cache import TTLCache, make_cache_key, ttl_for_path
+
+API_BASE = os.getenv("API_BASE", "https://movie-rec-466x.onrender.com")
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "25"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "16"))
+API_FETCH_WORKERS = int(os.getenv("API_FETCH_WORKERS", "8"))
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "2000"))
+API_CACHE_MAX_MB = int(os.getenv("API_CACHE_MAX_MB", "64"))
+
+# Seconds per endpoint; first matching path prefix wins
+API_CACHE_TTL_SEARCH = float(os.getenv("API_CACHE_TTL_SEARCH", "30"))
+API_CACHE_TTL_HOME = float(os.getenv("API_CACHE_TTL_HOME", "300"))
+API_CACHE_TTL_DETAILS = float(os.getenv("API_CACHE_TTL_DETAILS", "86400"))
+API_CACHE_TTLS: List[Tuple[str, float]] = [
+    ("/tmdb/search", API_CACHE_TTL_SEARCH),  # autocomplete, changes with every keystroke
+    ("/movie/search", API_CACHE_TTL_SEARCH),
+    ("/home", API_CACHE_TTL_HOME),  # the backend refreshes feeds in the background
+    ("/recommend/genre", API_CACHE_TTL_DETAILS),
+    ("/movie/id/", API_CACHE_TTL_DETAILS),  # details and bundles for one id hardly change
+]
+
+logger = logging.getLogger("frontend_client")
+logger.setLevel(os.getenv("FRONTEND_LOG_LEVEL", "INFO"))
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+
+
+def ttl_for(path: str) -> float:
+    return ttl_for_path(path, None, API_CACHE_TTLS, API_CACHE_TTL_SEARCH, API_CACHE_TTL_SEARCH)
+
+
+class ApiClient:
+    """Session, response cache and fetch pool shared by every browser session."""
+
+    def __init__(self, base: str = API_BASE):
+        self.base = base
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=API_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(
+            max_workers=API_FETCH_WORKERS, thread_name_prefix="api-fetch"
+        )
+        # TTLCache is not thread-safe on its own; the pool shares it
+        self.cache = TTLCache(
+            max_entries=API_CACHE_MAX_ENTRIES, max_bytes=API_CACHE_MAX_MB * 1024 * 1024
+        )
+        self._lock = threading.Lock()
+
+    def _cached(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self.cache.get(key)
+
+    def _store(self, key: str, value: Any, ttl: float, size: int) -> None:
+        with self._lock:
+            self.cache.set(key, value, ttl, size=size)
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Tuple[Any, Optional[str]]:
+        """(data, None) or (None, error message), cached per the endpoint's TTL."""
+        key = make_cache_key(path, params or {})
+        data = self._cached(key)
+        if data is not None:
+            return data, None
+
+        started = time.perf_counter()
+        try:
+            r = self.session.get(f"{self.base}{path}", params=params, timeout=API_TIMEOUT)
+            logger.info(
+                "GET %s %s -> %d in %.0f ms", path, params or "", r.status_code, _ms(started)
+            )
+            if r.status_code >= 400:
+                return None, f"HTTP {r.status_code}: {r.text[:300]}"
+            data = r.json()  # e.g. a proxy's HTML error page fails here
+        except Exception as e:
+            logger.warning("GET %s failed after %.0f ms: %s", path, _ms(started), e)
+            return None, f"Request failed: {e}"
+        self._store(key, data, ttl_for(path), len(r.content))
+        return data, None
+
+    def submit_json(
+        self, path: str, params: Optional[Dict] = None
+    ) -> "Future[Tuple[Any, Optional[str]]]":
+        """get_json in the shared pool; .result() gives the same tuple."""
+        return self.pool.submit(self.get_json, path, params)
+
+    def stream_events(self, path: str, params: Optional[Dict] = None) -> Iterator[Dict]:
+        """
+        Reads an NDJSON endpoint line by line (e.g. /movie/id/{id}/bundle/stream)
+        and yields each event as soon as it arrives. Failures become an
+        {"event": "error"} item instead of an exception. A stream that ends
+        with "done" and no errors is cached and replayed.
+        """
+        key = make_cache_key(path, params or {})
+        cached = self._cached(key)
+        if cached is not None:
+            yield from cached
+            return
+
+        started = time.perf_counter()
+        events: List[Dict] = []
+        size = 0
+        try:
+            with self.session.get(
+                f"{self.base}{path}", params=params, timeout=API_TIMEOUT, stream=True
+            ) as r:
+                if r.status_code >= 400:
+                    logger.info("STREAM %s -> %d in %.0f ms", path, r.status_code, _ms(started))
+                    yield {"event": "error", "status": r.status_code, "detail": r.text[:300]}
+                    return
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    events.append(event)
+                    size += len(line)
+                    logger.info("STREAM %s %s at %.0f ms", path, event.get("event"), _ms(started))
+                    yield event
+        except Exception as e:
+            logger.warning("STREAM %s failed after %.0f ms: %s", path, _ms(started), e)
+            yield {"event": "error", "detail": f"Request failed: {e}"}
+            return
+
+        complete = bool(events) and events[-1].get("event") == "done"
+        if complete and not any(e.get("event") == "error" for e in events):
+            self._store(key, events, ttl_for(path), size)
+
+
+@st.cache_resource
+def client() -> ApiClient:
+    return ApiClient()
+
+
+def get_json(path: str, params: Optional[Dict] = None) -> Tuple[Any, Optional[str]]:
+    return client().get_json(path, params)
+
+
+def submit_json(path: str, params: Optional[Dict] = None) -> "Future[Tuple[Any, Optional[str]]]":
+    return client().submit_json(path, params)
+
+
+def stream_events(path: str, params: Optional[Dict] = None) -> Iterator[Dict]:
+    return client().stream_events(path, params)
+
+
+def _ms(started: float) -> float:
+    return 1000 * (time.perf_counter() - started)
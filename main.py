@@ -1,26 +1,165 @@
+import asyncio
+import contextlib
+import copy
+import hmac
+import logging
 import os
 import pickle
-from typing import List, Dict,Any,Tuple,Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict,Any,Callable,Iterator,Sequence,Tuple,Optional
 
+# pandas and scikit-learn are not imported here: unpickling df.pkl /
+# tfidf.pkl pulls them in, and the artifact directory needs neither
 import numpy as np
-import pandas as pd
 import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 
+from ann import load_ann_index
+from artifact_bundle import (
+    ArtifactBundle,
+    ArtifactVersionMiddleware,
+    RetiredBundles,
+    fingerprint as artifact_fingerprint,
+)
+import catalog
+import fast_json
+import metrics
+from artifacts import (
+    build_title_to_idx_map,
+    is_artifact_dir,
+    load_artifact_dir,
+    norm_title as _norm_title,
+)
+from fast_json import FastJSONResponse
+from feeds import FeedScheduler
+import precision
+from resilience import (
+    CircuitBreaker,
+    RetryBudget,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
+from scoring import ScoringExecutor
+from similarity import chunked_topk
+from title_index import TitleMatch
+from tmdb_cache import TTLCache, make_cache_key, ttl_for_path
+
 load_dotenv()
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
 TMDB_BASE = "https://api.themoviedb.org/3"
 TMDB_IMG_500 = "https://image.tmdb.org/t/p/w500"
 
+# Shared upstream client tuning (one pooled client per process)
+TMDB_TIMEOUT = float(os.getenv("TMDB_TIMEOUT", "10"))
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", "5"))
+TMDB_MAX_CONNECTIONS = int(os.getenv("TMDB_MAX_CONNECTIONS", "100"))
+TMDB_MAX_KEEPALIVE = int(os.getenv("TMDB_MAX_KEEPALIVE", "20"))
+TMDB_KEEPALIVE_EXPIRY = float(os.getenv("TMDB_KEEPALIVE_EXPIRY", "30"))
+TMDB_HTTP2 = os.getenv("TMDB_HTTP2", "1") == "1"
+
+# Client-side pacing / retries / circuit breaker (resilience.py)
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))  # requests per second
+TMDB_RATE_BURST = int(os.getenv("TMDB_RATE_BURST", "40"))
+TMDB_MAX_QUEUE_WAIT = float(os.getenv("TMDB_MAX_QUEUE_WAIT", "5"))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", "2"))
+TMDB_RETRY_BASE_DELAY = float(os.getenv("TMDB_RETRY_BASE_DELAY", "0.25"))
+TMDB_RETRY_MAX_DELAY = float(os.getenv("TMDB_RETRY_MAX_DELAY", "2"))
+TMDB_RETRY_BUDGET_RATIO = float(os.getenv("TMDB_RETRY_BUDGET_RATIO", "0.1"))
+TMDB_BREAKER_THRESHOLD = int(os.getenv("TMDB_BREAKER_THRESHOLD", "5"))
+TMDB_BREAKER_RESET = float(os.getenv("TMDB_BREAKER_RESET", "30"))
+
+# Poster enrichment fan-out for TF-IDF recs
+TMDB_ENRICH_CONCURRENCY = int(os.getenv("TMDB_ENRICH_CONCURRENCY", "6"))
+TMDB_ENRICH_TIMEOUT = float(os.getenv("TMDB_ENRICH_TIMEOUT", "3"))
+
+# TMDB response cache (seconds / sizes)
+TMDB_CACHE_ENABLED = os.getenv("TMDB_CACHE_ENABLED", "1") == "1"
+TMDB_CACHE_MAX_ENTRIES = int(os.getenv("TMDB_CACHE_MAX_ENTRIES", "5000"))
+TMDB_CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_MB", "64")) * 1024 * 1024
+TMDB_CACHE_DEFAULT_TTL = float(os.getenv("TMDB_CACHE_DEFAULT_TTL", "300"))
+TMDB_CACHE_NEGATIVE_TTL = float(os.getenv("TMDB_CACHE_NEGATIVE_TTL", "60"))
+# expired entries are still served while TMDB is failing, for this long
+TMDB_CACHE_STALE_TTL = float(os.getenv("TMDB_CACHE_STALE_TTL", "3600"))
+TMDB_CACHE_TTLS = [
+    ("/search/movie", float(os.getenv("TMDB_CACHE_SEARCH_TTL", "600"))),
+    ("/discover/movie", float(os.getenv("TMDB_CACHE_DISCOVER_TTL", "900"))),
+    ("/trending/", float(os.getenv("TMDB_CACHE_HOME_TTL", "600"))),
+    ("/movie/popular", float(os.getenv("TMDB_CACHE_HOME_TTL", "600"))),
+    ("/movie/top_rated", float(os.getenv("TMDB_CACHE_HOME_TTL", "600"))),
+    ("/movie/upcoming", float(os.getenv("TMDB_CACHE_HOME_TTL", "600"))),
+    ("/movie/now_playing", float(os.getenv("TMDB_CACHE_HOME_TTL", "600"))),
+    ("/movie/", float(os.getenv("TMDB_CACHE_DETAILS_TTL", "3600"))),
+]
+
+# Background refresh of home categories / genre discover pools (feeds.py)
+FEEDS_ENABLED = os.getenv("FEEDS_ENABLED", "1") == "1"
+FEEDS_REFRESH_INTERVAL = float(os.getenv("FEEDS_REFRESH_INTERVAL", "600"))
+FEEDS_JITTER = float(os.getenv("FEEDS_JITTER", "0.1"))
+FEEDS_RETRY_DELAY = float(os.getenv("FEEDS_RETRY_DELAY", "30"))
+FEEDS_PRELOAD_GENRES = os.getenv("FEEDS_PRELOAD_GENRES", "1") == "1"
+
 if not TMDB_API_KEY:
     raise RuntimeError("TMDB_API_KEY missing. Put it in .env as TMDB_API_KEY=xxxx")
 
 app = FastAPI(title="Movie Recommender API", version="1.0")
 
+# =========================
+# METRICS (GET /metrics)
+# =========================
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being served")
+TMDB_LATENCY = metrics.histogram(
+    "tmdb_request_duration_seconds",
+    "Upstream TMDB call latency (cache misses only)",
+    ("path", "outcome"),
+)
+TMDB_ERRORS = metrics.counter(
+    "tmdb_errors", "Failed or timed-out TMDB calls", ("path", "kind")
+)
+TMDB_THROTTLED = metrics.counter(
+    "tmdb_throttled",
+    "TMDB calls delayed by client pacing (paced), answered 429, or refused locally (rejected)",
+    ("reason",),
+)
+TMDB_PACING_WAIT = metrics.histogram(
+    "tmdb_pacing_wait_seconds", "Time TMDB calls waited for a rate-limit token"
+)
+TMDB_RETRIES = metrics.counter("tmdb_retries", "TMDB call retries", ("path", "reason"))
+TMDB_RETRY_BUDGET_EXHAUSTED = metrics.counter(
+    "tmdb_retry_budget_exhausted", "Retries skipped because the retry budget was empty"
+)
+TMDB_BREAKER_TRIPS = metrics.counter("tmdb_circuit_trips", "Times the TMDB circuit opened")
+TMDB_BREAKER_REJECTED = metrics.counter(
+    "tmdb_circuit_rejected", "TMDB calls failed fast while the circuit was open", ("path",)
+)
+TMDB_STALE_SERVED = metrics.counter(
+    "tmdb_stale_served", "Expired cache entries served because TMDB failed", ("path",)
+)
+ARTIFACT_LOAD_SECONDS = metrics.gauge(
+    "artifact_load_seconds", "Time spent loading each artifact (last load)", ("artifact",)
+)
+ARTIFACT_RELOADS = metrics.counter(
+    "artifact_reloads", "Artifact bundle reloads", ("trigger", "outcome")
+)
+
+_TMDB_ID_SEGMENT = re.compile(r"/\d+")
+
+
+def tmdb_metric_path(path: str) -> str:
+    """/movie/603 -> /movie/{id}: keeps upstream label cardinality bounded."""
+    return _TMDB_ID_SEGMENT.sub("/{id}", path)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # for local streamlit
@@ -28,6 +167,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware, latency=HTTP_LATENCY, in_flight=HTTP_IN_FLIGHT)
+app.add_middleware(
+    ArtifactVersionMiddleware, get_version=lambda: BUNDLE.version if BUNDLE else None
+)
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -37,12 +180,120 @@ INDICES_PATH = os.path.join(BASE_DIR, "indices.pkl")
 TFIDF_MATRIX_PATH = os.path.join(BASE_DIR, "tfidf_matrix.pkl")
 TFIDF_PATH = os.path.join(BASE_DIR, "tfidf.pkl")
 
-df: Optional[pd.DataFrame] = None
-indices_obj: Any = None
-tfidf_matrix: Any = None
-tfidf_obj: Any = None
+# Preferred over the pickles when it holds a manifest.json (see artifacts.py)
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join(BASE_DIR, "artifacts"))
+ARTIFACT_MMAP = os.getenv("ARTIFACT_MMAP", "1") == "1"
+# Reload when artifact files change (seconds between checks, 0 = off)
+ARTIFACT_WATCH_INTERVAL = float(os.getenv("ARTIFACT_WATCH_INTERVAL", "10"))
+# How long a swapped-out bundle may wait for in-flight requests before release
+ARTIFACT_DRAIN_TIMEOUT = float(os.getenv("ARTIFACT_DRAIN_TIMEOUT", "60"))
+# Threads reading independent artifacts concurrently at load (1 = one by one)
+ARTIFACT_LOAD_WORKERS = int(os.getenv("ARTIFACT_LOAD_WORKERS", "4"))
+# Load after the server starts listening: /health answers at once, /ready
+# and the catalog endpoints return 503 until the bundle is in place
+ARTIFACT_BACKGROUND_LOAD = os.getenv("ARTIFACT_BACKGROUND_LOAD", "0") == "1"
+# tfidf.pkl (and scikit-learn with it): eager | background | lazy.
+# Only /recommend/text and catalog appends need it.
+TFIDF_VECTORIZER_LOAD = os.getenv("TFIDF_VECTORIZER_LOAD", "background")
+TMDB_CARDS_PATH = os.path.join(BASE_DIR, "tmdb_cards.npz")  # resolve_tmdb.py
+NEIGHBORS_IDX_PATH = os.path.join(BASE_DIR, "neighbors_idx.npy")  # build_neighbors.py
+NEIGHBORS_SCORE_PATH = os.path.join(BASE_DIR, "neighbors_score.npy")
+
+# Serve /recommend/tfidf from the precomputed top-K table when it exists
+TFIDF_NEIGHBORS_ENABLED = os.getenv("TFIDF_NEIGHBORS_ENABLED", "1") == "1"
+
+# TF-IDF matrix precision in memory: native | float32 | uint16 | int8 (precision.py).
+# uint16 / int8 only save memory; scoring is no faster than native.
+TFIDF_PRECISION = os.getenv("TFIDF_PRECISION", "native")
+
+# Scoring engine: "exact" (neighbour table / brute force) or "ann" (ann.py)
+TFIDF_ENGINE = os.getenv("TFIDF_ENGINE", "exact")
+ANN_INDEX_DIR = os.getenv("ANN_INDEX_DIR", os.path.join(BASE_DIR, "ann_index"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+ANN_RERANK = int(os.getenv("ANN_RERANK", "100"))
+
+# Fuzzy local-title resolution (punctuation / accents / year / subtitle)
+FUZZY_TITLE_ENABLED = os.getenv("FUZZY_TITLE_ENABLED", "1") == "1"
+FUZZY_TITLE_MIN_SCORE = float(os.getenv("FUZZY_TITLE_MIN_SCORE", "0.55"))
 
-TITLE_TO_IDX: Optional[Dict[str, int]] = None
+# Where TF-IDF scoring runs: inline | thread | process (see scoring.py)
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "thread")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", "2"))
+SCORING_MAX_QUEUE = int(os.getenv("SCORING_MAX_QUEUE", "64"))
+
+# POST /recommend/tfidf/batch
+TFIDF_BATCH_MAX_ITEMS = int(os.getenv("TFIDF_BATCH_MAX_ITEMS", "5000"))
+TFIDF_BATCH_BLOCK_MB = int(os.getenv("TFIDF_BATCH_BLOCK_MB", "128"))
+
+# Incremental catalog updates (catalog.py): delta segments + compaction
+CATALOG_DELTA_DIR = os.getenv("CATALOG_DELTA_DIR", os.path.join(BASE_DIR, "catalog_deltas"))
+CATALOG_SOUP_FIELDS = [
+    f.strip() for f in os.getenv("CATALOG_SOUP_FIELDS", "overview").split(",") if f.strip()
+]
+CATALOG_APPEND_MAX_ITEMS = int(os.getenv("CATALOG_APPEND_MAX_ITEMS", "1000"))
+CATALOG_SYNC_INTERVAL = float(os.getenv("CATALOG_SYNC_INTERVAL", "30"))  # other workers' appends
+CATALOG_COMPACT_INTERVAL = float(os.getenv("CATALOG_COMPACT_INTERVAL", "0"))  # 0 = manual only
+# /admin/* endpoints are disabled unless set (sent as X-Admin-Token)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Everything served from the catalog: TF-IDF matrix, titles, title map,
+# neighbour table, ANN index, offline TMDB cards (artifact_bundle.py).
+# Replaced as a whole, never mutated; requests read it once.
+BUNDLE: Optional[ArtifactBundle] = None
+
+# Set by serve.py when artifacts were loaded in the parent before forking
+ARTIFACTS_PRELOADED = False
+
+# serializes everything that replaces BUNDLE (reloads, appends, compactions);
+# catalog.segment_lock does the same across processes for the delta segments
+_swap_lock = threading.Lock()
+RETIRED_BUNDLES = RetiredBundles()
+# Startup load progress for /ready; LOAD_PROGRESS holds the per-artifact
+# state of the most recent load (startup or reload)
+STARTUP_STATUS: Dict[str, Any] = {
+    "state": "pending",  # pending | loading | ready | failed
+    "load_s": None,
+    "error": None,
+}
+LOAD_PROGRESS: Dict[str, Dict[str, Any]] = {}
+RELOAD_STATUS: Dict[str, Any] = {
+    "reloading": False,
+    "reloads": 0,
+    "failures": 0,
+    "last_trigger": None,
+    "last_reload_at": None,
+    "last_reload_s": None,
+    "last_warm_s": None,
+    "last_error": None,
+}
+
+CATALOG_STATUS: Dict[str, Any] = {
+    "appended_rows": 0,
+    "segments_merged": 0,
+    "compactions": 0,
+    "compacting": False,
+    "last_append_at": None,
+    "last_compaction_at": None,
+    "last_compaction_s": None,
+    "last_error": None,
+}
+
+tmdb_client: Optional[httpx.AsyncClient] = None
+scorer = ScoringExecutor("inline")  # replaced at startup
+
+feeds = FeedScheduler(
+    interval=FEEDS_REFRESH_INTERVAL, jitter=FEEDS_JITTER, retry_delay=FEEDS_RETRY_DELAY
+)
+
+tmdb_cache = TTLCache(
+    max_entries=TMDB_CACHE_MAX_ENTRIES,
+    max_bytes=TMDB_CACHE_MAX_BYTES,
+    stale_ttl=TMDB_CACHE_STALE_TTL,
+)
+
+tmdb_bucket = TokenBucket(TMDB_RATE_LIMIT, TMDB_RATE_BURST)
+tmdb_retry_budget = RetryBudget(ratio=TMDB_RETRY_BUDGET_RATIO)
+tmdb_breaker = CircuitBreaker(TMDB_BREAKER_THRESHOLD, TMDB_BREAKER_RESET)
 
 
 class TMDBMovieCard(BaseModel):
@@ -53,6 +304,27 @@ class TMDBMovieCard(BaseModel):
     vote_average: Optional[float] = None
 
 
+# Cards are built as plain dicts of the TMDBMovieCard shape and sent with
+# FastJSONResponse; the model documents them in OpenAPI.
+Card = Dict[str, Any]
+
+
+def make_card(
+    tmdb_id: Any,
+    title: Any,
+    poster_url: Optional[str],
+    release_date: Optional[str],
+    vote_average: Any,
+) -> Card:
+    return {
+        "tmdb_id": int(tmdb_id),
+        "title": str(title),
+        "poster_url": poster_url,
+        "release_date": release_date,
+        "vote_average": None if vote_average is None else float(vote_average),
+    }
+
+
 class TMDBMovieDetails(BaseModel):
     tmdb_id: int
     title: str
@@ -68,61 +340,237 @@ class TFIDFRecItem(BaseModel):
     tmdb: Optional[TMDBMovieCard] = None
 
 
+class TFIDFBatchRequest(BaseModel):
+    titles: List[str] = []
+    indices: List[int] = []
+    top_n: int = Field(10, ge=1, le=50)
+
+
+class CatalogAppendRequest(BaseModel):
+    # {"title": ..., "overview": ..., ...}; text fields per CATALOG_SOUP_FIELDS
+    movies: List[Dict[str, Any]]
+
+
+class TitleMatchInfo(BaseModel):
+    title: str
+    matched_title: str
+    score: float
+    path: str  # exact | folded | variant | trigram
+
+
 class SearchBundleResponse(BaseModel):
     query: str
     movie_details: TMDBMovieDetails
     tfidf_recommendations: List[TFIDFRecItem]
     genre_recommendations: List[TMDBMovieCard]
+    tfidf_match: Optional[TitleMatchInfo] = None
 
-def _norm_title(t: str) -> str:
-    return str(t).strip().lower()
 
+class MovieBundleResponse(BaseModel):
+    movie_details: TMDBMovieDetails
+    tfidf_recommendations: List[TFIDFRecItem]
+    genre_recommendations: List[TMDBMovieCard]
+    tfidf_match: Optional[TitleMatchInfo] = None
 
 def make_img_url(path: Optional[str]) -> Optional[str]:
     if not path:
         return None
     return f"{TMDB_IMG_500}{path}"
 
-async def tmdb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_tmdb_client() -> httpx.AsyncClient:
     """
-    Safe TMDB GET:
-    - Network errors -> 502
-    - TMDB API errors -> 502 with detail
+    One keep-alive pool for every TMDB call:
+    - connections are reused across requests (no DNS/TCP/TLS per call)
+    - HTTP/2 multiplexing when enabled and `h2` is installed
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(TMDB_TIMEOUT, connect=TMDB_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=TMDB_MAX_CONNECTIONS,
+            max_keepalive_connections=TMDB_MAX_KEEPALIVE,
+            keepalive_expiry=TMDB_KEEPALIVE_EXPIRY,
+        ),
+        http2=TMDB_HTTP2 and _http2_available(),
+    )
+
+
+def get_tmdb_client() -> httpx.AsyncClient:
+    global tmdb_client
+    # startup normally opens it; this covers use outside the app lifespan
+    if tmdb_client is None or tmdb_client.is_closed:
+        tmdb_client = create_tmdb_client()
+    return tmdb_client
+
+
+def _tmdb_health_failure() -> None:
+    was_open = tmdb_breaker.state == CircuitBreaker.OPEN
+    tmdb_breaker.record_failure()
+    if tmdb_breaker.state == CircuitBreaker.OPEN and not was_open:
+        TMDB_BREAKER_TRIPS.inc()
+
+
+async def _tmdb_fetch(path: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    One logical TMDB GET:
+    - fails fast with 503 while the circuit breaker is open
+    - paced by the token bucket; a 429 pauses the bucket for Retry-After
+    - timeouts, network errors, 429 and 5xx are retried with jittered
+      backoff, at most TMDB_MAX_RETRIES times and only while the shared
+      retry budget allows
+    - other 4xx are returned as errors at once and do not count against
+      TMDB's health
     """
     q = dict(params)
     q["api_key"] = TMDB_API_KEY
+    metric_path = tmdb_metric_path(path)
 
-    try:
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(f"{TMDB_BASE}{path}", params=q)
-    except httpx.RequestError as e:
+    if not tmdb_breaker.allow():
+        TMDB_BREAKER_REJECTED.inc(metric_path)
         raise HTTPException(
-            status_code=502,
-            detail=f"TMDB request error: {type(e).__name__} | {repr(e)}",
+            status_code=503,
+            detail=f"TMDB unavailable (circuit open, retry in {tmdb_breaker.retry_in():.0f}s)",
         )
+    tmdb_retry_budget.deposit()
 
-    if r.status_code != 200:
-        raise HTTPException(
-            status_code=502, detail=f"TMDB error {r.status_code}: {r.text}"
-        )
+    attempt = 0
+    try:
+        while True:
+            try:
+                waited = await tmdb_bucket.acquire(max_wait=TMDB_MAX_QUEUE_WAIT)
+            except asyncio.TimeoutError:
+                TMDB_THROTTLED.inc("rejected")
+                tmdb_breaker.release()
+                raise HTTPException(
+                    status_code=503, detail="TMDB rate limit reached, retry shortly"
+                )
+            if waited > 0:
+                TMDB_THROTTLED.inc("paced")
+                TMDB_PACING_WAIT.observe(waited)
+
+            started = time.perf_counter()
+            retry_after = 0.0
+            try:
+                r = await get_tmdb_client().get(f"{TMDB_BASE}{path}", params=q)
+            except httpx.RequestError as e:
+                reason = "timeout" if isinstance(e, httpx.TimeoutException) else "network"
+                TMDB_LATENCY.observe(time.perf_counter() - started, metric_path, reason)
+                TMDB_ERRORS.inc(metric_path, reason)
+                error = HTTPException(
+                    status_code=502,
+                    detail=f"TMDB request error: {type(e).__name__} | {repr(e)}",
+                )
+            else:
+                if r.status_code == 200:
+                    data = r.json()  # a broken body is a failure, not a success
+                    TMDB_LATENCY.observe(time.perf_counter() - started, metric_path, "ok")
+                    tmdb_breaker.record_success()
+                    return data, len(r.content)
+
+                TMDB_LATENCY.observe(time.perf_counter() - started, metric_path, "error")
+                TMDB_ERRORS.inc(metric_path, f"http_{r.status_code}")
+                error = HTTPException(
+                    status_code=502, detail=f"TMDB error {r.status_code}: {r.text}"
+                )
+                reason = f"http_{r.status_code}"
+                if r.status_code == 429:
+                    TMDB_THROTTLED.inc("429")
+                    retry_after = parse_retry_after(
+                        r.headers.get("Retry-After"), TMDB_RETRY_BASE_DELAY
+                    )
+                    tmdb_bucket.pause_until(time.monotonic() + retry_after)
+                elif r.status_code < 500:
+                    # our request is wrong (unknown id, bad key): TMDB itself is fine
+                    tmdb_breaker.record_success()
+                    raise error
+
+            # retryable: timeout, network error, 429, 5xx
+            can_retry = attempt < TMDB_MAX_RETRIES and retry_after <= TMDB_RETRY_MAX_DELAY
+            if can_retry and not tmdb_retry_budget.try_withdraw():
+                TMDB_RETRY_BUDGET_EXHAUSTED.inc()
+                can_retry = False
+            if not can_retry:
+                if reason == "http_429":
+                    tmdb_breaker.release()  # throttled, not unhealthy
+                else:
+                    _tmdb_health_failure()
+                raise error
+
+            TMDB_RETRIES.inc(metric_path, reason)
+            # a 429 already paused the bucket for Retry-After
+            await asyncio.sleep(
+                backoff_delay(attempt, TMDB_RETRY_BASE_DELAY, TMDB_RETRY_MAX_DELAY)
+            )
+            attempt += 1
+    except asyncio.CancelledError:
+        tmdb_breaker.release()
+        raise
+    except HTTPException:
+        raise  # the breaker already has this call's outcome
+    except Exception:
+        # anything else (invalid JSON, client errors) counts as a failure, so
+        # a half-open probe never keeps the slot forever
+        _tmdb_health_failure()
+        raise
+
+
+async def tmdb_get(path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Safe TMDB GET:
+    - Network errors -> 502
+    - TMDB API errors -> 502 with detail
+    - TMDB unhealthy (circuit open) or local rate limit exceeded -> 503
+    - Successful responses are cached per (path, params); concurrent
+      misses for the same key share one upstream call.
+      The returned dict may be shared: do not mutate it.
+    - While TMDB fails, an expired cached copy (up to
+      TMDB_CACHE_STALE_TTL old) is served instead of the error.
+    """
+    if not TMDB_CACHE_ENABLED:
+        data, _ = await _tmdb_fetch(path, params)
+        return data
 
-    return r.json()
+    key = make_cache_key(path, params)
+    try:
+        return await tmdb_cache.get_or_fetch(
+            key,
+            lambda: _tmdb_fetch(path, params),
+            lambda data: ttl_for_path(
+                path,
+                data,
+                TMDB_CACHE_TTLS,
+                default=TMDB_CACHE_DEFAULT_TTL,
+                negative=TMDB_CACHE_NEGATIVE_TTL,
+            ),
+        )
+    except HTTPException as e:
+        if e.status_code in (502, 503):
+            stale = tmdb_cache.get_stale(key)
+            if stale is not None:
+                TMDB_STALE_SERVED.inc(tmdb_metric_path(path))
+                return stale
+        raise
 
 async def tmdb_cards_from_results(
     results: List[dict], limit: int = 20
-) -> List[TMDBMovieCard]:
-    out: List[TMDBMovieCard] = []
-    for m in (results or [])[:limit]:
-        out.append(
-            TMDBMovieCard(
-                tmdb_id=int(m["id"]),
-                title=m.get("title") or m.get("name") or "",
-                poster_url=make_img_url(m.get("poster_path")),
-                release_date=m.get("release_date"),
-                vote_average=m.get("vote_average"),
-            )
+) -> List[Card]:
+    return [
+        make_card(
+            m["id"],
+            m.get("title") or m.get("name") or "",
+            make_img_url(m.get("poster_path")),
+            m.get("release_date"),
+            m.get("vote_average"),
         )
-    return out
+        for m in (results or [])[:limit]
+    ]
 
 async def tmdb_movie_details(movie_id: int) -> TMDBMovieDetails:
     data = await tmdb_get(f"/movie/{movie_id}", {"language": "en-US"})
@@ -158,75 +606,396 @@ async def tmdb_search_first(query: str) -> Optional[dict]:
     results = data.get("results", [])
     return results[0] if results else None
 
-def build_title_to_idx_map(indices: Any) -> Dict[str, int]:
+HOME_CATEGORIES = {
+    "trending": ("/trending/movie/day", {"language": "en-US"}),
+    "popular": ("/movie/popular", {"language": "en-US", "page": 1}),
+    "top_rated": ("/movie/top_rated", {"language": "en-US", "page": 1}),
+    "upcoming": ("/movie/upcoming", {"language": "en-US", "page": 1}),
+    "now_playing": ("/movie/now_playing", {"language": "en-US", "page": 1}),
+}
+
+
+def _discover_params(genre_id: int) -> Dict[str, Any]:
+    return {
+        "with_genres": genre_id,
+        "language": "en-US",
+        "sort_by": "popularity.desc",
+        "page": 1,
+    }
+
+
+def _feed_fetcher(path: str, params: Dict[str, Any]):
+    # refreshes go straight upstream: the point is a fresh copy, not a cached one
+    async def fetch() -> List[dict]:
+        data, _ = await _tmdb_fetch(path, params)
+        return data.get("results", [])
+
+    return fetch
+
+
+async def feed_results(name: str, path: str, params: Dict[str, Any]) -> List[dict]:
     """
-    indices.pkl can be:
-    - dict(title -> index)
-    - pandas Series (index=title, value=index)
-    We normalize into TITLE_TO_IDX.
+    Results list of a refreshed pool; zero upstream latency once loaded.
+    Before the first load (or with FEEDS_ENABLED=0) it falls back to the
+    cached request path, and seeds the pool so it is refreshed from then on.
     """
-    title_to_idx: Dict[str, int] = {}
+    results = feeds.get(name)
+    if results is not None:
+        return results
+    data = await tmdb_get(path, params)
+    results = data.get("results", [])
+    if FEEDS_ENABLED:
+        feeds.register(name, _feed_fetcher(path, params), initial=results)
+    return results
+
+
+async def home_results(category: str) -> List[dict]:
+    path, params = HOME_CATEGORIES[category]
+    return await feed_results(f"home:{category}", path, params)
+
+
+async def genre_results(genre_id: int) -> List[dict]:
+    return await feed_results(
+        f"genre:{int(genre_id)}", "/discover/movie", _discover_params(genre_id)
+    )
 
-    if isinstance(indices, dict):
-        for k, v in indices.items():
-            title_to_idx[_norm_title(k)] = int(v)
-        return title_to_idx
 
-    # pandas Series or similar mapping
+async def preload_genre_feeds() -> None:
+    """Registers a discover pool for every TMDB movie genre (fire and forget)."""
     try:
-        for k, v in indices.items():
-            title_to_idx[_norm_title(k)] = int(v)
-        return title_to_idx
-    except Exception:
-        # last resort: if it's a list-like etc.
-        raise RuntimeError(
-            "indices.pkl must be dict or pandas Series-like (with .items())"
+        data = await tmdb_get("/genre/movie/list", {"language": "en-US"})
+    except HTTPException as e:
+        logging.getLogger("feeds").warning(
+            "genre list unavailable, genre pools load on demand: %s", e.detail
         )
-    
-def get_local_idx_by_title(title: str) -> int:
-    global TITLE_TO_IDX
-    if TITLE_TO_IDX is None:
-        raise HTTPException(status_code=500, detail="TF-IDF index map not initialized")
+        return
+    for g in data.get("genres", []):
+        gid = int(g["id"])
+        feeds.register(
+            f"genre:{gid}", _feed_fetcher("/discover/movie", _discover_params(gid))
+        )
+
+
+def current_bundle() -> ArtifactBundle:
+    art = BUNDLE
+    if art is None:
+        if STARTUP_STATUS["state"] == "loading":
+            raise HTTPException(status_code=503, detail="TF-IDF resources still loading")
+        raise HTTPException(status_code=500, detail="TF-IDF resources not loaded")
+    return art
+
+
+async def run_scoring(fn: Any, *args: Any, art: ArtifactBundle, **kwargs: Any) -> Any:
+    """
+    scorer.run with the caller's bundle, so a title resolved before a swap
+    is scored on the same catalog. Process workers keep their own copy.
+    """
+    if scorer.backend != "process":
+        kwargs["art"] = art
+    return await scorer.run(fn, *args, **kwargs)
+
+
+def get_local_idx_by_title(title: str, art: Optional[ArtifactBundle] = None) -> int:
+    art = art or current_bundle()
     key = _norm_title(title)
-    if key in TITLE_TO_IDX:
-        return int(TITLE_TO_IDX[key])
+    if key in art.title_to_idx:
+        return int(art.title_to_idx[key])
     raise HTTPException(
         status_code=404, detail=f"Title not found in local dataset: '{title}'"
     )
 
-def tfidf_recommend_titles(
-    query_title: str, top_n: int = 10
-) -> List[Tuple[str, float]]:
+def resolve_local_title(
+    title: str, art: Optional[ArtifactBundle] = None
+) -> Optional[TitleMatch]:
     """
-    Returns list of (title, score) from local df using cosine similarity on TF-IDF matrix.
+    Best local row for a (TMDB) title with a 0..1 confidence and the path
+    that matched; None when nothing clears FUZZY_TITLE_MIN_SCORE.
+    """
+    art = art or current_bundle()
+    key = _norm_title(title)
+    if key in art.title_to_idx:
+        return TitleMatch(int(art.title_to_idx[key]), 1.0, "exact")
+    if not FUZZY_TITLE_ENABLED:
+        return None
+    return art.title_index.get().resolve(title, norm_key=key)
+
+
+def _row_title(art: ArtifactBundle, i: int) -> Optional[str]:
+    try:
+        return str(art.titles[i])
+    except Exception:
+        return None
+
+
+def _neighbor_slice(
+    art: ArtifactBundle, idx: int, top_n: int
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    O(K) lookup in the precomputed table, or (None, None) when the table
+    is absent or too narrow for top_n (caller scores on the fly).
+    """
+    if not _in_neighbor_table(art, idx, top_n):
+        return None, None
+    return _with_appended_rows(
+        art, idx, art.neighbors_idx[idx], art.neighbors_score[idx], art.neighbors_idx.shape[0]
+    )
+
+
+def _in_neighbor_table(art: ArtifactBundle, idx: int, top_n: int) -> bool:
+    if art.neighbors_idx is None or art.neighbors_score is None:
+        return False
+    return top_n <= art.neighbors_idx.shape[1] and 0 <= idx < art.neighbors_idx.shape[0]
+
+
+def _with_appended_rows(
+    art: ArtifactBundle, idx: int, order: np.ndarray, scores: np.ndarray, covered: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Precomputed tables (neighbours, ANN) only know the first `covered`
+    rows; movies appended since (catalog.py) are scored exactly and merged in.
+    """
+    matrix = art.tfidf_matrix
+    n_rows = matrix.shape[0]
+    if n_rows <= covered:
+        return order, scores
+    extra = (matrix[covered:] @ matrix[idx].T).toarray().ravel()
+    order = np.concatenate([np.asarray(order, dtype=np.int64), np.arange(covered, n_rows)])
+    scores = np.concatenate([np.asarray(scores, dtype=np.float64), extra])
+    best = np.argsort(-scores, kind="stable")
+    return order[best], scores[best]
+
+
+def load_neighbor_table() -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Memory-mapped table, or (None, None). Loaded alongside the matrix, so
+    the row count is checked by ArtifactBundle.validate.
+    """
+    if not TFIDF_NEIGHBORS_ENABLED:
+        return None, None
+    if not (os.path.exists(NEIGHBORS_IDX_PATH) and os.path.exists(NEIGHBORS_SCORE_PATH)):
+        return None, None
+    nb_idx = np.load(NEIGHBORS_IDX_PATH, mmap_mode="r")
+    nb_score = np.load(NEIGHBORS_SCORE_PATH, mmap_mode="r")
+    # rows appended after the build (catalog.py) are merged in at query time
+    if nb_idx.shape != nb_score.shape:
+        raise RuntimeError(
+            "neighbors_*.npy do not match tfidf_matrix.pkl; rerun build_neighbors.py"
+        )
+    return nb_idx, nb_score
+
+
+def _ann_search(
+    art: ArtifactBundle, idx: int, top_n: int, nprobe: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    ann = art.ann_index
+    if ann is None:
+        raise HTTPException(
+            status_code=400, detail="ANN engine not available: build it with ann.py"
+        )
+    if idx < ann.n_rows:
+        order, scores = ann.search_row(
+            art.tfidf_matrix, idx, top_n, nprobe=nprobe or ANN_NPROBE, rerank=ANN_RERANK
+        )
+    else:
+        # appended after the index was built: embed the row on the fly
+        query_row = art.tfidf_matrix[idx]
+        order, scores = ann.search(
+            ann.project(query_row)[0],
+            top_n,
+            nprobe=nprobe or ANN_NPROBE,
+            exclude=idx,
+            matrix=art.tfidf_matrix,
+            query_row=query_row,
+            rerank=ANN_RERANK,
+        )
+    return _with_appended_rows(art, idx, order, scores, ann.n_rows)
+
+
+def tfidf_recommend_hits(
+    query_title: str,
+    top_n: int = 10,
+    engine: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    art: Optional[ArtifactBundle] = None,
+) -> List[Tuple[int, str, float]]:
+    """
+    Returns list of (row, title, score) from local df using cosine similarity on TF-IDF matrix.
     Safe against missing columns/rows.
+    engine: "exact" (default, neighbour table or brute force) or "ann".
     """
-    global df, tfidf_matrix
-    if df is None or tfidf_matrix is None:
-        raise HTTPException(status_code=500, detail="TF-IDF resources not loaded")
+    art = art or current_bundle()
+    idx = get_local_idx_by_title(query_title, art)
+    return tfidf_recommend_hits_for_row(idx, top_n=top_n, engine=engine, nprobe=nprobe, art=art)
 
-    idx = get_local_idx_by_title(query_title)
 
-    # query vector
-    qv = tfidf_matrix[idx]
-    scores = (tfidf_matrix @ qv.T).toarray().ravel()
+def tfidf_recommend_hits_for_row(
+    idx: int,
+    top_n: int = 10,
+    engine: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    art: Optional[ArtifactBundle] = None,
+) -> List[Tuple[int, str, float]]:
+    art = art or current_bundle()
+    if (engine or TFIDF_ENGINE) == "ann":
+        order, scores = _ann_search(art, idx, top_n, nprobe)
+    else:
+        order, scores = _neighbor_slice(art, idx, top_n)
+    if order is None:
+        # query vector
+        qv = art.tfidf_matrix[idx]
+        scores = precision.row_scores(art.tfidf_matrix, qv)
 
-    # sort descending
-    order = np.argsort(-scores)
+        # sort descending
+        order = np.argsort(-scores)
+        scores = scores[order]
 
-    out: List[Tuple[str, float]] = []
-    for i in order:
+    out: List[Tuple[int, str, float]] = []
+    for i, score in zip(order, scores):
         if int(i) == int(idx):
             continue
-        try:
-            title_i = str(df.iloc[int(i)]["title"])
-        except Exception:
+        title_i = _row_title(art, int(i))
+        if title_i is None:
             continue
-        out.append((title_i, float(scores[int(i)])))
+        out.append((int(i), title_i, float(score)))
         if len(out) >= top_n:
             break
     return out
-async def attach_tmdb_card_by_title(title: str) -> Optional[TMDBMovieCard]:
+
+
+def tfidf_recommend_titles(
+    query_title: str,
+    top_n: int = 10,
+    engine: Optional[str] = None,
+    nprobe: Optional[int] = None,
+    art: Optional[ArtifactBundle] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Returns list of (title, score) from local df using cosine similarity on TF-IDF matrix.
+    """
+    hits = tfidf_recommend_hits(
+        query_title, top_n=top_n, engine=engine, nprobe=nprobe, art=art
+    )
+    return [(t, s) for _, t, s in hits]
+
+
+def tfidf_recommend_batch(
+    rows: List[int], top_n: int = 10, art: Optional[ArtifactBundle] = None
+) -> "Iterator[List[Tuple[int, str, float]]]":
+    """
+    Recommendations for many catalog rows at once, yielded per row in order.
+    Rows covered by the neighbour table are O(K) slices; the rest are scored
+    with one sparse matrix-matrix product per memory-bounded block.
+    """
+    art = art or current_bundle()
+
+    def finish(idx: int, order: np.ndarray, scores: np.ndarray):
+        out: List[Tuple[int, str, float]] = []
+        for i, score in zip(order, scores):
+            if int(i) == idx:
+                continue
+            title_i = _row_title(art, int(i))
+            if title_i is None:
+                continue
+            out.append((int(i), title_i, float(score)))
+            if len(out) >= top_n:
+                break
+        return out
+
+    # a row asked for twice is scored once; its result is kept until the last repeat
+    remaining: Dict[int, int] = {}
+    for r in rows:
+        if not _in_neighbor_table(art, r, top_n):
+            remaining[r] = remaining.get(r, 0) + 1
+    pending = list(remaining)
+
+    scored: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    blocks = chunked_topk(
+        art.tfidf_matrix,
+        art.tfidf_matrix[pending],
+        top_n + 1,
+        exclude=pending,
+        block_bytes=TFIDF_BATCH_BLOCK_MB * 1024 * 1024,
+    ) if pending else iter(())
+
+    for r in rows:
+        order, scores = _neighbor_slice(art, r, top_n)
+        if order is None:
+            while r not in scored:
+                start, stop, b_idx, b_scores = next(blocks)
+                for k in range(stop - start):
+                    scored[pending[start + k]] = (b_idx[k], b_scores[k])
+            order, scores = scored[r]
+            remaining[r] -= 1
+            if not remaining[r]:
+                del scored[r]
+        yield finish(r, order, scores)
+
+
+def tfidf_recommend_text(
+    text: str, top_n: int = 10, art: Optional[ArtifactBundle] = None
+) -> List[Tuple[str, float]]:
+    """
+    Returns list of (title, score) for arbitrary text: the loaded vectorizer
+    turns it into a TF-IDF query, scored through the inverted index.
+    """
+    art = art or current_bundle()
+    try:
+        vectorizer = art.vectorizer()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TF-IDF vectorizer unavailable: {e}")
+
+    qv = vectorizer.transform([text])
+    if qv.shape[1] != art.tfidf_matrix.shape[1]:
+        raise HTTPException(
+            status_code=500,
+            detail="tfidf.pkl vocabulary does not match the TF-IDF matrix",
+        )
+    qv = qv.tocsr()
+    if qv.nnz == 0:
+        return []  # only stop words / unknown terms
+
+    order, scores = art.inverted_index().topk(qv.indices, qv.data, top_n)
+    out: List[Tuple[str, float]] = []
+    for i, score in zip(order, scores):
+        title_i = _row_title(art, int(i))
+        if title_i is None:
+            continue
+        out.append((title_i, float(score)))
+    return out
+
+
+def load_local_tmdb_cards(path: str) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def local_tmdb_card(
+    row: int, art: Optional[ArtifactBundle] = None
+) -> Tuple[bool, Optional[Card]]:
+    """
+    Card for a df row from the offline index.
+    Returns (known, card): known=False means the row was never resolved
+    and the caller should fall back to a live TMDB search.
+    """
+    cards = (art or current_bundle()).tmdb_cards
+    if cards is None or not 0 <= row < len(cards["tmdb_id"]):
+        return False, None
+    tmdb_id = int(cards["tmdb_id"][row])
+    if tmdb_id == 0:
+        return False, None
+    if tmdb_id < 0:
+        return True, None  # resolver confirmed it is not on TMDB
+    return True, make_card(
+        tmdb_id,
+        cards["title"][row],
+        make_img_url(str(cards["poster_path"][row])),
+        str(cards["release_date"][row]) or None,
+        cards["vote_average"][row],
+    )
+
+async def attach_tmdb_card_by_title(title: str) -> Optional[Card]:
     """
     Uses TMDB search by title to fetch poster for a local title.
     If not found, returns None (never crashes the endpoint).
@@ -235,47 +1004,755 @@ async def attach_tmdb_card_by_title(title: str) -> Optional[TMDBMovieCard]:
         m = await tmdb_search_first(title)
         if not m:
             return None
-        return TMDBMovieCard(
-            tmdb_id=int(m["id"]),
-            title=m.get("title") or title,
-            poster_url=make_img_url(m.get("poster_path")),
-            release_date=m.get("release_date"),
-            vote_average=m.get("vote_average"),
+        return make_card(
+            m["id"],
+            m.get("title") or title,
+            make_img_url(m.get("poster_path")),
+            m.get("release_date"),
+            m.get("vote_average"),
         )
     except Exception:
         return None
-    
+
+
+async def attach_tmdb_cards_by_titles(
+    titles: List[str],
+) -> List[Optional[Card]]:
+    """
+    Bounded-concurrency version of attach_tmdb_card_by_title.
+    Output order matches `titles`; a lookup slower than
+    TMDB_ENRICH_TIMEOUT yields None instead of holding up the rest.
+    """
+    sem = asyncio.Semaphore(max(1, TMDB_ENRICH_CONCURRENCY))
+
+    async def one(title: str) -> Optional[Card]:
+        async with sem:
+            try:
+                return await asyncio.wait_for(
+                    attach_tmdb_card_by_title(title), timeout=TMDB_ENRICH_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                TMDB_ERRORS.inc("/search/movie", "enrich_timeout")
+                return None
+
+    return list(await asyncio.gather(*(one(t) for t in titles)))
+
+
+async def attach_tmdb_cards_for_hits(
+    hits: List[Tuple[int, str, float]],
+    art: Optional[ArtifactBundle] = None,
+) -> List[Optional[Card]]:
+    """
+    Offline cards first (zero upstream calls); live search only for rows
+    the offline resolver has not covered.
+    """
+    art = art or current_bundle()
+    cards: List[Optional[Card]] = []
+    missing: List[int] = []
+    for k, (row, _, _) in enumerate(hits):
+        known, card = local_tmdb_card(row, art)
+        cards.append(card)
+        if not known:
+            missing.append(k)
+
+    if missing:
+        live = await attach_tmdb_cards_by_titles([hits[k][1] for k in missing])
+        for k, card in zip(missing, live):
+            cards[k] = card
+    return cards
+
+@contextlib.contextmanager
+def _load_stage(timings: Dict[str, float], name: str) -> Iterator[None]:
+    LOAD_PROGRESS[name] = {"state": "loading"}
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        LOAD_PROGRESS[name] = {
+            "state": "failed",
+            "seconds": round(time.perf_counter() - started, 4),
+            "error": f"{type(e).__name__}: {e}",
+        }
+        raise
+    timings[name] = time.perf_counter() - started
+    ARTIFACT_LOAD_SECONDS.set(timings[name], name)
+    LOAD_PROGRESS[name] = {"state": "loaded", "seconds": round(timings[name], 4)}
+
+
+def _load_artifact(timings: Dict[str, float], name: str, fn: Callable[[], Any]) -> Any:
+    """One loader run as a stage; an optional artifact that is absent reports "missing"."""
+    with _load_stage(timings, name):
+        value = fn()
+    if value is None or (isinstance(value, tuple) and all(v is None for v in value)):
+        LOAD_PROGRESS[name]["state"] = "missing"
+    return value
+
+
+def _read_pickle(path: str) -> Any:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def artifact_paths() -> List[str]:
+    """
+    Files whose replacement means a new bundle. Delta segments are not
+    listed: appends are merged incrementally (catalog_sync).
+    """
+    if is_artifact_dir(ARTIFACT_DIR):
+        # manifest.json is written last, and compaction swaps the directory
+        base = [os.path.join(ARTIFACT_DIR, "manifest.json")]
+    else:
+        base = [DF_PATH, INDICES_PATH, TFIDF_MATRIX_PATH]
+    return base + [
+        TFIDF_PATH, NEIGHBORS_IDX_PATH, NEIGHBORS_SCORE_PATH, ANN_INDEX_DIR, TMDB_CARDS_PATH,
+    ]
+
+
+def load_bundle() -> ArtifactBundle:
+    """Reads every artifact into a new bundle; serving state is not touched."""
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    LOAD_PROGRESS.clear()
+    fp = artifact_fingerprint(artifact_paths())
+    df = indices_obj = manifest = None
+    use_dir = is_artifact_dir(ARTIFACT_DIR)
+
+    # Every file below is independent of the others: read them concurrently
+    # (file I/O, mmap setup and NumPy copies release the GIL)
+    jobs: Dict[str, Callable[[], Any]] = {}
+    if use_dir:
+        # Fast path: memory-mapped CSR arrays, columnar titles, prebuilt map.
+        # The DataFrame and the vectorizer are not needed to serve.
+        jobs["artifact_dir"] = lambda: load_artifact_dir(ARTIFACT_DIR, mmap=ARTIFACT_MMAP)
+    else:
+        # df.pkl and indices.pkl both import pandas while unpickling; two
+        # threads importing it at once can deadlock on its import locks
+        import pandas  # noqa: F401
+
+        jobs["df"] = lambda: _read_pickle(DF_PATH)
+        jobs["indices"] = lambda: _read_pickle(INDICES_PATH)
+        jobs["tfidf_matrix"] = lambda: _read_pickle(TFIDF_MATRIX_PATH)  # usually scipy sparse
+    # tfidf vectorizer (used by /recommend/text and catalog appends); a
+    # compacted artifact directory carries its re-weighted copy
+    vectorizer_path = catalog.vectorizer_path(ARTIFACT_DIR, TFIDF_PATH) if use_dir else TFIDF_PATH
+    if TFIDF_VECTORIZER_LOAD == "eager":
+        jobs["tfidf"] = lambda: _read_pickle(vectorizer_path)
+    else:
+        LOAD_PROGRESS["tfidf"] = {"state": "deferred"}
+    # Precomputed top-K neighbours, memory-mapped (optional)
+    jobs["neighbors"] = load_neighbor_table
+    # ANN engine (optional unless TFIDF_ENGINE=ann)
+    jobs["ann_index"] = lambda: load_ann_index(ANN_INDEX_DIR, mmap=ARTIFACT_MMAP)
+    # Offline poster/id index (optional)
+    jobs["tmdb_cards"] = lambda: load_local_tmdb_cards(TMDB_CARDS_PATH)
+    for name in jobs:
+        LOAD_PROGRESS[name] = {"state": "pending"}
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, ARTIFACT_LOAD_WORKERS), thread_name_prefix="artifact-load"
+    ) as pool:
+        futures = {name: pool.submit(_load_artifact, timings, name, fn) for name, fn in jobs.items()}
+        loaded = {name: f.result() for name, f in futures.items()}
+
+    vectorizer = loaded.get("tfidf")
+    nb_idx, nb_score = loaded["neighbors"]
+    ann = loaded["ann_index"]
+    cards = loaded["tmdb_cards"]
+
+    if use_dir:
+        source = "artifact_dir"
+        manifest = loaded["artifact_dir"]["manifest"]
+        matrix = loaded["artifact_dir"]["tfidf_matrix"]
+        titles = loaded["artifact_dir"]["titles"]
+        title_to_idx = loaded["artifact_dir"]["title_to_idx"]
+    else:
+        source = "pickles"
+        df = loaded["df"]
+        indices_obj = loaded["indices"]
+        matrix = loaded["tfidf_matrix"]
+
+        # sanity
+        if df is None or "title" not in df.columns:
+            raise RuntimeError("df.pkl must contain a DataFrame with a 'title' column")
+
+        # Build normalized map
+        title_to_idx = build_title_to_idx_map(indices_obj)
+        titles = df["title"].astype(str).tolist()
+
+    # Movies appended since the last build/compaction (catalog.py)
+    base_rows = matrix.shape[0]
+    with _load_stage(timings, "catalog_deltas"):
+        matrix, titles, _ = catalog.merge_segments(
+            matrix, titles, title_to_idx, CATALOG_DELTA_DIR, (manifest or {}).get("idf_sha1")
+        )
+
+    # Reduced precision / quantized values (copies a memory-mapped matrix;
+    # convert offline with `artifacts.py convert --precision` to keep sharing)
+    with _load_stage(timings, "precision"):
+        matrix = precision.convert(matrix, TFIDF_PRECISION)
+
+    if ann is not None and ann.n_rows > matrix.shape[0]:
+        raise RuntimeError("ann_index does not match the TF-IDF matrix; rerun ann.py build")
+    if TFIDF_ENGINE == "ann" and ann is None:
+        raise RuntimeError(f"TFIDF_ENGINE=ann but no ANN index at {ANN_INDEX_DIR}")
+
+    timings["total"] = time.perf_counter() - started
+    ARTIFACT_LOAD_SECONDS.set(timings["total"], "total")
+    return ArtifactBundle(
+        fp,
+        matrix,
+        titles,
+        title_to_idx,
+        source=source,
+        manifest=manifest,
+        df=df,
+        indices_obj=indices_obj,
+        vectorizer=vectorizer,
+        vectorizer_path=vectorizer_path,
+        neighbors_idx=nb_idx,
+        neighbors_score=nb_score,
+        ann_index=ann,
+        tmdb_cards=cards,
+        fuzzy_min_score=FUZZY_TITLE_MIN_SCORE,
+        delta_rows=matrix.shape[0] - base_rows,
+        load_seconds=timings,
+    )
+
+
+def load_pickles(background_fuzzy: bool = True):
+    """Loads the artifacts and serves from them right away (startup, serve.py, benchmarks).
+
+    serve.py passes background_fuzzy=False: it warms the title index itself,
+    and a build thread still running at fork would leave its lock held in
+    every worker.
+    """
+    global BUNDLE
+    started = time.perf_counter()
+    STARTUP_STATUS.update(state="loading", error=None)
+    try:
+        art = load_bundle()
+        art.validate()
+    except Exception as e:
+        STARTUP_STATUS.update(state="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    BUNDLE = art
+    STARTUP_STATUS.update(state="ready", load_s=round(time.perf_counter() - started, 4))
+    if FUZZY_TITLE_ENABLED and background_fuzzy:
+        # build off the startup path; a request arriving first builds it inline
+        threading.Thread(target=art.title_index.get, daemon=True).start()
+    _preload_vectorizer(art)
+
+
+def _preload_vectorizer(art: ArtifactBundle) -> None:
+    """TFIDF_VECTORIZER_LOAD=background: unpickle tfidf.pkl once `art` serves."""
+    if TFIDF_VECTORIZER_LOAD != "background" or art.vectorizer_loaded() or not art.vectorizer_path:
+        return
+
+    def run() -> None:
+        try:
+            with _load_stage({}, "tfidf"):
+                art.vectorizer()
+        except Exception:
+            # /recommend/text retries on first use and reports the error
+            logging.getLogger("artifacts").exception("background vectorizer load failed")
+
+    threading.Thread(target=run, name="vectorizer-load", daemon=True).start()
+
+
+# =========================
+# ARTIFACT RELOADS (artifact_bundle.py)
+# =========================
+def _prepare_bundle(art: ArtifactBundle, previous: Optional[ArtifactBundle]) -> Dict[str, float]:
+    """Validation and warm-up before `art` takes traffic."""
+    art.validate()
+    # the free-text index is only worth building if it was in use
+    text = previous is not None and previous.inverted_index_built()
+    return art.warm(fuzzy=FUZZY_TITLE_ENABLED, text=text)
+
+
+def _swap_bundle(art: ArtifactBundle) -> None:
+    """
+    Publishes `art`. Requests already running keep the bundle they started
+    with; the old one is released in the background once they are done.
+    Caller holds _swap_lock.
+    """
+    global BUNDLE
+    old = BUNDLE
+    BUNDLE = art
+    _preload_vectorizer(art)
+    if old is not None:
+        RETIRED_BUNDLES.add(old)
+        del old
+        threading.Thread(
+            target=RETIRED_BUNDLES.drain, args=(ARTIFACT_DRAIN_TIMEOUT,),
+            name="bundle-drain", daemon=True,
+        ).start()
+    scorer.restart()  # process workers load their own copy
+
+
+def reload_artifacts(trigger: str) -> Dict[str, Any]:
+    """
+    Loads, validates and warms a new bundle off the serving path, then
+    swaps it in. On any failure the current bundle keeps serving.
+    """
+    started = time.perf_counter()
+    RELOAD_STATUS["reloading"] = True
+    RELOAD_STATUS["last_trigger"] = trigger
+    try:
+        with _swap_lock:
+            art = load_bundle()
+            warm = _prepare_bundle(art, BUNDLE)
+            _swap_bundle(art)
+    except Exception as e:
+        RELOAD_STATUS["failures"] += 1
+        RELOAD_STATUS["last_error"] = f"{type(e).__name__}: {e}"
+        ARTIFACT_RELOADS.inc(trigger, "failed")
+        logging.getLogger("artifacts").exception("artifact reload (%s) failed", trigger)
+        raise
+    finally:
+        RELOAD_STATUS["reloading"] = False
+
+    elapsed = time.perf_counter() - started
+    RELOAD_STATUS["reloads"] += 1
+    RELOAD_STATUS["last_reload_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    RELOAD_STATUS["last_reload_s"] = round(elapsed, 3)
+    RELOAD_STATUS["last_warm_s"] = round(sum(warm.values()), 3)
+    RELOAD_STATUS["last_error"] = None
+    ARTIFACT_RELOADS.inc(trigger, "ok")
+    logging.getLogger("artifacts").info(
+        "serving artifacts %s (%s trigger, %.2fs)", art.version, trigger, elapsed
+    )
+    return {"version": art.version, "seconds": elapsed, "warm_s": warm}
+
+
+def _artifact_watcher() -> None:
+    """
+    Background loop: reload when the artifact files change. A change must
+    hold for one more interval (files still being copied), and a version
+    that failed to load is not retried until it changes again.
+    """
+    pending: Optional[str] = None
+    failed: Optional[str] = None
+    while True:
+        time.sleep(ARTIFACT_WATCH_INTERVAL)
+        art = BUNDLE
+        if art is None or RELOAD_STATUS["reloading"]:
+            continue
+        fp = artifact_fingerprint(artifact_paths())
+        if fp == art.fingerprint or fp == failed:
+            pending = None
+            continue
+        if fp != pending:
+            pending = fp
+            continue
+        pending = None
+        try:
+            reload_artifacts("watcher")
+        except Exception:
+            failed = fp
+
+
+# =========================
+# CATALOG UPDATES (catalog.py)
+# =========================
+def _publish_appended(
+    art: ArtifactBundle, matrix: Any, titles: Sequence[str], new_keys: Dict[str, int]
+) -> None:
+    """
+    Swaps in `art` grown by appended rows. Caller holds _swap_lock. The
+    title map, title index and inverted index are extended, not copied or
+    rebuilt, so an append costs about its own size.
+    """
+    grown = art.derive(
+        matrix,
+        titles,
+        catalog.extend_title_map(art.title_to_idx, new_keys),
+        art.delta_rows + matrix.shape[0] - art.n_rows,
+        added_titles=new_keys,
+    )
+    _prepare_bundle(grown, art)
+    _swap_bundle(grown)
+
+
+def _merge_new_segments() -> int:
+    """Segments written by other processes since we last looked. Caller holds the locks."""
+    art = current_bundle()
+    new_keys: Dict[str, int] = {}
+    matrix, titles, merged = catalog.merge_segments(
+        art.tfidf_matrix, art.titles, new_keys, CATALOG_DELTA_DIR,
+        (art.manifest or {}).get("idf_sha1"),
+    )
+    if merged:
+        _publish_appended(art, matrix, titles, new_keys)
+        CATALOG_STATUS["segments_merged"] += merged
+    return merged
+
+
+def catalog_sync() -> int:
+    # nothing new: skip the lock file (and creating the delta dir)
+    if catalog.segments_end(CATALOG_DELTA_DIR) <= current_bundle().n_rows:
+        return 0
+    with _swap_lock, catalog.segment_lock(CATALOG_DELTA_DIR):
+        return _merge_new_segments()
+
+
+def catalog_append(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Transforms new movies with the loaded vectorizer (vocabulary and IDF
+    unchanged), persists them as a delta segment and appends the rows.
+    A title already in the catalog now resolves to the new row.
+    """
+    with _swap_lock, catalog.segment_lock(CATALOG_DELTA_DIR):
+        _merge_new_segments()
+        art = current_bundle()
+        try:
+            vectorizer = art.vectorizer()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"TF-IDF vectorizer unavailable: {e}")
+        try:
+            rows, titles = catalog.transform_records(vectorizer, records, CATALOG_SOUP_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if rows.shape[1] != art.tfidf_matrix.shape[1]:
+            raise HTTPException(
+                status_code=500, detail="tfidf.pkl vocabulary does not match the TF-IDF matrix"
+            )
+        try:
+            catalog.check_vectorizer(ARTIFACT_DIR, vectorizer)
+        except RuntimeError as e:
+            # another worker compacted; our rows would carry the old weights
+            raise HTTPException(status_code=409, detail=str(e))
+        offset = art.n_rows
+        segment = catalog.write_segment(
+            CATALOG_DELTA_DIR, rows, titles, offset, catalog.idf_checksum(vectorizer)
+        )
+        new_keys = {_norm_title(t): offset + k for k, t in enumerate(titles)}
+        replaced = sum(1 for key in new_keys if key in art.title_to_idx)
+        _publish_appended(
+            art,
+            catalog.append_rows(art.tfidf_matrix, rows),
+            catalog.append_titles(art.titles, titles),
+            new_keys,
+        )
+        CATALOG_STATUS["appended_rows"] += len(titles)
+        CATALOG_STATUS["last_append_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+    return {
+        "segment": os.path.basename(segment),
+        "row_offset": offset,
+        "rows": len(titles),
+        "replaced_titles": replaced,
+        "empty_documents": int((rows.getnnz(axis=1) == 0).sum()),
+        "n_rows": offset + len(titles),
+    }
+
+
+def _compaction_blocked(art: ArtifactBundle) -> Optional[str]:
+    """Why compacting from the serving matrix would lose precision on disk, if it would."""
+    serving = precision.matrix_precision(art.tfidf_matrix)
+    if serving in precision.QUANTIZED_DTYPES and serving != (art.manifest or {}).get("quantization"):
+        return (
+            f"TFIDF_PRECISION={serving} quantizes at load; compact the full-precision "
+            "files with `python catalog.py compact` instead"
+        )
+    return None
+
+
+def catalog_compact() -> Dict[str, Any]:
+    """
+    Folds every delta segment into a fresh artifact directory with IDF
+    recomputed over the whole catalog, then serves from it (memory-mapped
+    again). Neighbour / ANN tables keep covering their original rows; rebuild
+    them afterwards to pick up the new weights.
+    """
+    started = time.perf_counter()
+    CATALOG_STATUS["compacting"] = True
+    try:
+        with _swap_lock, catalog.segment_lock(CATALOG_DELTA_DIR):
+            _merge_new_segments()
+            art = current_bundle()
+            blocked = _compaction_blocked(art)
+            if blocked:
+                raise RuntimeError(blocked)
+            stored = (art.manifest or {}).get("quantization")
+            segments = catalog.list_segments(CATALOG_DELTA_DIR)
+            # the serving bundle keeps its vectorizer: re-weight a copy
+            vectorizer = copy.deepcopy(art.vectorizer())
+            matrix, idf = catalog.reweight_idf(art.tfidf_matrix, np.asarray(vectorizer.idf_))
+            catalog.set_idf(vectorizer, idf)
+            if stored:
+                matrix = precision.convert(matrix, stored)
+            catalog.write_compacted(
+                ARTIFACT_DIR, matrix, art.titles, dict(art.title_to_idx), vectorizer
+            )
+            catalog.remove_segments(segments)
+            compacted = load_bundle()
+            _prepare_bundle(compacted, art)
+            _swap_bundle(compacted)
+    finally:
+        CATALOG_STATUS["compacting"] = False
+
+    elapsed = time.perf_counter() - started
+    CATALOG_STATUS["compactions"] += 1
+    CATALOG_STATUS["last_compaction_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    CATALOG_STATUS["last_compaction_s"] = round(elapsed, 3)
+    return {"segments": len(segments), "n_rows": compacted.n_rows, "seconds": elapsed}
+
+
+def _catalog_task(fn: Any) -> None:
+    try:
+        fn()
+        CATALOG_STATUS["last_error"] = None
+    except Exception as e:
+        CATALOG_STATUS["last_error"] = f"{type(e).__name__}: {e}"
+        logging.getLogger("catalog").exception("catalog %s failed", fn.__name__)
+
+
+def _catalog_maintenance() -> None:
+    """Background loop: pick up other workers' segments, compact periodically."""
+    intervals = [i for i in (CATALOG_SYNC_INTERVAL, CATALOG_COMPACT_INTERVAL) if i > 0]
+    tick = min(intervals)
+    last_compaction = time.monotonic()
+    while True:
+        time.sleep(tick)
+        if CATALOG_SYNC_INTERVAL > 0:
+            _catalog_task(catalog_sync)
+        if CATALOG_COMPACT_INTERVAL > 0 and time.monotonic() - last_compaction >= CATALOG_COMPACT_INTERVAL:
+            last_compaction = time.monotonic()
+            if catalog.list_segments(CATALOG_DELTA_DIR) and not _compaction_blocked(current_bundle()):
+                _catalog_task(catalog_compact)
+
+
+@app.on_event("startup")
+def startup_load_artifacts():
+    # serve.py loads once in the parent and forks; workers inherit the globals
+    if ARTIFACTS_PRELOADED:
+        return
+    if not ARTIFACT_BACKGROUND_LOAD:
+        load_pickles()
+        return
+
+    def run() -> None:
+        try:
+            load_pickles()
+        except Exception:
+            # recorded in STARTUP_STATUS; /health fails so the pod is replaced
+            logging.getLogger("artifacts").exception("startup artifact load failed")
+
+    STARTUP_STATUS["state"] = "loading"
+    threading.Thread(target=run, name="artifact-load", daemon=True).start()
+
+
 @app.on_event("startup")
-def load_pickles():
-    global df, indices_obj, tfidf_matrix, tfidf_obj, TITLE_TO_IDX
+def start_scorer():
+    global scorer
+    scorer = ScoringExecutor(
+        SCORING_BACKEND, workers=SCORING_WORKERS, max_queue=SCORING_MAX_QUEUE
+    )
+    scorer.start()
 
-    # Load df
-    with open(DF_PATH, "rb") as f:
-        df = pickle.load(f)
 
-    # Load indices
-    with open(INDICES_PATH, "rb") as f:
-        indices_obj = pickle.load(f)
+@app.on_event("shutdown")
+def stop_scorer():
+    scorer.shutdown()
 
-    # Load TF-IDF matrix (usually scipy sparse)
-    with open(TFIDF_MATRIX_PATH, "rb") as f:
-        tfidf_matrix = pickle.load(f)
 
-    # Load tfidf vectorizer (optional, not used directly here)
-    with open(TFIDF_PATH, "rb") as f:
-        tfidf_obj = pickle.load(f)
+@app.on_event("startup")
+def start_artifact_watcher():
+    if ARTIFACT_WATCH_INTERVAL > 0:
+        threading.Thread(target=_artifact_watcher, name="artifact-watcher", daemon=True).start()
 
-    # Build normalized map
-    TITLE_TO_IDX = build_title_to_idx_map(indices_obj)
 
-    # sanity
-    if df is None or "title" not in df.columns:
-        raise RuntimeError("df.pkl must contain a DataFrame with a 'title' column")
+@app.on_event("startup")
+def start_catalog_maintenance():
+    if CATALOG_SYNC_INTERVAL > 0 or CATALOG_COMPACT_INTERVAL > 0:
+        threading.Thread(target=_catalog_maintenance, name="catalog", daemon=True).start()
+
+
+@app.on_event("startup")
+async def open_tmdb_client():
+    global tmdb_client
+    tmdb_client = create_tmdb_client()
+
+
+@app.on_event("startup")
+async def start_feeds():
+    if not FEEDS_ENABLED:
+        return
+    for category, (path, params) in HOME_CATEGORIES.items():
+        feeds.register(f"home:{category}", _feed_fetcher(path, params))
+    feeds.start()
+    if FEEDS_PRELOAD_GENRES:
+        asyncio.ensure_future(preload_genre_feeds())
+
+
+@app.on_event("shutdown")
+async def stop_feeds():
+    await feeds.stop()
+
+
+@app.on_event("shutdown")
+async def close_tmdb_client():
+    global tmdb_client
+    if tmdb_client is not None:
+        await tmdb_client.aclose()
+        tmdb_client = None
 
 @app.get("/health")
 def health():
+    """Liveness: fails only when the startup load failed (the pod will never get ready)."""
+    if STARTUP_STATUS["state"] == "failed":
+        return JSONResponse(
+            {"status": "failed", "error": STARTUP_STATUS["error"]}, status_code=503
+        )
     return {"status": "ok"}
 
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: 200 once an artifact bundle serves, 503 before. Lists each
+    artifact's state (pending / loading / loaded / missing / deferred /
+    failed) and load seconds for the most recent load.
+    """
+    art = BUNDLE
+    body = {
+        "ready": art is not None,
+        "version": art.version if art is not None else None,
+        "source": art.source if art is not None else None,
+        **STARTUP_STATUS,
+        "reloading": RELOAD_STATUS["reloading"],
+        # loader threads replace entries while this runs
+        "artifacts": {k: dict(v) for k, v in list(LOAD_PROGRESS.items())},
+    }
+    return JSONResponse(body, status_code=200 if art is not None else 503)
+
+@app.get("/scoring/stats")
+def scoring_stats():
+    return scorer.stats()
+
+@app.get("/feeds/status")
+def feeds_status():
+    return {"enabled": FEEDS_ENABLED, **feeds.status()}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"enabled": TMDB_CACHE_ENABLED, **tmdb_cache.stats()}
+
+
+def _require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API disabled: set ADMIN_TOKEN")
+    if not hmac.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/artifacts")
+def admin_artifacts(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return {
+        "serving": current_bundle().describe(),
+        # swapped out, still referenced by in-flight requests
+        "retired": RETIRED_BUNDLES.versions(),
+        "watch_interval_s": ARTIFACT_WATCH_INTERVAL,
+        **RELOAD_STATUS,
+    }
+
+
+@app.post("/admin/artifacts/reload", status_code=202)
+def admin_artifacts_reload(x_admin_token: Optional[str] = Header(None)):
+    """
+    Loads the artifacts on disk into a new bundle in the background and
+    swaps it in once validated and warmed; progress in /admin/artifacts.
+    """
+    _require_admin(x_admin_token)
+    if RELOAD_STATUS["reloading"]:
+        raise HTTPException(status_code=409, detail="Reload already running")
+    RELOAD_STATUS["reloading"] = True
+
+    def run() -> None:
+        try:
+            reload_artifacts("admin")
+        except Exception:
+            pass  # recorded in RELOAD_STATUS
+
+    threading.Thread(target=run, name="artifact-reload", daemon=True).start()
+    return {"status": "started", "serving": BUNDLE.version if BUNDLE else None}
+
+
+@app.get("/admin/catalog/status")
+def admin_catalog_status(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    art = current_bundle()
+    segments = catalog.list_segments(CATALOG_DELTA_DIR)
+    return {
+        **CATALOG_STATUS,
+        "n_rows": art.n_rows,
+        "segments_on_disk": [os.path.basename(p) for p in segments],
+        # rows the precomputed tables cover; the rest are scored exactly
+        "neighbors_rows": art.describe()["neighbors_rows"],
+        "ann_rows": art.describe()["ann_rows"],
+    }
+
+
+@app.post("/admin/catalog/append")
+def admin_catalog_append(req: CatalogAppendRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Adds movies to the TF-IDF catalog without a rebuild:
+      {"movies": [{"title": "...", "overview": "..."}, ...]}
+    """
+    _require_admin(x_admin_token)
+    if not req.movies:
+        raise HTTPException(status_code=400, detail="Provide movies")
+    if len(req.movies) > CATALOG_APPEND_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {CATALOG_APPEND_MAX_ITEMS} movies per append"
+        )
+    return catalog_append(req.movies)
+
+
+@app.post("/admin/catalog/compact", status_code=202)
+def admin_catalog_compact(x_admin_token: Optional[str] = Header(None)):
+    """Starts a compaction in the background; progress in /admin/catalog/status."""
+    _require_admin(x_admin_token)
+    if CATALOG_STATUS["compacting"]:
+        raise HTTPException(status_code=409, detail="Compaction already running")
+    blocked = _compaction_blocked(current_bundle())
+    if blocked:
+        raise HTTPException(status_code=409, detail=blocked)
+    CATALOG_STATUS["compacting"] = True
+    threading.Thread(target=_catalog_task, args=(catalog_compact,), daemon=True).start()
+    return {"status": "started"}
+
+# state owned by other components, read at scrape time
+metrics.gauge(
+    "tmdb_cache", "TMDB response cache counters and size (see /cache/stats)", ("stat",),
+    collect=lambda: {(k,): float(v) for k, v in tmdb_cache.stats().items()},
+)
+metrics.gauge(
+    "tmdb_circuit_state", "1 for the TMDB circuit breaker's current state", ("state",),
+    collect=lambda: {
+        (st,): float(tmdb_breaker.state == st)
+        for st in (CircuitBreaker.CLOSED, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN)
+    },
+)
+metrics.gauge(
+    "tmdb_retry_budget", "Retries currently available in the TMDB retry budget",
+    collect=lambda: {(): tmdb_retry_budget.balance},
+)
+metrics.gauge(
+    "artifact_bundle_info", "Serving artifact version (value is always 1)", ("version",),
+    collect=lambda: {(BUNDLE.version,): 1.0} if BUNDLE is not None else {},
+)
+metrics.gauge(
+    "scoring_in_flight", "Scoring calls running or queued", ("backend",),
+    collect=lambda: {(scorer.backend,): float(scorer.stats()["in_flight"])},
+)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_route():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/home", response_model=List[TMDBMovieCard])
 async def home(
     category: str = Query("popular"),
@@ -288,15 +1765,11 @@ async def home(
       - popular, top_rated, upcoming, now_playing  (movie/{category})
     """
     try:
-        if category == "trending":
-            data = await tmdb_get("/trending/movie/day", {"language": "en-US"})
-            return await tmdb_cards_from_results(data.get("results", []), limit=limit)
-
-        if category not in {"popular", "top_rated", "upcoming", "now_playing"}:
+        if category not in HOME_CATEGORIES:
             raise HTTPException(status_code=400, detail="Invalid category")
 
-        data = await tmdb_get(f"/movie/{category}", {"language": "en-US", "page": 1})
-        return await tmdb_cards_from_results(data.get("results", []), limit=limit)
+        results = await home_results(category)
+        return FastJSONResponse(await tmdb_cards_from_results(results, limit=limit))
 
     except HTTPException:
         raise
@@ -332,30 +1805,150 @@ async def recommend_genre(
     - discover movies in that genre (popular)
     """
     details = await tmdb_movie_details(tmdb_id)
-    if not details.genres:
-        return []
-
-    genre_id = details.genres[0]["id"]
-    discover = await tmdb_get(
-        "/discover/movie",
-        {
-            "with_genres": genre_id,
-            "language": "en-US",
-            "sort_by": "popularity.desc",
-            "page": 1,
-        },
-    )
-    cards = await tmdb_cards_from_results(discover.get("results", []), limit=limit)
-    return [c for c in cards if c.tmdb_id != tmdb_id]
+    return FastJSONResponse(await bundle_genre(details, limit))
 @app.get("/recommend/tfidf")
 async def recommend_tfidf(
     title: str = Query(..., min_length=1),
     top_n: int = Query(10, ge=1, le=50),
+    engine: Optional[str] = Query(None, pattern="^(exact|ann)$"),
+    nprobe: Optional[int] = Query(None, ge=1, le=4096),
+    fuzzy: bool = Query(False),
 ):
-    recs = tfidf_recommend_titles(title, top_n=top_n)
+    art = current_bundle()
+    if fuzzy:
+        match = resolve_local_title(title, art)
+        if match is None:
+            raise HTTPException(
+                status_code=404, detail=f"Title not found in local dataset: '{title}'"
+            )
+        hits = await run_scoring(
+            tfidf_recommend_hits_for_row,
+            match.idx,
+            art=art,
+            top_n=top_n,
+            engine=engine,
+            nprobe=nprobe,
+        )
+        return [{"title": t, "score": s} for _, t, s in hits]
+    recs = await run_scoring(
+        tfidf_recommend_titles, title, art=art, top_n=top_n, engine=engine, nprobe=nprobe
+    )
     return [{"title": t, "score": s} for t, s in recs]
 
 
+@app.get("/recommend/text")
+async def recommend_text(
+    q: str = Query(..., min_length=1, max_length=2000),
+    top_n: int = Query(10, ge=1, le=50),
+):
+    """
+    "More like this description": free text -> local titles, same
+    (title, score) shape as /recommend/tfidf.
+    """
+    recs = await run_scoring(tfidf_recommend_text, q, art=current_bundle(), top_n=top_n)
+    return [{"title": t, "score": s} for t, s in recs]
+
+
+@app.post("/recommend/tfidf/batch")
+def recommend_tfidf_batch(req: TFIDFBatchRequest):
+    """
+    Many TF-IDF lookups in one call (digests, carousel precompute).
+    Streams NDJSON, one line per requested title/index in request order:
+      {"query": ..., "index": row, "results": [{"title", "score"}, ...]}
+      {"query": ..., "error": "..."}   (title not found / bad index)
+    """
+    art = current_bundle()
+    n_items = len(req.titles) + len(req.indices)
+    if n_items == 0:
+        raise HTTPException(status_code=400, detail="Provide titles or indices")
+    if n_items > TFIDF_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {TFIDF_BATCH_MAX_ITEMS} titles/indices per batch",
+        )
+
+    n_rows = art.n_rows
+    queries: List[Tuple[Any, Optional[int]]] = []
+    for t in req.titles:
+        queries.append((t, art.title_to_idx.get(_norm_title(t))))
+    for i in req.indices:
+        queries.append((i, i if 0 <= i < n_rows else None))
+
+    def lines():
+        rows = [r for _, r in queries if r is not None]
+        results = tfidf_recommend_batch(rows, top_n=req.top_n, art=art)
+        for q, r in queries:
+            if r is None:
+                what = "Title not found in local dataset" if isinstance(q, str) else "Index out of range"
+                line = {"query": q, "error": f"{what}: {q!r}"}
+            else:
+                line = {
+                    "query": q,
+                    "index": r,
+                    "results": [{"title": t, "score": s} for _, t, s in next(results)],
+                }
+            yield fast_json.dumps(line) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+
+async def search_details(query: str) -> TMDBMovieDetails:
+    """Best TMDB match for `query` -> full details (404 if nothing matches)."""
+    best = await tmdb_search_first(query)
+    if not best:
+        raise HTTPException(
+            status_code=404, detail=f"No TMDB movie found for query: {query}"
+        )
+    return await tmdb_movie_details(int(best["id"]))
+
+
+async def bundle_tfidf(
+    candidates: Sequence[str], top_n: int
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Local TF-IDF recommendations + posters for the first candidate title
+    that resolves to a local row. Fuzzy matching covers
+    punctuation/accents/year/subtitle differences with the local title.
+    Returns dicts shaped like TFIDFRecItem / TitleMatchInfo.
+    """
+    art = current_bundle()
+    recs: List[Tuple[int, str, float]] = []
+    match_info: Optional[Dict[str, Any]] = None
+    for candidate in candidates:
+        try:
+            match = resolve_local_title(candidate, art)
+            if match is None:
+                continue
+            recs = await run_scoring(
+                tfidf_recommend_hits_for_row, match.idx, art=art, top_n=top_n
+            )
+        except Exception:
+            continue
+        match_info = {
+            "title": candidate,
+            "matched_title": _row_title(art, match.idx) or "",
+            "score": float(match.score),
+            "path": match.path,
+        }
+        break
+
+    cards = await attach_tmdb_cards_for_hits(recs, art)
+    items = [
+        {"title": title, "score": score, "tmdb": card}
+        for (_, title, score), card in zip(recs, cards)
+    ]
+    return items, match_info
+
+
+async def bundle_genre(details: TMDBMovieDetails, limit: int) -> List[Card]:
+    """Popular movies from the selected movie's first genre (TMDB discover)."""
+    if not details.genres:
+        return []
+    results = await genre_results(details.genres[0]["id"])
+    cards = await tmdb_cards_from_results(results, limit=limit)
+    return [c for c in cards if c["tmdb_id"] != details.tmdb_id]
+
 
 @app.get("/movie/search", response_model=SearchBundleResponse)
 async def search_bundle(
@@ -372,53 +1965,130 @@ async def search_bundle(
     NOTE:
     - It selects the BEST match from TMDB for the given query.
     - If you want MULTIPLE matches, use /tmdb/search
+    - /movie/search/stream returns the same parts as they become ready
     """
-    best = await tmdb_search_first(query)
-    if not best:
-        raise HTTPException(
-            status_code=404, detail=f"No TMDB movie found for query: {query}"
-        )
+    details = await search_details(query)
 
-    tmdb_id = int(best["id"])
-    details = await tmdb_movie_details(tmdb_id)
+    # the two recommendation sources are independent: run them concurrently;
+    # TMDB title first, then the raw query
+    (tfidf_items, match_info), genre_recs = await asyncio.gather(
+        bundle_tfidf((details.title, query), tfidf_top_n),
+        bundle_genre(details, genre_limit),
+    )
 
-    tfidf_items: List[TFIDFRecItem] = []
+    return FastJSONResponse({
+        "query": query,
+        "movie_details": details.model_dump(mode="json"),
+        "tfidf_recommendations": tfidf_items,
+        "genre_recommendations": genre_recs,
+        "tfidf_match": match_info,
+    })
 
-    recs: List[Tuple[str, float]] = []
-    try:
-        
-        recs = tfidf_recommend_titles(details.title, top_n=tfidf_top_n)
-    except Exception:
-        
+
+def _ndjson_event(event: str, **fields: Any) -> bytes:
+    return fast_json.dumps({"event": event, **fields}) + b"\n"
+
+
+def stream_bundle(
+    details: TMDBMovieDetails, candidates: Sequence[str], tfidf_top_n: int, genre_limit: int
+) -> StreamingResponse:
+    """
+    NDJSON bundle, one event per line:
+      {"event": "movie_details", "data": {...}}
+      {"event": "tfidf_recommendations", "data": [...], "tfidf_match": {...}}
+      {"event": "genre_recommendations", "data": [...]}
+      {"event": "error", "part": "...", "status": 502, "detail": "..."}
+      {"event": "done"}
+    Details come first; the two recommendation parts run concurrently and
+    are sent in whichever order they finish.
+    """
+
+    async def tfidf_part() -> bytes:
+        items, match_info = await bundle_tfidf(candidates, tfidf_top_n)
+        return _ndjson_event("tfidf_recommendations", data=items, tfidf_match=match_info)
+
+    async def genre_part() -> bytes:
+        cards = await bundle_genre(details, genre_limit)
+        return _ndjson_event("genre_recommendations", data=cards)
+
+    async def events():
+        yield _ndjson_event("movie_details", data=details.model_dump(mode="json"))
+        tasks = {
+            asyncio.ensure_future(tfidf_part()): "tfidf_recommendations",
+            asyncio.ensure_future(genre_part()): "genre_recommendations",
+        }
         try:
-            recs = tfidf_recommend_titles(query, top_n=tfidf_top_n)
-        except Exception:
-            recs = []
-
-    for title, score in recs:
-        card = await attach_tmdb_card_by_title(title)
-        tfidf_items.append(TFIDFRecItem(title=title, score=score, tmdb=card))
-
-    genre_recs: List[TMDBMovieCard] = []
-    if details.genres:
-        genre_id = details.genres[0]["id"]
-        discover = await tmdb_get(
-            "/discover/movie",
-            {
-                "with_genres": genre_id,
-                "language": "en-US",
-                "sort_by": "popularity.desc",
-                "page": 1,
-            },
-        )
-        cards = await tmdb_cards_from_results(
-            discover.get("results", []), limit=genre_limit
-        )
-        genre_recs = [c for c in cards if c.tmdb_id != details.tmdb_id]
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        yield task.result()
+                    elif isinstance(exc, HTTPException):
+                        yield _ndjson_event(
+                            "error", part=tasks[task], status=exc.status_code, detail=exc.detail
+                        )
+                    else:
+                        yield _ndjson_event(
+                            "error", part=tasks[task], status=500, detail=repr(exc)
+                        )
+            yield _ndjson_event("done")
+        finally:
+            # client went away mid-stream: stop the remaining upstream work
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
-    return SearchBundleResponse(
-        query=query,
-        movie_details=details,
-        tfidf_recommendations=tfidf_items,
-        genre_recommendations=genre_recs,
+
+@app.get("/movie/search/stream")
+async def search_bundle_stream(
+    query: str = Query(..., min_length=1),
+    tfidf_top_n: int = Query(12, ge=1, le=30),
+    genre_limit: int = Query(12, ge=1, le=30),
+):
+    """
+    Progressive /movie/search: the same parts as NDJSON events, each sent
+    as soon as it is ready (see stream_bundle). A query with no TMDB match
+    is a plain 404 before streaming starts.
+    """
+    details = await search_details(query)
+    return stream_bundle(details, (details.title, query), tfidf_top_n, genre_limit)
+
+
+@app.get("/movie/id/{tmdb_id}/bundle", response_model=MovieBundleResponse)
+async def movie_bundle(
+    tmdb_id: int,
+    tfidf_top_n: int = Query(12, ge=1, le=30),
+    genre_limit: int = Query(12, ge=1, le=30),
+):
+    """
+    Details + TF-IDF + genre recommendations for a known TMDB id.
+    Unlike /movie/search there is no title search: details are fetched
+    once and always describe the movie that was clicked.
+    """
+    details = await tmdb_movie_details(tmdb_id)
+    (tfidf_items, match_info), genre_recs = await asyncio.gather(
+        bundle_tfidf((details.title,), tfidf_top_n),
+        bundle_genre(details, genre_limit),
     )
+    return FastJSONResponse({
+        "movie_details": details.model_dump(mode="json"),
+        "tfidf_recommendations": tfidf_items,
+        "genre_recommendations": genre_recs,
+        "tfidf_match": match_info,
+    })
+
+
+@app.get("/movie/id/{tmdb_id}/bundle/stream")
+async def movie_bundle_stream(
+    tmdb_id: int,
+    tfidf_top_n: int = Query(12, ge=1, le=30),
+    genre_limit: int = Query(12, ge=1, le=30),
+):
+    """Progressive /movie/id/{tmdb_id}/bundle (NDJSON, see stream_bundle)."""
+    details = await tmdb_movie_details(tmdb_id)
+    return stream_bundle(details, (details.title,), tfidf_top_n, genre_limit)
@@ -0,0 +1,259 @@
+"""
+Minimal Prometheus text-format metrics (no client library needed).
+
+    LATENCY = histogram("http_request_duration_seconds", "...", ("route", "status"))
+    LATENCY.observe(0.012, "/movie/search", "200")
+
+Recording is a dict lookup, a bisect and a few additions under one lock;
+formatting only happens when /metrics is scraped.
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; covers cache hits (sub-ms) up to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(suffix, formatted labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_fmt_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            yield "_total", _fmt_labels(self.labelnames, labels), v
+
+
+class Gauge(Metric):
+    """
+    Set explicitly, or pass `collect` returning {label values: value} to
+    read the current state (cache size, queue depth, ...) at scrape time.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def time(self, *labels: str) -> "_Timer":
+        """Sets the gauge to the duration of the `with` block (e.g. load times)."""
+        return _Timer(lambda elapsed: self.set(elapsed, *labels))
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if self._collect is not None:
+            values.update(self._collect())
+        for labels, v in sorted(values.items()):
+            yield "", _fmt_labels(self.labelnames, labels), v
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[labels] = series
+            series[0][i] += 1
+            series[1][0] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(lambda elapsed: self.observe(elapsed, *labels))
+
+    def samples(self):
+        with self._lock:
+            snapshot = [(k, list(c), s[0]) for k, (c, s) in sorted(self._series.items())]
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _fmt_value(bound) + '"'
+                yield "_bucket", _fmt_labels(self.labelnames, labels, le), cumulative
+            yield "_sum", _fmt_labels(self.labelnames, labels), total
+            yield "_count", _fmt_labels(self.labelnames, labels), cumulative
+
+
+class _Timer:
+    __slots__ = ("_record", "_started")
+
+    def __init__(self, record: Callable[[float], None]):
+        self._record = record
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._record(time.perf_counter() - self._started)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+
+def gauge(
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames, collect))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: request latency per (method, route template,
+    status) and in-flight count. Uses the matched route's path template
+    (/movie/id/{tmdb_id}), so label cardinality stays bounded. Streaming
+    responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: Any, latency: Histogram, in_flight: Gauge):
+        self.app = app
+        self.latency = latency
+        self.in_flight = in_flight
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.latency.observe(
+                time.perf_counter() - started, scope.get("method", ""), path, status
+            )
@@ -0,0 +1,328 @@
+"""
+Reduced-precision and quantized storage for the TF-IDF matrix.
+
+    python precision.py report                    # shipped pickles, all modes
+    python precision.py report --artifacts ./artifacts --k 10 --queries 1000
+
+The matrix is built as float64 values with int32/int64 indices, but ranking
+by cosine similarity does not need that much precision. Modes:
+- native   as stored (no conversion)
+- float32  float32 values, int32 indices / row pointers (half the bytes)
+- uint16   uint16 values + one float32 scale per row (~3 bytes / nnz)
+- int8     int8 values (0..127) + one float32 scale per row (~2.5 bytes / nnz)
+
+TF-IDF values are non-negative, so a row is quantized as
+round(value / scale) with scale = row max / qmax; dequantized values are
+within scale / 2 of the original. Scores are computed on the integer
+values and multiplied by the row scales afterwards. SciPy widens the values
+to float32 for the duration of one product (nnz * 4 transient bytes); the
+resident copy, shared between workers when memory-mapped, stays small.
+The quantized modes therefore save memory only: scoring is no faster than
+native, and float32 is the mode to pick for latency.
+
+`report` compares the top-K rankings of each mode against full precision
+(same query rows) and prints memory, mat-vec time and agreement.
+"""
+
+import argparse
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from similarity import topk_from_scores
+
+PRECISIONS = ("native", "float32", "uint16", "int8")
+QUANTIZED_DTYPES = {"uint16": np.uint16, "int8": np.int8}
+# int8 keeps to the non-negative half so values never wrap
+QUANTIZED_MAX = {"uint16": 65535, "int8": 127}
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _index_dtype(n: int) -> type:
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+class QuantizedCSR:
+    """
+    CSR matrix with integer values and a float32 scale per row:
+    row i = scales[i] * data[indptr[i]:indptr[i + 1]].
+
+    Supports what the recommenders need: shape / nnz, row selection
+    (returns a dequantized float32 csr_matrix), `@` (dense result),
+    matvec() on the quantized values and tocsc(). catalog.append_rows
+    appends rows.
+    """
+
+    ndim = 2
+    dtype = np.dtype(np.float32)  # of dequantized values and scores
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        indices: np.ndarray,
+        indptr: np.ndarray,
+        scales: np.ndarray,
+        shape: Sequence[int],
+    ):
+        if data.dtype.name not in QUANTIZED_DTYPES:
+            raise ValueError(f"quantized values must be uint16 or int8, got {data.dtype}")
+        if len(scales) != shape[0] or len(indptr) != shape[0] + 1:
+            raise ValueError("scales / indptr do not match the number of rows")
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.scales = scales
+        self.shape = (int(shape[0]), int(shape[1]))
+
+    @classmethod
+    def from_csr(cls, matrix: Any, mode: str) -> "QuantizedCSR":
+        if mode not in QUANTIZED_DTYPES:
+            raise ValueError(f"quantized mode must be one of {tuple(QUANTIZED_DTYPES)}, got {mode!r}")
+        m = sp.csr_matrix(matrix)
+        m.sort_indices()
+        values = np.asarray(m.data, dtype=np.float64)
+        if values.size and values.min() < 0:
+            raise ValueError("quantization expects non-negative TF-IDF values")
+        counts = np.diff(m.indptr)
+        row_max = np.zeros(m.shape[0], dtype=np.float64)
+        nonempty = counts > 0
+        if values.size:
+            row_max[nonempty] = np.maximum.reduceat(values, m.indptr[:-1][nonempty])
+        qmax = QUANTIZED_MAX[mode]
+        scales = row_max / qmax
+        scales[scales == 0] = 1.0
+        data = np.rint(values / np.repeat(scales, counts)).astype(QUANTIZED_DTYPES[mode])
+        index_dtype = _index_dtype(m.nnz)
+        return cls(
+            data,
+            m.indices.astype(index_dtype),
+            m.indptr.astype(index_dtype),
+            scales.astype(np.float32),
+            m.shape,
+        )
+
+    @property
+    def mode(self) -> str:
+        return self.data.dtype.name
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + self.scales.nbytes)
+
+    def _raw(self) -> sp.csr_matrix:
+        """The integer values as a csr_matrix sharing this object's arrays."""
+        return sp.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape, copy=False)
+
+    def rows(self, rows: np.ndarray) -> sp.csr_matrix:
+        rows = np.asarray(rows, dtype=np.int64)
+        sub = self._raw()[rows].astype(np.float32)
+        sub.data *= np.repeat(self.scales[rows], np.diff(sub.indptr))
+        return sub
+
+    def __getitem__(self, key: Any) -> sp.csr_matrix:
+        """Rows (int, slice or array of ints) as a dequantized float32 csr_matrix."""
+        return self.rows(np.arange(self.shape[0])[key].reshape(-1))
+
+    def dequantize(self) -> sp.csr_matrix:
+        return self.rows(np.arange(self.shape[0]))
+
+    def tocsr(self) -> sp.csr_matrix:
+        return self.dequantize()
+
+    def tocsc(self) -> sp.csc_matrix:
+        return self.dequantize().tocsc()
+
+    def matvec(self, w: np.ndarray) -> np.ndarray:
+        """Scores of every row against a dense (n_features,) vector, float32."""
+        w = np.asarray(w, dtype=np.float32).reshape(-1)
+        out = np.asarray(self._raw() @ w, dtype=np.float32)
+        out *= self.scales
+        return out
+
+    def __matmul__(self, other: Any) -> np.ndarray:
+        """Dense (n_rows x k) product with a (n_features x k) matrix or vector."""
+        if not sp.issparse(other) and np.ndim(other) == 1:
+            return self.matvec(other)
+        if sp.issparse(other):
+            product = (self._raw() @ other.astype(np.float32)).toarray()
+        else:
+            product = np.asarray(self._raw() @ np.asarray(other, dtype=np.float32))
+        return product * self.scales[:, None]
+
+
+def matrix_precision(matrix: Any) -> str:
+    """"int8" / "uint16" for quantized matrices, else the value dtype."""
+    if isinstance(matrix, QuantizedCSR):
+        return matrix.mode
+    return np.dtype(matrix.dtype).name
+
+
+def matrix_nbytes(matrix: Any) -> int:
+    if isinstance(matrix, QuantizedCSR):
+        return matrix.nbytes
+    return int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes)
+
+
+def to_float32(matrix: Any) -> sp.csr_matrix:
+    """float32 values with int32 indices / row pointers (int64 past 2**31 nnz)."""
+    if isinstance(matrix, QuantizedCSR):
+        return matrix.dequantize()
+    m = sp.csr_matrix(matrix)
+    index_dtype = _index_dtype(m.nnz)
+    return sp.csr_matrix(
+        (
+            np.asarray(m.data, dtype=np.float32),
+            m.indices.astype(index_dtype, copy=False),
+            m.indptr.astype(index_dtype, copy=False),
+        ),
+        shape=m.shape,
+    )
+
+
+def convert(matrix: Any, mode: str) -> Any:
+    """
+    `matrix` in the requested precision. Already-converted input is
+    returned as is; a quantized matrix is dequantized first for other modes.
+    Converting a memory-mapped matrix makes a private in-memory copy.
+    """
+    if mode not in PRECISIONS:
+        raise ValueError(f"TFIDF_PRECISION must be one of {PRECISIONS}, got {mode!r}")
+    if mode == "native" or matrix_precision(matrix) == mode:
+        return matrix
+    if mode == "float32":
+        return to_float32(matrix)
+    source = matrix.dequantize() if isinstance(matrix, QuantizedCSR) else matrix
+    return QuantizedCSR.from_csr(source, mode)
+
+
+def row_scores(matrix: Any, query: Any) -> np.ndarray:
+    """
+    Dot product of every row with a (1 x n_features) sparse query row as a
+    dense 1-D array: one CSR mat-vec against the densified query.
+    """
+    w = np.asarray(query.toarray(), dtype=matrix.dtype).ravel()
+    if isinstance(matrix, QuantizedCSR):
+        return matrix.matvec(w)
+    return np.asarray(matrix @ w).ravel()
+
+
+# =========================
+# AGREEMENT REPORT
+# =========================
+def agreement_report(
+    matrix: Any,
+    modes: Sequence[str] = ("float32", "uint16", "int8"),
+    k: int = 10,
+    queries: int = 500,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    For each mode: bytes, mean mat-vec time, and how its top-k per query row
+    compares with float64 (set overlap, identical lists, max score error).
+    Query vectors are always the float64 rows; only the catalog side changes.
+    """
+    reference = sp.csr_matrix(matrix, dtype=np.float64)
+    reference.sort_indices()
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(reference.shape[0], min(queries, reference.shape[0]), replace=False)
+
+    def run(m: Any) -> Dict[str, Any]:
+        top_idx, top_scores, all_scores = [], [], []
+        started = time.perf_counter()
+        for r in rows:
+            all_scores.append(row_scores(m, reference[int(r)]))
+        elapsed = time.perf_counter() - started
+        for r, scores in zip(rows, all_scores):
+            idx, sc = topk_from_scores(scores[None, :], k, exclude=[int(r)])
+            top_idx.append(idx[0])
+            top_scores.append(sc[0])
+        return {
+            "matvec_ms": 1000 * elapsed / len(rows),
+            "idx": top_idx,
+            "scores": top_scores,
+            "all": all_scores,
+        }
+
+    base = run(reference)
+    base_bytes = matrix_nbytes(reference)
+    report = [{
+        "mode": "float64",
+        "bytes": base_bytes,
+        "memory_ratio": 1.0,
+        "matvec_ms": round(base["matvec_ms"], 3),
+        f"overlap@{k}": 1.0,
+        "identical_topk": 1.0,
+        "max_score_error": 0.0,
+    }]
+    for mode in modes:
+        m = convert(reference, mode)
+        got = run(m)
+        overlap = np.mean([
+            len(np.intersect1d(a, b)) / max(1, len(a)) for a, b in zip(base["idx"], got["idx"])
+        ])
+        identical = np.mean([np.array_equal(a, b) for a, b in zip(base["idx"], got["idx"])])
+        error = max(
+            float(np.max(np.abs(a.astype(np.float64) - b))) if a.size else 0.0
+            for a, b in zip(got["all"], base["all"])
+        )
+        report.append({
+            "mode": mode,
+            "bytes": matrix_nbytes(m),
+            "memory_ratio": round(matrix_nbytes(m) / base_bytes, 3),
+            "matvec_ms": round(got["matvec_ms"], 3),
+            f"overlap@{k}": round(float(overlap), 4),
+            "identical_topk": round(float(identical), 4),
+            "max_score_error": round(error, 6),
+        })
+    return report
+
+
+def _load_matrix(args: argparse.Namespace) -> Any:
+    if args.artifacts:
+        from artifacts import load_artifact_dir
+
+        return load_artifact_dir(args.artifacts, mmap=False)["tfidf_matrix"]
+    with open(args.matrix, "rb") as f:
+        return pickle.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rep = sub.add_parser("report", help="top-K agreement of each mode against float64")
+    rep.add_argument("--matrix", default=os.path.join(BASE_DIR, "tfidf_matrix.pkl"))
+    rep.add_argument("--artifacts", default=None, help="artifact directory instead of --matrix")
+    rep.add_argument("--modes", default="float32,uint16,int8")
+    rep.add_argument("--k", type=int, default=10)
+    rep.add_argument("--queries", type=int, default=500)
+    rep.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    matrix = _load_matrix(args)
+    if isinstance(matrix, QuantizedCSR):
+        print(f"note: source matrix is already {matrix.mode}; comparing against its dequantized values")
+        matrix = matrix.dequantize()
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    report = agreement_report(matrix, modes, k=args.k, queries=args.queries, seed=args.seed)
+    n_queries = min(args.queries, matrix.shape[0])
+    print(f"{matrix.shape[0]} rows, {matrix.nnz} nnz, {n_queries} query rows, k={args.k}")
+    header = ("mode", "MB", "x mem", "matvec ms", f"overlap@{args.k}", "identical", "max err")
+    print("{:<8} {:>9} {:>7} {:>10} {:>11} {:>10} {:>10}".format(*header))
+    for r in report:
+        print("{:<8} {:>9.1f} {:>7.3f} {:>10.3f} {:>11.4f} {:>10.4f} {:>10.2e}".format(
+            r["mode"], r["bytes"] / 1e6, r["memory_ratio"], r["matvec_ms"],
+            r[f"overlap@{args.k}"], r["identical_topk"], r["max_score_error"],
+        ))
+
+
+if __name__ == "__main__":
+    main()
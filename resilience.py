@@ -0,0 +1,157 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Async client-side pacing: `rate` requests per second with bursts of up
+    to `burst`. Callers queue for tokens instead of overrunning the upstream
+    limit. pause_until() (from a 429's Retry-After) holds every caller.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def pause_until(self, deadline: float) -> None:
+        self._paused_until = max(self._paused_until, deadline)
+
+    async def acquire(self, max_wait: Optional[float] = None) -> float:
+        """
+        Takes one token; returns the seconds spent waiting. Raises
+        asyncio.TimeoutError instead of waiting longer than `max_wait`.
+        """
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                delay = self._paused_until - now
+            else:
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            if max_wait is not None and waited + delay > max_wait:
+                raise asyncio.TimeoutError(f"rate limited for {waited + delay:.1f}s")
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic so an upstream outage
+    cannot multiply the load: every request deposits `ratio` tokens, every
+    retry withdraws one. `min_balance` keeps retries possible at low
+    traffic; the balance never exceeds `max_balance`.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_balance: float = 10.0, max_balance: float = 100.0):
+        self.ratio = ratio
+        self.max_balance = max(max_balance, min_balance)
+        self._balance = float(min_balance)
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self._balance >= 1.0:
+            self._balance -= 1.0
+            return True
+        self.exhausted += 1
+        return False
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half_open after `reset_timeout` seconds, letting one probe
+    through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejections = 0
+        self.trips = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - (self.opened_at or 0.0) < self.reset_timeout:
+                self.rejections += 1
+                return False
+            self.state = self.HALF_OPEN
+        # half open: a single probe at a time
+        if self._probe_in_flight:
+            self.rejections += 1
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """The call ended without a verdict (e.g. cancelled): free the probe slot."""
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.state != self.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
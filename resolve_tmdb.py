@@ -0,0 +1,276 @@
+"""
+Offline title -> TMDB card resolution for every row of df.pkl.
+
+    python resolve_tmdb.py                      # resolve (resumes if interrupted)
+    python resolve_tmdb.py --concurrency 8 --rate 35
+
+Each row is resolved once:
+- rows with a TMDB id column ('tmdb_id', 'id' or 'movie_id') use /movie/{id}
+- otherwise /search/movie by title, narrowed by release year when known
+
+Progress is appended to a JSONL checkpoint so a rerun only resolves rows
+that are still missing. The final artifact (tmdb_cards.npz) holds dense
+per-row arrays; tmdb_id 0 = never resolved, -1 = resolved but not on TMDB.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TMDB_BASE = "https://api.themoviedb.org/3"
+
+DF_PATH = os.path.join(BASE_DIR, "df.pkl")
+TMDB_CARDS_PATH = os.path.join(BASE_DIR, "tmdb_cards.npz")
+
+ID_COLUMNS = ("tmdb_id", "id", "movie_id")
+UNRESOLVED = 0
+NOT_FOUND = -1
+
+
+class RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+def _row_year(row: pd.Series) -> Optional[int]:
+    for col in ("year", "release_date"):
+        v = row.get(col)
+        if v is None or (isinstance(v, float) and np.isnan(v)):
+            continue
+        s = str(v)[:4]
+        if s.isdigit():
+            return int(s)
+    return None
+
+
+def _row_tmdb_id(row: pd.Series, id_col: Optional[str]) -> Optional[int]:
+    if id_col is None:
+        return None
+    v = pd.to_numeric(row.get(id_col), errors="coerce")
+    if pd.isna(v) or int(v) <= 0:
+        return None
+    return int(v)
+
+
+def _card(row_idx: int, m: Optional[dict]) -> Dict[str, Any]:
+    if not m:
+        return {"row": row_idx, "tmdb_id": NOT_FOUND}
+    return {
+        "row": row_idx,
+        "tmdb_id": int(m["id"]),
+        "title": m.get("title") or "",
+        "poster_path": m.get("poster_path") or "",
+        "release_date": m.get("release_date") or "",
+        "vote_average": float(m.get("vote_average") or 0.0),
+    }
+
+
+async def _get(
+    client: httpx.AsyncClient,
+    limiter: RateLimiter,
+    api_key: str,
+    path: str,
+    params: Dict[str, Any],
+    retries: int = 4,
+) -> Optional[dict]:
+    """GET with pacing; honours Retry-After on 429. 404 -> None."""
+    q = dict(params)
+    q["api_key"] = api_key
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        try:
+            r = await client.get(f"{TMDB_BASE}{path}", params=q)
+        except httpx.RequestError:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(2**attempt)
+            continue
+        if r.status_code == 200:
+            return r.json()
+        if r.status_code == 404:
+            return None
+        if r.status_code == 429 or r.status_code >= 500:
+            if attempt == retries:
+                r.raise_for_status()
+            delay = float(r.headers.get("Retry-After") or 2**attempt)
+            await asyncio.sleep(delay)
+            continue
+        r.raise_for_status()
+    return None
+
+
+async def resolve_row(
+    client: httpx.AsyncClient,
+    limiter: RateLimiter,
+    api_key: str,
+    row_idx: int,
+    row: pd.Series,
+    id_col: Optional[str],
+) -> Dict[str, Any]:
+    tmdb_id = _row_tmdb_id(row, id_col)
+    if tmdb_id is not None:
+        m = await _get(client, limiter, api_key, f"/movie/{tmdb_id}", {"language": "en-US"})
+        if m:
+            return _card(row_idx, m)
+
+    params: Dict[str, Any] = {
+        "query": str(row["title"]),
+        "include_adult": "false",
+        "language": "en-US",
+        "page": 1,
+    }
+    year = _row_year(row)
+    if year:
+        params["year"] = year
+    data = await _get(client, limiter, api_key, "/search/movie", params)
+    results = (data or {}).get("results") or []
+    if not results and year:
+        # year metadata is often off by one for festival/limited releases
+        params.pop("year")
+        data = await _get(client, limiter, api_key, "/search/movie", params)
+        results = (data or {}).get("results") or []
+    return _card(row_idx, results[0] if results else None)
+
+
+def load_checkpoint(path: str) -> Dict[int, Dict[str, Any]]:
+    done: Dict[int, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            done[int(rec["row"])] = rec
+    return done
+
+
+async def resolve_all(
+    df: pd.DataFrame,
+    api_key: str,
+    checkpoint_path: str,
+    concurrency: int = 8,
+    rate: float = 35.0,
+) -> Dict[int, Dict[str, Any]]:
+    done = load_checkpoint(checkpoint_path)
+    id_col = next((c for c in ID_COLUMNS if c in df.columns), None)
+    todo = [i for i in range(len(df)) if i not in done]
+    print(f"{len(done)} rows already resolved, {len(todo)} to go (id column: {id_col})")
+
+    limiter = RateLimiter(rate)
+    sem = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async with httpx.AsyncClient(
+        timeout=20, limits=httpx.Limits(max_connections=concurrency)
+    ) as client:
+        with open(checkpoint_path, "a", encoding="utf-8") as ckpt:
+
+            async def one(i: int) -> None:
+                async with sem:
+                    try:
+                        rec = await resolve_row(
+                            client, limiter, api_key, i, df.iloc[i], id_col
+                        )
+                    except Exception as e:
+                        print(f"row {i}: {type(e).__name__}: {e}")
+                        return  # stays unresolved; retried on the next run
+                done[i] = rec
+                ckpt.write(json.dumps(rec) + "\n")
+                if len(done) % 500 == 0:
+                    ckpt.flush()
+                    rps = len(done) / max(time.perf_counter() - started, 1e-9)
+                    print(f"{len(done)}/{len(df)} resolved ({rps:.1f} rows/s)")
+
+            await asyncio.gather(*(one(i) for i in todo))
+
+    return done
+
+
+def write_cards(done: Dict[int, Dict[str, Any]], n_rows: int, out_path: str) -> None:
+    tmdb_id = np.full(n_rows, UNRESOLVED, dtype=np.int32)
+    vote_average = np.zeros(n_rows, dtype=np.float32)
+    title = [""] * n_rows
+    poster_path = [""] * n_rows
+    release_date = [""] * n_rows
+
+    for i, rec in done.items():
+        if not 0 <= i < n_rows:
+            continue
+        tmdb_id[i] = int(rec["tmdb_id"])
+        if rec["tmdb_id"] == NOT_FOUND:
+            continue
+        vote_average[i] = rec.get("vote_average") or 0.0
+        title[i] = rec.get("title") or ""
+        poster_path[i] = rec.get("poster_path") or ""
+        release_date[i] = rec.get("release_date") or ""
+
+    np.savez_compressed(
+        out_path,
+        tmdb_id=tmdb_id,
+        vote_average=vote_average,
+        title=np.array(title, dtype=str),
+        poster_path=np.array(poster_path, dtype=str),
+        release_date=np.array(release_date, dtype=str),
+    )
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--df", default=DF_PATH)
+    parser.add_argument("--out", default=TMDB_CARDS_PATH)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=35.0, help="max requests/second")
+    args = parser.parse_args()
+
+    api_key = os.getenv("TMDB_API_KEY")
+    if not api_key:
+        raise SystemExit("TMDB_API_KEY missing. Put it in .env as TMDB_API_KEY=xxxx")
+
+    with open(args.df, "rb") as f:
+        df = pickle.load(f)
+    if "title" not in df.columns:
+        raise SystemExit("df.pkl must contain a DataFrame with a 'title' column")
+
+    checkpoint = args.checkpoint or args.out + ".partial.jsonl"
+    done = asyncio.run(
+        resolve_all(df, api_key, checkpoint, concurrency=args.concurrency, rate=args.rate)
+    )
+    write_cards(done, len(df), args.out)
+
+    found = sum(1 for r in done.values() if r["tmdb_id"] != NOT_FOUND)
+    print(
+        f"wrote {args.out}: {found} found, {len(done) - found} not on TMDB, "
+        f"{len(df) - len(done)} unresolved"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from metrics import counter, histogram
+
+BACKENDS = ("inline", "thread", "process")
+
+SCORING_RUN_SECONDS = histogram(
+    "scoring_run_seconds", "CPU time of scoring calls", ("function", "backend")
+)
+SCORING_QUEUE_WAIT_SECONDS = histogram(
+    "scoring_queue_wait_seconds", "Time scoring calls waited for a worker", ("backend",)
+)
+SCORING_REJECTED = counter(
+    "scoring_rejected", "Scoring calls rejected with 503 (queue full)", ("backend",)
+)
+
+
+def _init_process_worker() -> None:
+    # forkserver/spawn children start clean: load the artifacts once per child
+    import main
+
+    if main.BUNDLE is None:
+        main.load_pickles()
+
+
+def _noop() -> None:
+    return None
+
+
+def _timed_call(fn: Callable, submitted_at: float, args: tuple, kwargs: dict) -> Tuple:
+    """
+    Runs in the worker. Returns ("ok", result, queue_wait, run_time) or
+    ("http", status, detail, ...): HTTPException does not survive pickling.
+    """
+    started = time.time()
+    try:
+        result = fn(*args, **kwargs)
+    except HTTPException as e:
+        return ("http", e.status_code, e.detail, started - submitted_at, time.time() - started)
+    return ("ok", result, None, started - submitted_at, time.time() - started)
+
+
+class ScoringExecutor:
+    """
+    Where CPU-bound TF-IDF scoring runs, so it cannot stall the event loop:
+    - inline:  on the event loop (no overhead, blocks other requests)
+    - thread:  thread pool (NumPy/SciPy release the GIL for the heavy parts)
+    - process: process pool, each child loads the artifacts once
+
+    At most `workers + max_queue` calls are admitted at a time; beyond that
+    callers get a 503 instead of piling up behind a burst.
+    """
+
+    def __init__(self, backend: str = "inline", workers: int = 2, max_queue: int = 64):
+        if backend not in BACKENDS:
+            raise ValueError(f"SCORING_BACKEND must be one of {BACKENDS}, got {backend!r}")
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[Executor] = None
+        self._admitted = 0
+
+        self.calls = 0
+        self.rejected = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.run_sum = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=1024)
+
+    def start(self) -> None:
+        if self.backend == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="scoring"
+            )
+        elif self.backend == "process":
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context(
+                "forkserver" if "forkserver" in methods else "spawn"
+            )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=ctx, initializer=_init_process_worker
+            )
+            # children are created on demand: start them (and their artifact
+            # load) now instead of on the first request
+            for _ in range(self.workers):
+                self._executor.submit(_noop)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def restart(self) -> None:
+        """
+        Process backend only: new children that load the current artifacts.
+        Calls already running finish on the old pool.
+        """
+        if self.backend != "process" or self._executor is None:
+            return
+        old = self._executor
+        self.start()
+        old.shutdown(wait=False)
+
+    def _record(self, fn: Callable, wait: float, run: float) -> None:
+        SCORING_RUN_SECONDS.observe(run, getattr(fn, "__name__", "?"), self.backend)
+        SCORING_QUEUE_WAIT_SECONDS.observe(wait, self.backend)
+        self.calls += 1
+        self.wait_sum += wait
+        self.run_sum += run
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        if self._executor is None:
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(fn, 0.0, time.perf_counter() - started)
+
+        if self._admitted >= self.workers + self.max_queue:
+            self.rejected += 1
+            SCORING_REJECTED.inc(self.backend)
+            raise HTTPException(status_code=503, detail="Scoring queue full, retry shortly")
+
+        self._admitted += 1
+        try:
+            loop = asyncio.get_running_loop()
+            status, value, detail, wait, run = await loop.run_in_executor(
+                self._executor, _timed_call, fn, time.time(), args, kwargs
+            )
+        finally:
+            self._admitted -= 1
+
+        self._record(fn, max(0.0, wait), run)
+        if status == "http":
+            raise HTTPException(status_code=value, detail=detail)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+
+        def pct(q: float) -> float:
+            if not waits:
+                return 0.0
+            return round(1000 * waits[min(len(waits) - 1, int(q * len(waits)))], 3)
+
+        return {
+            "backend": self.backend,
+            "workers": self.workers if self._executor is not None else 0,
+            "max_queue": self.max_queue,
+            "in_flight": self._admitted,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "queue_wait_ms_avg": round(1000 * self.wait_sum / self.calls, 3) if self.calls else 0.0,
+            "queue_wait_ms_p50": pct(0.50),
+            "queue_wait_ms_p99": pct(0.99),
+            "queue_wait_ms_max": round(1000 * self.wait_max, 3),
+            "run_ms_avg": round(1000 * self.run_sum / self.calls, 3) if self.calls else 0.0,
+        }
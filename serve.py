@@ -0,0 +1,187 @@
+"""
+Pre-forking launcher: load the TF-IDF artifacts once, then fork N workers.
+
+    python serve.py --workers 4 --port 8000
+
+With `uvicorn --workers N` every process runs load_pickles and keeps a
+private copy of the matrix, titles and title map. Here the parent loads
+them (and warms the fuzzy title index) before forking, so workers share
+those pages copy-on-write:
+- artifact directory mode: arrays are mmap'd files, shared via the page cache
+- pickle mode: numpy buffers live in the parent heap and stay shared as
+  long as nobody writes to them; gc.freeze() keeps the collector from
+  dirtying the pages that hold the inherited Python objects
+
+The parent restarts crashed workers and logs per-worker RSS / PSS
+(PSS splits shared pages between the processes using them, so the sum of
+PSS is the real footprint). Linux only (fork + /proc).
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def process_memory(pid: int) -> Dict[str, float]:
+    """RSS / PSS / shared / private in MB from /proc/<pid>/smaps_rollup."""
+    fields = {"Rss": 0, "Pss": 0, "Shared_Clean": 0, "Shared_Dirty": 0,
+              "Private_Clean": 0, "Private_Dirty": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                parts = line.split()
+                key = parts[0].rstrip(":")
+                if key in fields:
+                    fields[key] = int(parts[1])  # kB
+    except OSError:
+        return {}
+    mb = 1024.0
+    return {
+        "rss_mb": fields["Rss"] / mb,
+        "pss_mb": fields["Pss"] / mb,
+        "shared_mb": (fields["Shared_Clean"] + fields["Shared_Dirty"]) / mb,
+        "private_mb": (fields["Private_Clean"] + fields["Private_Dirty"]) / mb,
+    }
+
+
+def memory_report(parent: int, workers: List[int]) -> str:
+    lines = [f"{'pid':>8} {'role':>7} {'rss_mb':>9} {'pss_mb':>9} {'shared_mb':>10} {'private_mb':>11}"]
+    total_pss = 0.0
+    for role, pid in [("parent", parent)] + [("worker", p) for p in workers]:
+        m = process_memory(pid)
+        if not m:
+            continue
+        total_pss += m["pss_mb"]
+        lines.append(
+            f"{pid:>8} {role:>7} {m['rss_mb']:>9.1f} {m['pss_mb']:>9.1f} "
+            f"{m['shared_mb']:>10.1f} {m['private_mb']:>11.1f}"
+        )
+    lines.append(f"total PSS: {total_pss:.1f} MB")
+    return "\n".join(lines)
+
+
+def preload(warm_text: bool) -> None:
+    import main as app_module
+
+    started = time.perf_counter()
+    if app_module.TFIDF_VECTORIZER_LOAD == "background":
+        # nothing to overlap with in the parent, and a load still running at
+        # fork time would leave the bundle lock held in every worker
+        app_module.TFIDF_VECTORIZER_LOAD = "eager"
+    app_module.load_pickles(background_fuzzy=False)
+    app_module.BUNDLE.warm(fuzzy=app_module.FUZZY_TITLE_ENABLED, text=warm_text)
+    app_module.ARTIFACTS_PRELOADED = True
+    print(f"[serve] artifacts loaded in {time.perf_counter() - started:.2f}s", flush=True)
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    import main as app_module
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)  # report signal is for the parent
+    config = uvicorn.Config(app_module.app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, log_level)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--report-interval", type=float, default=300.0,
+        help="seconds between memory reports (0 = only at startup / SIGUSR1)",
+    )
+    parser.add_argument(
+        "--warm-text", action="store_true",
+        help="also load the vectorizer and inverted index for /recommend/text",
+    )
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); use `uvicorn main:app` on this platform")
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    preload(args.warm_text)
+
+    # objects allocated so far are never collected: keep gc off their pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    workers: List[int] = [spawn(sock, args.log_level) for _ in range(args.workers)]
+    print(f"[serve] {len(workers)} workers on {args.host}:{args.port}", flush=True)
+
+    stopping = False
+    report_due: Optional[float] = time.monotonic() + 10.0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report(signum=None, frame=None):
+        print(memory_report(os.getpid(), workers), flush=True)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, report)
+
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.remove(pid)
+            if not stopping:
+                print(f"[serve] worker {pid} exited ({status}); restarting", flush=True)
+                workers.append(spawn(sock, args.log_level))
+            continue
+
+        now = time.monotonic()
+        if report_due is not None and now >= report_due:
+            report()
+            report_due = now + args.report_interval if args.report_interval > 0 else None
+        time.sleep(0.5)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import copy
+from typing import Any, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Upper bound for one dense (rows x catalog) float64 score block
+DEFAULT_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+def topk_from_scores(
+    scores: np.ndarray, k: int, exclude: Optional[Sequence[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k per row of a dense (rows x n) score block, best first.
+    exclude[r] (e.g. the query row itself) is never returned for row r.
+    Returns (indices int32, scores float32), both (rows x k).
+    """
+    scores = np.array(scores, dtype=np.float64, copy=True, ndmin=2)
+    rows, n = scores.shape
+    if exclude is not None:
+        ex = np.asarray(exclude, dtype=np.int64)
+        ok = (ex >= 0) & (ex < n)
+        scores[np.arange(rows)[ok], ex[ok]] = -np.inf
+    k = max(0, min(k, n - (1 if exclude is not None else 0)))
+    if k == 0:
+        return np.empty((rows, 0), np.int32), np.empty((rows, 0), np.float32)
+
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n), (rows, n))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    # stable sort on (-score, index) so ties come back in catalog order
+    order = np.lexsort((part, -part_scores), axis=1)
+    idx = np.take_along_axis(part, order, axis=1)
+    return idx.astype(np.int32), np.take_along_axis(part_scores, order, axis=1).astype(
+        np.float32
+    )
+
+
+def rows_per_block(n_cols: int, block_bytes: int = DEFAULT_BLOCK_BYTES) -> int:
+    return max(1, int(block_bytes // max(1, n_cols * 8)))
+
+
+def chunked_topk(
+    matrix: Any,
+    queries: Any,
+    k: int,
+    exclude: Optional[Sequence[int]] = None,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+    """
+    Cosine top-k of every query row against `matrix` (both L2-normalized
+    sparse, same vocabulary) with one sparse matrix-matrix product per
+    block, so peak memory stays around `block_bytes`.
+    Yields (start, stop, indices, scores) per block of query rows.
+    """
+    n_queries = queries.shape[0]
+    step = rows_per_block(matrix.shape[0], block_bytes)
+    for start in range(0, n_queries, step):
+        stop = min(start + step, n_queries)
+        # (catalog x block) keeps the big operand in its native CSR layout
+        block = matrix @ queries[start:stop].T
+        dense = (block.toarray() if hasattr(block, "toarray") else np.asarray(block)).T
+        ex = None if exclude is None else np.asarray(exclude)[start:stop]
+        idx, sc = topk_from_scores(dense, k, ex)
+        yield start, stop, idx, sc
+
+
+class InvertedIndex:
+    """
+    term -> postings (doc rows + weights), i.e. the TF-IDF matrix in CSC
+    layout. Scoring a query only touches the postings of its own terms,
+    which for short queries is far less work than a full mat-vec.
+    """
+
+    def __init__(self, matrix: Any):
+        csc = matrix.tocsc()
+        csc.sort_indices()
+        self.n_docs = int(matrix.shape[0])
+        self.n_terms = int(matrix.shape[1])
+        self.indptr = csc.indptr
+        self.docs = csc.indices
+        self.weights = csc.data
+        # rows appended past the postings above (extended())
+        self.n_indexed = self.n_docs
+        self.tail: Optional["InvertedIndex"] = None
+
+    def extended(self, matrix: Any) -> "InvertedIndex":
+        """
+        Index over `matrix`, this index's rows plus appended ones: shares
+        the postings and only indexes the rows past them.
+        """
+        out = copy.copy(self)
+        out.n_docs = int(matrix.shape[0])
+        out.tail = InvertedIndex(matrix[self.n_indexed :]) if out.n_docs > self.n_indexed else None
+        return out
+
+    def score(
+        self, terms: Sequence[int], weights: Sequence[float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (doc rows, dot-product scores) for docs sharing >= 1 term."""
+        docs, scores = self._score_postings(terms, weights)
+        if self.tail is None:
+            return docs, scores
+        tail_docs, tail_scores = self.tail.score(terms, weights)
+        return (
+            np.concatenate([docs, tail_docs.astype(np.int64) + self.n_indexed]),
+            np.concatenate([scores, tail_scores]),
+        )
+
+    def _score_postings(
+        self, terms: Sequence[int], weights: Sequence[float]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        doc_parts, score_parts = [], []
+        for t, w in zip(terms, weights):
+            a, b = self.indptr[t], self.indptr[t + 1]
+            if a == b:
+                continue
+            doc_parts.append(self.docs[a:b])
+            score_parts.append(self.weights[a:b] * w)
+        if not doc_parts:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+        docs = np.concatenate(doc_parts)
+        contrib = np.concatenate(score_parts)
+        uniq, inverse = np.unique(docs, return_inverse=True)
+        return uniq, np.bincount(inverse, weights=contrib, minlength=len(uniq))
+
+    def topk(
+        self, terms: Sequence[int], weights: Sequence[float], k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        docs, scores = self.score(terms, weights)
+        if len(docs) == 0 or k <= 0:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        idx, sc = topk_from_scores(scores[None, :], k)
+        return docs[idx[0]].astype(np.int32), sc[0]
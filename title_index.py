@@ -0,0 +1,242 @@
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_YEAR_SUFFIX = re.compile(r"\s*[\(\[]?\b(18|19|20)\d{2}\b[\)\]]?\s*$")
+_SUBTITLE = re.compile(r"\s*(:| - | – | — ).*$")
+_ARTICLE = re.compile(r"^(the|a|an)\s+")
+
+
+class TitleMatch(NamedTuple):
+    idx: int
+    score: float  # 0..1 confidence
+    path: str  # exact | folded | variant | trigram
+
+
+def fold_title(t: str) -> str:
+    """Accent-, case- and punctuation-insensitive form: 'Amélie!' -> 'amelie'."""
+    t = str(t)
+    if not t.isascii():
+        t = unicodedata.normalize("NFKD", t)
+        t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    t = t.lower()
+    t = t.replace("&", " and ")
+    return _NON_ALNUM.sub(" ", t).strip()
+
+
+def variant_tiers(t: str) -> Tuple[List[str], List[str]]:
+    """
+    (own, subtitle): folded forms of the title itself without a year suffix
+    and/or leading article, then the extra forms with its subtitle removed.
+    """
+    raw = str(t).strip()
+    if not raw.isascii():
+        raw = unicodedata.normalize("NFKC", raw)
+    no_year = _YEAR_SUFFIX.sub("", raw)
+    no_sub = _SUBTITLE.sub("", no_year)
+    tiers: Tuple[List[str], List[str]] = ([], [])
+    seen = set()
+    for tier, v in zip(tiers, (no_year, no_sub) if no_sub != no_year else (no_year,)):
+        f = fold_title(v)
+        for g in (f, _ARTICLE.sub("", f)):
+            if g and g not in seen:
+                seen.add(g)
+                tier.append(g)
+    return tiers
+
+
+def title_variants(t: str) -> List[str]:
+    """Folded forms without a year suffix, subtitle and/or leading article."""
+    own, subtitle = variant_tiers(t)
+    return own + subtitle
+
+
+def trigrams(folded: str) -> List[str]:
+    s = f"  {folded} "
+    return sorted({s[i : i + 3] for i in range(len(s) - 2)})
+
+
+class TrigramTitleIndex:
+    """
+    Fuzzy local-title resolver:
+    1. exact normalized key (same as TITLE_TO_IDX)
+    2. folded key (accents / punctuation / '&' insensitive)
+    3. variants (year suffix, subtitle, leading article removed)
+    4. character-trigram Dice similarity over every local title
+
+    Trigram postings are CSR-style arrays, so a lookup is a few array
+    slices + one np.unique, independent of catalog size in Python work.
+    """
+
+    def __init__(self, title_to_idx: Mapping[str, int], min_score: float = 0.55):
+        self.min_score = min_score
+        self.exact = title_to_idx
+        self.folded: Dict[str, int] = {}
+        # a title's own forms win over another title's subtitle-stripped form:
+        # "Dracula" is Dracula, not "Dracula: Dead and Loving It"
+        self.variants: Dict[str, int] = {}
+        self.subtitle_variants: Dict[str, int] = {}
+
+        keys: List[str] = []
+        rows: List[int] = []
+        for title, idx in title_to_idx.items():
+            f = fold_title(title)
+            if not f:
+                continue
+            self.folded.setdefault(f, idx)
+            own, subtitle = variant_tiers(title)
+            for v in own:
+                self.variants.setdefault(v, idx)
+            for v in subtitle:
+                self.subtitle_variants.setdefault(v, idx)
+            keys.append(f)
+            rows.append(idx)
+
+        self._rows = np.asarray(rows, dtype=np.int64)
+        gram_ids: Dict[str, int] = {}
+        pair_gram: List[int] = []
+        pair_key: List[int] = []
+        sizes = np.zeros(len(keys), dtype=np.int32)
+        for k, f in enumerate(keys):
+            grams = trigrams(f)
+            sizes[k] = len(grams)
+            for g in grams:
+                pair_gram.append(gram_ids.setdefault(g, len(gram_ids)))
+                pair_key.append(k)
+
+        gram_arr = np.asarray(pair_gram, dtype=np.int64)
+        key_arr = np.asarray(pair_key, dtype=np.int32)
+        order = np.argsort(gram_arr, kind="stable")
+        self._gram_ids = gram_ids
+        self._postings = key_arr[order]
+        self._offsets = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_arr, minlength=len(gram_ids)), out=self._offsets[1:])
+        self._sizes = sizes
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def best_trigram(self, folded: str) -> Optional[Tuple[int, float]]:
+        grams = trigrams(folded)
+        parts = []
+        for g in grams:
+            gid = self._gram_ids.get(g)
+            if gid is not None:
+                parts.append(self._postings[self._offsets[gid] : self._offsets[gid + 1]])
+        if not parts:
+            return None
+        hits = np.concatenate(parts)
+        if len(hits) * 4 < len(self._sizes):
+            keys, overlap = np.unique(hits, return_counts=True)
+            dice = 2.0 * overlap / (len(grams) + self._sizes[keys])
+            best = int(np.argmax(dice))
+            return int(self._rows[keys[best]]), float(dice[best])
+
+        # dense counting is cheaper once postings cover much of the catalog
+        overlap = np.bincount(hits, minlength=len(self._sizes))
+        dice = 2.0 * overlap / (len(grams) + self._sizes)
+        best = int(np.argmax(dice))
+        return int(self._rows[best]), float(dice[best])
+
+    def resolve(self, title: str, norm_key: Optional[str] = None) -> Optional[TitleMatch]:
+        return _resolve((self,), self.exact, self.min_score, title, norm_key)
+
+
+class AppendedTitleIndex:
+    """
+    A built TrigramTitleIndex plus a small one over the titles appended
+    since (catalog.py), so an append only indexes its own titles. Appended
+    titles win ties, as they do in the title map.
+    """
+
+    def __init__(
+        self, base: TrigramTitleIndex, title_to_idx: Mapping[str, int], added: Dict[str, int]
+    ):
+        self.min_score = base.min_score
+        self.exact = title_to_idx
+        self.layers = (TrigramTitleIndex(added, base.min_score), base)
+
+    def __len__(self) -> int:
+        return sum(len(layer) for layer in self.layers)
+
+    def resolve(self, title: str, norm_key: Optional[str] = None) -> Optional[TitleMatch]:
+        return _resolve(self.layers, self.exact, self.min_score, title, norm_key)
+
+
+def _resolve(
+    layers: Sequence[TrigramTitleIndex],
+    exact: Mapping[str, int],
+    min_score: float,
+    title: str,
+    norm_key: Optional[str],
+) -> Optional[TitleMatch]:
+    key = norm_key if norm_key is not None else str(title).strip().lower()
+    if key in exact:
+        return TitleMatch(int(exact[key]), 1.0, "exact")
+
+    f = fold_title(title)
+    for layer in layers:
+        if f in layer.folded:
+            return TitleMatch(layer.folded[f], 1.0, "folded")
+
+    for v in title_variants(title):
+        for tier in ("variants", "subtitle_variants"):
+            for layer in layers:
+                idx = getattr(layer, tier).get(v)
+                if idx is not None:
+                    return TitleMatch(idx, 0.95, "variant")
+
+    if not f:
+        return None
+    best = None
+    for layer in layers:
+        hit = layer.best_trigram(f)
+        if hit is not None and (best is None or hit[1] > best[1]):
+            best = hit
+    if best is not None and best[1] >= min_score:
+        return TitleMatch(best[0], round(best[1], 4), "trigram")
+    return None
+
+
+class LazyTitleIndex:
+    """
+    Builds the title index once, on first use, thread-safely. Indexes made
+    with extended() share this one's TrigramTitleIndex and only index the
+    titles added since.
+    """
+
+    def __init__(
+        self,
+        title_to_idx: Mapping[str, int],
+        min_score: float,
+        base: Optional["LazyTitleIndex"] = None,
+        added: Optional[Dict[str, int]] = None,
+    ):
+        self._title_to_idx = title_to_idx
+        self._min_score = min_score
+        self._base = base
+        self._added = added or {}
+        self._index: Optional[Union[TrigramTitleIndex, AppendedTitleIndex]] = None
+        self._lock = threading.Lock()
+
+    def extended(self, title_to_idx: Mapping[str, int], added: Dict[str, int]) -> "LazyTitleIndex":
+        """Index for `title_to_idx`, which is this index's map plus the `added` keys."""
+        if self._base is None:
+            return LazyTitleIndex(title_to_idx, self._min_score, self, dict(added))
+        return LazyTitleIndex(title_to_idx, self._min_score, self._base, {**self._added, **added})
+
+    def get(self) -> Union[TrigramTitleIndex, AppendedTitleIndex]:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    if self._base is None:
+                        self._index = TrigramTitleIndex(self._title_to_idx, self._min_score)
+                    else:
+                        self._index = AppendedTitleIndex(
+                            self._base.get(), self._title_to_idx, self._added
+                        )
+        return self._index
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+def make_cache_key(path: str, params: Dict[str, Any]) -> str:
+    """
+    Stable key for a TMDB GET:
+    - params sorted, api_key dropped
+    - free-text 'query' lowercased and whitespace-collapsed
+    """
+    items = []
+    for k, v in params.items():
+        if k == "api_key" or v is None:
+            continue
+        v = str(v).strip()
+        if k == "query":
+            v = " ".join(v.lower().split())
+        items.append((k, v))
+    items.sort()
+    return f"{path}?{urlencode(items)}"
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until", "size")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+
+
+class TTLCache:
+    """
+    In-memory response cache:
+    - per-entry TTL, LRU eviction bounded by entry count and approximate bytes
+    - singleflight: concurrent misses for one key share a single fetch
+    - expired entries are kept for `stale_ttl` more seconds so get_stale()
+      can serve them while the upstream is failing
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        stale_ttl: float = 0.0,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = max(0.0, stale_ttl)
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_served = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        e = self._data.get(key)
+        if e is None:
+            return None
+        now = time.monotonic()
+        if e.expires_at <= now:
+            if e.stale_until <= now:
+                self._drop(key)
+                self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return e.value
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """An expired value still inside its stale window (fallback on errors)."""
+        e = self._data.get(key)
+        if e is None or e.stale_until <= time.monotonic():
+            return None
+        self.stale_served += 1
+        return e.value
+
+    def set(self, key: str, value: Any, ttl: float, size: int = 0) -> None:
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._data:
+            self._drop(key)
+        expires_at = time.monotonic() + ttl
+        self._data[key] = _Entry(value, expires_at, expires_at + self.stale_ttl, size)
+        self._bytes += size
+        while self._data and (
+            len(self._data) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            old_key = next(iter(self._data))
+            self._drop(old_key)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        e = self._data.pop(key, None)
+        if e is not None:
+            self._bytes -= e.size
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[Tuple[Any, int]]],
+        ttl_for: Callable[[Any], float],
+    ) -> Any:
+        """
+        fetch() returns (value, size_bytes); ttl_for(value) picks the TTL.
+        Errors are propagated to every waiter and never cached.
+        """
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # the leading request went away mid-fetch: take over
+
+        self.misses += 1
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value, size = await fetch()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            self.set(key, value, ttl_for(value), size)
+            fut.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_served": self.stale_served,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4)
+            if lookups
+            else 0.0,
+        }
+
+
+def ttl_for_path(
+    path: str, data: Any, rules: List[Tuple[str, float]], default: float, negative: float
+) -> float:
+    """
+    First matching path prefix wins. Empty /search/movie results use the
+    (shorter) negative TTL so typos do not hit TMDB on every keystroke.
+    """
+    if path.startswith("/search/") and isinstance(data, dict) and not data.get("results"):
+        return negative
+    for prefix, ttl in rules:
+        if path.startswith(prefix):
+            return ttl
+    return default